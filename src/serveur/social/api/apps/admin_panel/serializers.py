@@ -71,6 +71,37 @@ class StatsActivitySerializer(serializers.Serializer):
         ref_name = 'AdminActivityStatsSerializer'
 
 
+class StatsDailySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    new_users = serializers.IntegerField()
+    new_posts = serializers.IntegerField()
+    new_comments = serializers.IntegerField()
+    new_likes = serializers.IntegerField()
+    new_reports = serializers.IntegerField()
+
+    class Meta:
+        ref_name = 'AdminDailyStatsSerializer'
+
+
+class EntityCacheStatsSerializer(serializers.Serializer):
+    l1_hits = serializers.IntegerField(help_text='Reads served by the request identity map')
+    l2_hits = serializers.IntegerField(help_text='Reads served by Redis')
+    misses = serializers.IntegerField()
+    invalidations = serializers.IntegerField()
+    hit_ratio = serializers.FloatField()
+
+    class Meta:
+        ref_name = 'AdminEntityCacheStatsSerializer'
+
+
+class StatsCacheSerializer(serializers.Serializer):
+    posts = EntityCacheStatsSerializer()
+    users = EntityCacheStatsSerializer()
+
+    class Meta:
+        ref_name = 'AdminCacheStatsSerializer'
+
+
 class ReportActionSerializer(serializers.Serializer):
     """Serializer for resolving/rejecting a report."""
     action_taken = serializers.CharField(required=False, allow_blank=True, max_length=200)
@@ -3,10 +3,10 @@ URL configuration for admin_panel app.
 """
 from django.urls import path
 from .views_reports import ReportsListView, ResolveReportView, RejectReportView
-from .views_moderation import BanUserView, UnbanUserView, RemovePostView, RemoveCommentView
+from .views_moderation import BanUserView, UnbanUserView, RemovePostView, RemoveCommentView, CommentSubtreeView
 from .views_domains import AdminDomainCreateView, AdminDomainUpdateView
 from .views_tags import DeleteTagView
-from .views_stats import UsersStatsView, PostsStatsView, ActivityStatsView
+from .views_stats import UsersStatsView, PostsStatsView, ActivityStatsView, DailyStatsView, CacheStatsView
 
 app_name = 'admin_panel'
 
@@ -30,10 +30,13 @@ urlpatterns = [
     # Content moderation
     path('posts/<str:post_id>/remove/', RemovePostView.as_view(), name='remove-post'),
     path('comments/<str:comment_id>/remove/', RemoveCommentView.as_view(), name='remove-comment'),
+    path('comments/<str:comment_id>/subtree/', CommentSubtreeView.as_view(), name='comment-subtree'),
 
     # Stats
     path('stats/users/', UsersStatsView.as_view(), name='stats-users'),
     path('stats/posts/', PostsStatsView.as_view(), name='stats-posts'),
     path('stats/activity/', ActivityStatsView.as_view(), name='stats-activity'),
+    path('stats/daily/', DailyStatsView.as_view(), name='stats-daily'),
+    path('stats/cache/', CacheStatsView.as_view(), name='stats-cache'),
 ]
 
@@ -103,12 +103,33 @@ class RemoveCommentView(APIView):
         comment = CommentRepository.get_by_id(comment_id)
         if not comment:
             return api_error('NOT_FOUND', 'Comment not found', status_code=404)
-        CommentRepository.delete(comment_id)
+        deleted = CommentRepository.delete_subtree(comment_id)
         AuditLogRepository.create(
             user_id=str(request.user.user_id),
             action_type='delete',
             resource_type='comment',
             resource_id=comment_id,
+            details={'deleted_comments': deleted},
             ip_address=get_client_ip(request)
         )
         return api_success(status_code=204)
+
+
+class CommentSubtreeView(APIView):
+    """Size of a comment thread, i.e. what removing the comment deletes (admin only)."""
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Count a comment and all its replies before removing it",
+        responses={200: 'Subtree size'}
+    )
+    @rate_limit_general
+    def get(self, request, comment_id):
+        comment = CommentRepository.get_by_id(comment_id)
+        if not comment:
+            return api_error('NOT_FOUND', 'Comment not found', status_code=404)
+        return api_success({
+            'comment_id': str(comment.comment_id),
+            'subtree_size': CommentRepository.get_subtree_size(comment.comment_id),
+        })
@@ -1,17 +1,21 @@
 """
 Admin panel views for statistics.
 """
-from datetime import timedelta
+from datetime import date, timedelta
 from django.utils import timezone
 from rest_framework.views import APIView
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from common.permissions import IsAuthenticated, IsAdmin
 from common.rate_limiters import rate_limit_general
-from db.entities.user_entity import User
-from db.entities.post_entity import Post, Comment
-from db.entities.message_entity import Report
-from .serializers import StatsUsersSerializer, StatsPostsSerializer, StatsActivitySerializer
-from .response_utils import api_success
+from db.repositories.stats_repository import StatsRepository
+from .serializers import (
+    StatsUsersSerializer, StatsPostsSerializer, StatsActivitySerializer, StatsDailySerializer, StatsCacheSerializer
+)
+from .response_utils import api_success, api_error
+
+# Longest range served by the daily time series
+MAX_SERIES_DAYS = 366
 
 
 class UsersStatsView(APIView):
@@ -25,23 +29,7 @@ class UsersStatsView(APIView):
     )
     @rate_limit_general
     def get(self, request):
-        today = timezone.now().date()
-        start_week = today - timedelta(days=7)
-        total_users = User.objects.count()
-        new_users_today = User.objects.filter(created_at__date=today).count()
-        new_users_this_week = User.objects.filter(created_at__date__gte=start_week).count()
-        active_users_today = User.objects.filter(last_login_at__date=today).count()
-        banned_users = User.objects.filter(is_banned=True).count()
-        return api_success(
-            data={
-                'total_users': total_users,
-                'new_users_today': new_users_today,
-                'new_users_this_week': new_users_this_week,
-                'active_users_today': active_users_today,
-                'banned_users': banned_users,
-            },
-            status_code=200
-        )
+        return api_success(data=StatsRepository.user_stats(), status_code=200)
 
 
 class PostsStatsView(APIView):
@@ -55,21 +43,7 @@ class PostsStatsView(APIView):
     )
     @rate_limit_general
     def get(self, request):
-        today = timezone.now().date()
-        start_week = today - timedelta(days=7)
-        total_posts = Post.objects.count()
-        new_posts_today = Post.objects.filter(created_at__date=today).count()
-        new_posts_this_week = Post.objects.filter(created_at__date__gte=start_week).count()
-        total_comments = Comment.objects.count()
-        return api_success(
-            data={
-                'total_posts': total_posts,
-                'new_posts_today': new_posts_today,
-                'new_posts_this_week': new_posts_this_week,
-                'total_comments': total_comments,
-            },
-            status_code=200
-        )
+        return api_success(data=StatsRepository.post_stats(), status_code=200)
 
 
 class ActivityStatsView(APIView):
@@ -83,16 +57,45 @@ class ActivityStatsView(APIView):
     )
     @rate_limit_general
     def get(self, request):
-        total_reports = Report.objects.count()
-        pending_reports = Report.objects.filter(status='pending').count()
-        resolved_reports = Report.objects.filter(status='resolved').count()
-        rejected_reports = Report.objects.filter(status='rejected').count()
-        return api_success(
-            data={
-                'total_reports': total_reports,
-                'pending_reports': pending_reports,
-                'resolved_reports': resolved_reports,
-                'rejected_reports': rejected_reports,
-            },
-            status_code=200
-        )
+        return api_success(data=StatsRepository.report_stats(), status_code=200)
+
+
+class DailyStatsView(APIView):
+    """New users/posts/comments/likes/reports per day, from the daily rollup (admin only)."""
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Activity counts per day over a range (defaults to the last 30 days)",
+        manual_parameters=[
+            openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=False),
+            openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=False),
+        ],
+        responses={200: StatsDailySerializer(many=True)}
+    )
+    @rate_limit_general
+    def get(self, request):
+        try:
+            end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+            start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+        except ValueError:
+            return api_error('VALIDATION_ERROR', 'start and end must be dates (YYYY-MM-DD)', status_code=400)
+        if start > end or (end - start).days >= MAX_SERIES_DAYS:
+            return api_error('VALIDATION_ERROR', f'Invalid range: start must precede end, at most {MAX_SERIES_DAYS} days',
+                             status_code=400)
+        series = StatsRepository.daily_series(start, end)
+        return api_success(data=StatsDailySerializer(series, many=True).data, status_code=200)
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counts of the post and user caches, summed over workers (admin only)."""
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @swagger_auto_schema(
+        operation_description="Post and user cache statistics",
+        responses={200: StatsCacheSerializer}
+    )
+    @rate_limit_general
+    def get(self, request):
+        return api_success(data=StatsRepository.cache_stats(), status_code=200)
@@ -2,6 +2,7 @@
 Serializers for comments app.
 """
 from rest_framework import serializers
+from apps.posts.serializers import BulkErrorSerializer
 
 
 class CreateCommentSerializer(serializers.Serializer):
@@ -21,3 +22,29 @@ class CommentSerializer(serializers.Serializer):
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
 
+
+class CommentSearchResultSerializer(serializers.Serializer):
+    """Serializer for a comment search result."""
+    comment_id = serializers.UUIDField(read_only=True)
+    post_id = serializers.UUIDField(read_only=True)
+    author_id = serializers.UUIDField(read_only=True)
+    author_username = serializers.CharField(read_only=True)
+    parent_comment_id = serializers.UUIDField(read_only=True, allow_null=True)
+    snippet = serializers.CharField(read_only=True, help_text='Escaped HTML excerpt, matches wrapped in <mark>')
+    rank = serializers.FloatField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+
+class CommentBulkSerializer(serializers.Serializer):
+    """Serializer for bulk comment retrieval."""
+    comment_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        max_length=100
+    )
+
+
+class CommentBulkResultSerializer(serializers.Serializer):
+    """Serializer for one item of a bulk comment retrieval: the comment or an error."""
+    comment_id = serializers.UUIDField(read_only=True)
+    comment = CommentSerializer(read_only=True, required=False)
+    error = BulkErrorSerializer(read_only=True, required=False)
@@ -3,7 +3,8 @@ URL configuration for comments app.
 """
 from django.urls import path
 from .views import (
-    PostCommentsView, CreateCommentView, DeleteCommentView, CommentRepliesView
+    PostCommentsView, CreateCommentView, DeleteCommentView, CommentRepliesView, CommentSearchView,
+    CommentBulkView
 )
 
 app_name = 'comments'
@@ -13,6 +14,12 @@ urlpatterns = [
     path('posts/<str:post_id>/', PostCommentsView.as_view(), name='post-comments'),
     path('posts/<str:post_id>/create/', CreateCommentView.as_view(), name='create-comment'),
     
+    # Search
+    path('search/', CommentSearchView.as_view(), name='search-comments'),
+    
+    # Bulk retrieval
+    path('bulk/', CommentBulkView.as_view(), name='bulk-comments'),
+    
     # Comment operations
     path('<str:comment_id>/delete/', DeleteCommentView.as_view(), name='delete-comment'),
     path('<str:comment_id>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
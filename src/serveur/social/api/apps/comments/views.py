@@ -8,11 +8,15 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from services.apps_services.comment_service import CommentService
+from services.apps_services.search_service import SearchService
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_comment_create, rate_limit_general
 from common.exceptions import NotFoundError, ValidationError, PermissionDeniedError
-from common.utils import get_client_ip
-from .serializers import CreateCommentSerializer, CommentSerializer
+from common.utils import get_client_ip, get_cursor_param, build_cursor_response
+from .serializers import (
+    CreateCommentSerializer, CommentSerializer, CommentSearchResultSerializer,
+    CommentBulkSerializer, CommentBulkResultSerializer
+)
 
 
 class PostCommentsView(APIView):
@@ -24,6 +28,7 @@ class PostCommentsView(APIView):
         operation_description="Get comments for a post",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20),
             openapi.Parameter('sort_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, default='created_at')
         ],
@@ -34,9 +39,10 @@ class PostCommentsView(APIView):
         """Get post comments."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         sort_by = request.query_params.get('sort_by', 'created_at')
         
-        comments = CommentService.get_post_comments(post_id, page, page_size, sort_by)
+        comments = CommentService.get_post_comments(post_id, page, page_size, sort_by, cursor)
         
         data = [{
             'comment_id': str(comment.comment_id),
@@ -49,7 +55,7 @@ class PostCommentsView(APIView):
             'updated_at': comment.updated_at
         } for comment in comments]
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, comments)
 
 
 class CreateCommentView(APIView):
@@ -131,6 +137,7 @@ class CommentRepliesView(APIView):
         operation_description="Get replies to a comment",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: CommentSerializer(many=True)}
@@ -140,8 +147,9 @@ class CommentRepliesView(APIView):
         """Get comment replies."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         
-        replies = CommentService.get_comment_replies(comment_id, page, page_size)
+        replies = CommentService.get_comment_replies(comment_id, page, page_size, cursor)
         
         data = [{
             'comment_id': str(reply.comment_id),
@@ -154,5 +162,94 @@ class CommentRepliesView(APIView):
             'updated_at': reply.updated_at
         } for reply in replies]
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, replies)
+
+
+class CommentSearchView(APIView):
+    """Full-text comment search."""
+
+    permission_classes = [IsAuthenticated, IsNotBanned]
+
+    @swagger_auto_schema(
+        operation_description="Search comments (web search syntax: \"phrase\", -word, OR)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['fr', 'en'], description='Defaults to the user language'),
+            openapi.Parameter('post_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('subforum_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('author_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('sort', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['relevance', 'recent'], default='relevance'),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
+        ],
+        responses={200: CommentSearchResultSerializer(many=True)}
+    )
+    @rate_limit_general
+    def get(self, request):
+        """Search comments."""
+        params = request.query_params
+        comments = SearchService.search_comments(
+            str(request.user.user_id), params.get('q'), language=params.get('lang'),
+            post_id=params.get('post_id'), subforum_id=params.get('subforum_id'),
+            author_id=params.get('author_id'), sort=params.get('sort'),
+            page=int(params.get('page', 1)), page_size=int(params.get('page_size', 20)),
+            cursor=get_cursor_param(request)
+        )
+
+        data = [{
+            'comment_id': str(comment.comment_id),
+            'post_id': str(comment.post_id),
+            'author_id': str(comment.user_id),
+            'author_username': comment.user.username if comment.user else None,
+            'parent_comment_id': str(comment.parent_comment_id) if comment.parent_comment_id else None,
+            'snippet': comment.snippet,
+            'rank': comment.rank,
+            'created_at': comment.created_at
+        } for comment in comments]
+
+        return build_cursor_response(request, data, comments)
+
+
+class CommentBulkView(APIView):
+    """Get multiple comments by IDs."""
+
+    permission_classes = [IsAuthenticated, IsNotBanned]
 
+    @swagger_auto_schema(
+        operation_description="Get up to 100 comments by IDs, in request order, with an error for each comment not found or not visible",
+        request_body=CommentBulkSerializer,
+        responses={200: CommentBulkResultSerializer(many=True)}
+    )
+    @rate_limit_general
+    def post(self, request):
+        """Get bulk comments."""
+        serializer = CommentBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        comment_ids = [str(comment_id) for comment_id in serializer.validated_data['comment_ids']]
+        results = CommentService.get_bulk_comments(comment_ids, str(request.user.user_id))
+
+        data = []
+        for comment_id, comment, error in results:
+            if error is not None:
+                data.append({
+                    'comment_id': comment_id,
+                    'error': {'code': error.code, 'message': error.message, 'status': error.status_code}
+                })
+                continue
+            data.append({
+                'comment_id': comment_id,
+                'comment': {
+                    'comment_id': str(comment.comment_id),
+                    'post_id': str(comment.post_id),
+                    'author_id': str(comment.user_id) if comment.user_id else None,
+                    'author_username': comment.user.username if comment.user else None,
+                    'parent_comment_id': str(comment.parent_comment_id) if comment.parent_comment_id else None,
+                    'content': comment.content,
+                    'created_at': comment.created_at,
+                    'updated_at': comment.updated_at
+                }
+            })
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -1,14 +1,14 @@
+import logging
 from typing import Optional, Tuple
 
-from django.conf import settings
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
-import firebase_admin
-from firebase_admin import auth as firebase_auth
-from firebase_admin import credentials
 
+from apps.custom_auth.token_verifier import ExpiredTokenError, InvalidTokenError, get_token_verifier
 from db.entities.user_entity import User
 
+logger = logging.getLogger(__name__)
+
 
 class _WrappedUser:
     """Light wrapper to present a Django-like user to the rest framework.
@@ -60,47 +60,32 @@ class FirebaseAuthentication(BaseAuthentication):
         if scheme.lower() != 'bearer':
             return None
 
-        # Initialize Firebase Admin SDK if not already done
-        if not firebase_admin._apps:
-            cred_path = getattr(settings, 'FIREBASE_SERVICE_ACCOUNT_KEY', None)
-            if cred_path:
-                cred = credentials.Certificate(cred_path)
-                firebase_admin.initialize_app(cred)
-            else:
-                # Initialize with default credentials (for Cloud environments)
-                firebase_admin.initialize_app()
-
         try:
-            # Verify the Firebase ID token
-            decoded_token = firebase_auth.verify_id_token(token)
-            firebase_uid = decoded_token.get('uid')
-            
-            if not firebase_uid:
-                raise exceptions.AuthenticationFailed('Token contained no user ID')
-            
-            # Store Firebase info in request for later use (user creation)
-            request.firebase_uid = firebase_uid
-            request.firebase_email = decoded_token.get('email')
-            request.firebase_token = decoded_token
-            
-            # Try to find user in database by firebase_uid
-            # Assuming User model has a firebase_uid field (needs to be added)
-            try:
-                user = User.objects.get(firebase_uid=firebase_uid)
-                return (_WrappedUser(user), token)
-            except User.DoesNotExist:
-                # User authenticated via Firebase but not in database yet
-                # Return None to allow endpoint to handle user creation
-                return None
-                
-        except firebase_auth.InvalidIdTokenError as exc:
-            print(f"Firebase InvalidIdTokenError: {exc}")
-            raise exceptions.AuthenticationFailed('Invalid Firebase token') from exc
-        except firebase_auth.ExpiredIdTokenError as exc:
-            print(f"Firebase ExpiredIdTokenError: {exc}")
+            # Verify the Firebase ID token (cached per token until it expires)
+            decoded_token = get_token_verifier().verify(token)
+        except ExpiredTokenError as exc:
             raise exceptions.AuthenticationFailed('Firebase token expired') from exc
+        except InvalidTokenError as exc:
+            logger.info('Invalid Firebase token: %s', exc)
+            raise exceptions.AuthenticationFailed('Invalid Firebase token') from exc
         except Exception as exc:
-            print(f"Firebase authentication exception: {type(exc).__name__}: {exc}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Firebase authentication failed')
             raise exceptions.AuthenticationFailed('Firebase authentication failed') from exc
+
+        firebase_uid = decoded_token.get('uid')
+        if not firebase_uid:
+            raise exceptions.AuthenticationFailed('Token contained no user ID')
+
+        # Store Firebase info in request for later use (user creation)
+        request.firebase_uid = firebase_uid
+        request.firebase_email = decoded_token.get('email')
+        request.firebase_token = decoded_token
+
+        # Find the user by firebase_uid (short-lived cache, invalidated on ban/unban and profile changes)
+        from db.repositories.user_repository import UserRepository
+        user = UserRepository.get_for_auth(firebase_uid)
+        if user is None:
+            # User authenticated via Firebase but not in database yet
+            # Return None to allow endpoint to handle user creation
+            return None
+        return (_WrappedUser(user), token)
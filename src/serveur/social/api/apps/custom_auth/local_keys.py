@@ -0,0 +1,84 @@
+"""
+Local stand-in for Firebase's signing keys.
+
+Generates an RSA key with a self-signed certificate, in the same
+{key id: PEM} format Google publishes, and mints ID tokens signed with it.
+Point FIREBASE_CERTS_FILE at the certificates file to run authentication
+(and load tests) without Firebase. Never use these keys in production.
+"""
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+from apps.custom_auth.token_verifier import ISSUER_PREFIX
+
+PRIVATE_KEY_FILE = 'private_key.pem'
+CERTS_FILE = 'certs.json'
+
+
+def generate_local_keys(directory, kid: str = 'local-1') -> Tuple[Path, Path]:
+    """
+    Write a private key and its certificate file in a directory.
+
+    Returns:
+        (private key path, certificates path)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'local-firebase-stand-in')])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=365))
+        .sign(key, hashes.SHA256())
+    )
+    private_path = directory / PRIVATE_KEY_FILE
+    private_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    certs_path = directory / CERTS_FILE
+    certs_path.write_text(json.dumps({kid: cert.public_bytes(serialization.Encoding.PEM).decode('ascii')}))
+    return private_path, certs_path
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def mint_token(private_key_path, project_id: str, uid: str, email: Optional[str] = None,
+               lifetime: int = 3600, kid: str = 'local-1') -> str:
+    """Mint an ID token shaped like Firebase's, signed with a local key."""
+    key = serialization.load_pem_private_key(Path(private_key_path).read_bytes(), password=None)
+    now = int(time.time())
+    claims = {
+        'iss': ISSUER_PREFIX + project_id,
+        'aud': project_id,
+        'auth_time': now,
+        'user_id': uid,
+        'sub': uid,
+        'iat': now,
+        'exp': now + lifetime,
+    }
+    if email:
+        claims['email'] = email
+    signing_input = '.'.join(
+        _b64encode(json.dumps(part, separators=(',', ':')).encode('utf-8'))
+        for part in ({'alg': 'RS256', 'kid': kid, 'typ': 'JWT'}, claims)
+    )
+    signature = key.sign(signing_input.encode('ascii'), padding.PKCS1v15(), hashes.SHA256())
+    return f'{signing_input}.{_b64encode(signature)}'
@@ -0,0 +1,245 @@
+"""
+Firebase ID token verification with cached results and prefetched keys.
+
+Tokens are verified locally (RS256 signature against Google's published
+signing certificates, then the claims Firebase documents: audience,
+issuer, subject, issue/auth/expiry times). Verified claims are cached by
+token hash until the token expires, in each worker and in Redis, so a
+token is verified once per lifetime rather than once per request.
+
+The certificates are fetched when the verifier is first used and
+refreshed in the background before their Cache-Control max-age runs
+out, or on an unknown key id (key rotation). With FIREBASE_CERTS_FILE
+set they are read from a local JSON file instead ({key id: PEM}), which
+together with `local_keys` lets the whole path run offline.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from common.cache import TwoTierCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+ISSUER_PREFIX = 'https://securetoken.google.com/'
+LOCAL_CERTS_MAX_AGE = 3600
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class InvalidTokenError(Exception):
+    """The token is malformed, not signed by Firebase, or not for this project."""
+
+
+class ExpiredTokenError(InvalidTokenError):
+    """The token was valid but has expired."""
+
+
+def fetch_google_certs() -> Tuple[Dict[str, str], float]:
+    """Download Google's signing certificates and their max-age."""
+    with urllib.request.urlopen(GOOGLE_CERTS_URL, timeout=10) as response:
+        certs = json.loads(response.read().decode('utf-8'))
+        match = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    return certs, float(match.group(1)) if match else LOCAL_CERTS_MAX_AGE
+
+
+def file_certs_fetcher(path: str) -> Callable[[], Tuple[Dict[str, str], float]]:
+    """Fetcher reading certificates from a local JSON file (stand-in key set)."""
+    def fetch():
+        with open(path, encoding='utf-8') as certs_file:
+            return json.load(certs_file), LOCAL_CERTS_MAX_AGE
+    return fetch
+
+
+class KeySet:
+    """Public signing keys by key id, kept fresh by a background thread."""
+
+    def __init__(self, fetch: Callable[[], Tuple[Dict[str, str], float]], min_refresh_interval: float = 60,
+                 refresh_margin: float = 300):
+        self._fetch = fetch
+        self.min_refresh_interval = min_refresh_interval
+        self.refresh_margin = refresh_margin
+        self._keys = {}
+        self._expires_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> None:
+        """Fetch and parse the certificates (raises on fetch errors, keeping the current keys)."""
+        certs, max_age = self._fetch()
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in certs.items()
+        }
+        with self._lock:
+            self._keys = keys
+            self._refreshed_at = time.monotonic()
+            self._expires_at = self._refreshed_at + max_age
+
+    def get(self, kid: Optional[str]):
+        """
+        Get the public key of a key id.
+
+        Unknown ids trigger one refresh (rate-limited), for key rotation.
+
+        Raises:
+            InvalidTokenError: If no such key is published
+        """
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._refreshed_at >= self.min_refresh_interval:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Refreshing Firebase signing keys failed')
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidTokenError('Token signed with an unknown key')
+        return key
+
+    def start(self) -> None:
+        """Prefetch the keys and start refreshing them in the background."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name='firebase-keys', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(max(self._expires_at - time.monotonic() - self.refresh_margin, self.min_refresh_interval))
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Refreshing Firebase signing keys failed')
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+class TokenVerifier:
+    """Verifies Firebase ID tokens, caching verified claims until the token expires."""
+
+    def __init__(self, project_id: str, key_set: KeySet, local_ttl: float = 300, clock_skew: int = 0):
+        self.project_id = project_id
+        self.key_set = key_set
+        self.clock_skew = clock_skew
+        self.cache = TwoTierCache(
+            'auth:token',
+            ttl=lambda claims: claims['exp'] - time.time(),
+            local_ttl=local_ttl,
+        )
+
+    def verify(self, token: str) -> dict:
+        """
+        Verify a token.
+
+        Returns:
+            Decoded claims, with the Firebase user ID as 'uid'
+
+        Raises:
+            ExpiredTokenError: If the token has expired
+            InvalidTokenError: If the token is not a valid token of this project
+        """
+        key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        return self.cache.get(key, lambda: self._verify(token))
+
+    def _verify(self, token: str) -> dict:
+        try:
+            header_segment, payload_segment, signature_segment = token.split('.')
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, binascii.Error) as exc:
+            raise InvalidTokenError('Malformed token') from exc
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise InvalidTokenError('Malformed token')
+        if header.get('alg') != 'RS256':
+            raise InvalidTokenError('Token is not signed with RS256')
+
+        public_key = self.key_set.get(header.get('kid'))
+        try:
+            public_key.verify(signature, f'{header_segment}.{payload_segment}'.encode('ascii'),
+                              padding.PKCS1v15(), hashes.SHA256())
+        except InvalidSignature as exc:
+            raise InvalidTokenError('Invalid token signature') from exc
+
+        now = time.time()
+        subject = claims.get('sub')
+        if claims.get('aud') != self.project_id:
+            raise InvalidTokenError('Token has an incorrect audience')
+        if claims.get('iss') != ISSUER_PREFIX + self.project_id:
+            raise InvalidTokenError('Token has an incorrect issuer')
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise InvalidTokenError('Token has an invalid subject')
+        for claim in ('iat', 'auth_time', 'exp'):
+            if not isinstance(claims.get(claim), (int, float)):
+                raise InvalidTokenError(f'Token has no {claim}')
+        if claims['iat'] > now + self.clock_skew or claims['auth_time'] > now + self.clock_skew:
+            raise InvalidTokenError('Token used before its issue time')
+        if claims['exp'] <= now - self.clock_skew:
+            raise ExpiredTokenError('Token expired')
+        claims['uid'] = subject
+        return claims
+
+
+def _project_id() -> str:
+    project_id = getattr(settings, 'FIREBASE_PROJECT_ID', None)
+    cred_path = getattr(settings, 'FIREBASE_SERVICE_ACCOUNT_KEY', None)
+    if not project_id and cred_path:
+        with open(cred_path, encoding='utf-8') as cred_file:
+            project_id = json.load(cred_file).get('project_id')
+    if not project_id:
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('GCLOUD_PROJECT')
+    if not project_id:
+        try:
+            import google.auth
+            project_id = google.auth.default()[1]
+        except Exception:
+            project_id = None
+    if not project_id:
+        raise ImproperlyConfigured('Set FIREBASE_PROJECT_ID to verify Firebase tokens')
+    return project_id
+
+
+_verifier: Optional[TokenVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Get the process-wide verifier, building it (and prefetching keys) on first use."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                certs_file = getattr(settings, 'FIREBASE_CERTS_FILE', None)
+                key_set = KeySet(file_certs_fetcher(certs_file) if certs_file else fetch_google_certs)
+                # Resolve the project first: a misconfiguration must not leave a refresh thread per request
+                _verifier = TokenVerifier(
+                    _project_id(),
+                    key_set,
+                    local_ttl=getattr(settings, 'AUTH_TOKEN_CACHE_LOCAL_TTL', 300),
+                )
+                key_set.start()
+    return _verifier
+
+
+def reset_token_verifier() -> None:
+    """Forget the process-wide verifier (e.g. after changing the Firebase settings)."""
+    global _verifier
+    with _verifier_lock:
+        _verifier = None
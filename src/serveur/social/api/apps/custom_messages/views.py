@@ -11,7 +11,7 @@ from services.apps_services.message_service import MessageService
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_message_send
 from common.exceptions import NotFoundError, ValidationError, PermissionDeniedError
-from common.utils import get_client_ip
+from common.utils import get_client_ip, get_cursor_param, build_cursor_response
 from .serializers import SendMessageSerializer, MessageSerializer, ConversationSerializer
 
 
@@ -24,6 +24,7 @@ class ConversationsListView(APIView):
         operation_description="Get all conversations",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: ConversationSerializer(many=True)}
@@ -33,8 +34,9 @@ class ConversationsListView(APIView):
         """Get conversations."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         
-        conversations = MessageService.get_conversations(str(request.user.user_id), page, page_size)
+        conversations = MessageService.get_conversations(str(request.user.user_id), page, page_size, cursor)
         
         # Serialize last_message objects
         for conv in conversations:
@@ -49,7 +51,7 @@ class ConversationsListView(APIView):
                     'created_at': msg.created_at.isoformat()
                 }
         
-        return Response(conversations, status=status.HTTP_200_OK)
+        return build_cursor_response(request, list(conversations), conversations)
 
 
 class ConversationView(APIView):
@@ -61,6 +63,7 @@ class ConversationView(APIView):
         operation_description="Get conversation with a user",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: MessageSerializer(many=True)}
@@ -70,8 +73,9 @@ class ConversationView(APIView):
         """Get conversation."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         
-        messages = MessageService.get_conversation(str(request.user.user_id), user_id, page, page_size)
+        messages = MessageService.get_conversation(str(request.user.user_id), user_id, page, page_size, cursor)
         
         data = [{
             'message_id': str(msg.message_id),
@@ -84,7 +88,7 @@ class ConversationView(APIView):
             'created_at': msg.created_at
         } for msg in messages]
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, messages)
 
 
 class SendMessageView(APIView):
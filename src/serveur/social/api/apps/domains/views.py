@@ -1,6 +1,7 @@
 """
 Views for domains app.
 """
+import uuid
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -12,7 +13,8 @@ from common.permissions import IsAuthenticated, IsNotBanned
 from apps.custom_auth.authentication import FirebaseAuthentication
 from common.rate_limiters import rate_limit_general
 from common.exceptions import NotFoundError, ValidationError
-from common.utils import get_client_ip
+from common.utils import build_etag_response, get_client_ip
+from db.repositories.domain_repository import structure_cache
 from .serializers import DomainSerializer, SubforumSerializer, CreateSubforumSerializer
 
 
@@ -33,16 +35,14 @@ class DomainsListView(APIView):
         # Manual authentication enforcement: tests expect 401 for unauthenticated
         if not (hasattr(request, 'firebase_uid') or (request.user and getattr(request.user, 'is_authenticated', False))):
             return Response({'error': {'code': 'UNAUTHORIZED', 'message': 'Authentication required'}}, status=status.HTTP_401_UNAUTHORIZED)
-        domains = DomainService.get_all_domains()
-        
-        data = [{
+        payload = structure_cache.get('domains', 'list', lambda: [{
             'domain_id': str(domain.domain_id),
             'name': domain.name,
             'description': domain.description,
             'created_at': domain.created_at
-        } for domain in domains]
+        } for domain in DomainService.get_all_domains()])
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_etag_response(request, payload)
 
 
 class DomainDetailView(APIView):
@@ -97,18 +97,21 @@ class DomainSubforumsView(APIView):
             return Response({'error': {'code': 'UNAUTHORIZED', 'message': 'Authentication required'}}, status=status.HTTP_401_UNAUTHORIZED)
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        try:
+            # Canonical form, as used when the listing is invalidated
+            domain_id = str(uuid.UUID(str(domain_id)))
+        except ValueError:
+            pass
         
-        subforums = DomainService.get_domain_subforums(domain_id, page, page_size)
-        
-        data = [{
+        payload = structure_cache.get(f'domain:{domain_id}', f'page:{page}:{page_size}', lambda: [{
             'subforum_id': str(subforum.subforum_id),
             'name': subforum.name,
             'description': subforum.description,
             'parent_domain_id': str(subforum.parent_domain_id) if subforum.parent_domain_id else None,
             'created_at': subforum.created_at
-        } for subforum in subforums]
+        } for subforum in DomainService.get_domain_subforums(domain_id, page, page_size)])
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_etag_response(request, payload)
 
 
 class CreateDomainSubforumView(APIView):
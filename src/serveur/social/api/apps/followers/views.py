@@ -11,7 +11,7 @@ from services.apps_services.follower_service import FollowerService
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_general
 from common.exceptions import NotFoundError, ValidationError, ConflictError
-from common.utils import get_client_ip
+from common.utils import get_client_ip, get_cursor_param, build_cursor_response
 from .serializers import FollowSerializer, UserFollowSerializer
 
 
@@ -130,6 +130,7 @@ class FollowersListView(APIView):
         operation_description="Get user's followers",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: UserFollowSerializer(many=True)}
@@ -139,8 +140,9 @@ class FollowersListView(APIView):
         """Get followers."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         
-        followers = FollowerService.get_followers(str(request.user.user_id), page, page_size)
+        followers = FollowerService.get_followers(str(request.user.user_id), page, page_size, cursor)
         
         data = [{
             'user_id': str(user.user_id),
@@ -149,7 +151,7 @@ class FollowersListView(APIView):
             'profile_picture_url': user.profile.profile_picture_url
         } for user in followers]
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, followers)
 
 
 class FollowingListView(APIView):
@@ -161,6 +163,7 @@ class FollowingListView(APIView):
         operation_description="Get users that current user follows",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: UserFollowSerializer(many=True)}
@@ -170,8 +173,9 @@ class FollowingListView(APIView):
         """Get following."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
         
-        following = FollowerService.get_following(str(request.user.user_id), page, page_size)
+        following = FollowerService.get_following(str(request.user.user_id), page, page_size, cursor)
         
         data = [{
             'user_id': str(user.user_id),
@@ -180,7 +184,7 @@ class FollowingListView(APIView):
             'profile_picture_url': user.profile.profile_picture_url
         } for user in following]
         
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, following)
 
 
 class PendingRequestsView(APIView):
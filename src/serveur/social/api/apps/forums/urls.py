@@ -4,7 +4,7 @@ URL configuration for forums app.
 from django.urls import path
 from .views import (
     ForumsListView, CreateForumView, ForumDetailView,
-    SearchForumsView, JoinForumView, LeaveForumView,
+    SearchForumsView, ForumAutocompleteView, JoinForumView, LeaveForumView,
     UserForumsView, ForumSubforumsView, ForumTreeView, CreateForumSubforumView
 )
 
@@ -15,6 +15,7 @@ urlpatterns = [
     path('', ForumsListView.as_view(), name='forums-list'),
     path('create/', CreateForumView.as_view(), name='create-forum'),
     path('search/', SearchForumsView.as_view(), name='search-forums'),
+    path('autocomplete/', ForumAutocompleteView.as_view(), name='autocomplete-forums'),
     path('me/', UserForumsView.as_view(), name='forums-me'),
     
     # Specific forum
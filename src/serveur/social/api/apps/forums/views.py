@@ -1,6 +1,8 @@
 """
 Views for forums app.
 """
+import uuid
+from collections import defaultdict
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -12,15 +14,15 @@ from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_general
 from common.exceptions import NotFoundError, ValidationError, ConflictError, PermissionDeniedError
 from django.db import IntegrityError
-from common.utils import get_client_ip
+from common.cache import payload_of
+from common.utils import build_etag_response, get_client_ip
 from .serializers import ForumSerializer, CreateForumSerializer
-from db.repositories.domain_repository import SubforumRepository
+from db.repositories.domain_repository import SubforumRepository, forum_counters, structure_cache, subforum_counters
 from db.repositories.message_repository import AuditLogRepository
 from services.apps_services.domain_service import DomainService
 from common.validators import Validator
 from django.db import transaction
 from apps.domains.serializers import CreateSubforumSerializer, SubforumSerializer
-from db.entities.domain_entity import Subforum
 
 
 class ForumsListView(APIView):
@@ -43,6 +45,7 @@ class ForumsListView(APIView):
         page_size = int(request.query_params.get('page_size', 20))
         
         forums = ForumService.get_all_forums(page, page_size)
+        forum_counters.overlay(forums)
         
         data = [{
             'forum_id': str(forum.forum_id),
@@ -81,6 +84,7 @@ class CreateForumView(APIView):
                 description=serializer.validated_data['description'],
                 ip_address=ip_address
             )
+            forum_counters.overlay([forum])
             
             return Response({
                 'forum_id': str(forum.forum_id),
@@ -112,6 +116,7 @@ class ForumDetailView(APIView):
         """Get forum."""
         try:
             forum = ForumService.get_forum_by_id(forum_id)
+            forum_counters.overlay([forum])
             
             return Response({
                 'forum_id': str(forum.forum_id),
@@ -157,6 +162,7 @@ class SearchForumsView(APIView):
             )
         
         forums = ForumService.search_forums(query, page, page_size)
+        forum_counters.overlay(forums)
         
         data = [{
             'forum_id': str(forum.forum_id),
@@ -169,6 +175,37 @@ class SearchForumsView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class ForumAutocompleteView(APIView):
+    """Forum name suggestions while typing."""
+    
+    permission_classes = [IsAuthenticated, IsNotBanned]
+    
+    @swagger_auto_schema(
+        operation_description="Complete a forum name prefix (or the prefix of one of its words), from an in-memory index",
+        manual_parameters=[
+            openapi.Parameter('query', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=10)
+        ],
+        responses={200: ForumSerializer(many=True)}
+    )
+    @rate_limit_general
+    def get(self, request):
+        """Complete a forum name prefix."""
+        query = request.query_params.get('query', '')
+        limit = int(request.query_params.get('limit', 10))
+        
+        forums = ForumService.autocomplete_forums(query, limit)
+        forum_counters.overlay(forums)
+        
+        data = [{
+            'forum_id': str(forum.forum_id),
+            'name': forum.name,
+            'member_count': forum.member_count
+        } for forum in forums]
+        
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class JoinForumView(APIView):
     """Join a forum."""
 
@@ -239,6 +276,7 @@ class UserForumsView(APIView):
         page_size = int(request.query_params.get('page_size', 20))
 
         memberships = ForumService.get_user_forums(str(request.user.user_id), page, page_size)
+        forum_counters.overlay(m.forum for m in memberships)
 
         data = []
         for m in memberships:
@@ -281,6 +319,7 @@ class ForumSubforumsView(APIView):
             return Response({'error': {'code': 'NOT_FOUND', 'message': str(e)}}, status=status.HTTP_404_NOT_FOUND)
 
         subforums = SubforumRepository.get_by_forum(forum_id, page, page_size)
+        subforum_counters.overlay(subforums)
 
         data = [{
             'forum_id': str(s.forum_id_id),
@@ -301,6 +340,11 @@ class ForumTreeView(APIView):
     Query params:
     - `depth` (int, optional): maximum depth to return. Root subforums are depth=1.
       If omitted, returns the full tree.
+
+    Tree structures are cached until a subforum is created or deleted under
+    the forum; post counts are read on every request. Responses carry an
+    ETag of the whole tree, counts included, and `If-None-Match` requests
+    for an unchanged tree get a 304.
     """
 
     permission_classes = [IsAuthenticated, IsNotBanned]
@@ -314,12 +358,6 @@ class ForumTreeView(APIView):
     )
     @rate_limit_general
     def get(self, request, forum_id):
-        # ensure forum exists
-        try:
-            ForumService.get_forum_by_id(forum_id)
-        except NotFoundError as e:
-            return Response({'error': {'code': 'NOT_FOUND', 'message': str(e)}}, status=status.HTTP_404_NOT_FOUND)
-
         depth_param = request.query_params.get('depth')
         try:
             max_depth = int(depth_param) if depth_param is not None else None
@@ -328,37 +366,69 @@ class ForumTreeView(APIView):
         except ValueError:
             return Response({'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid depth parameter'}}, status=status.HTTP_400_BAD_REQUEST)
 
-        # fetch top-level subforums for this forum (parent_forum_id == forum_id)
-        roots = Subforum.objects.filter(parent_forum_id=forum_id).order_by('created_at')
+        try:
+            forum_id = str(uuid.UUID(str(forum_id)))
+            structure = structure_cache.get(f'forum:{forum_id}', f'tree:{max_depth}',
+                                            lambda: self._build_tree(forum_id, max_depth))
+        except ValueError:
+            return Response({'error': {'code': 'NOT_FOUND', 'message': f'Forum {forum_id} not found'}}, status=status.HTTP_404_NOT_FOUND)
+        except NotFoundError as e:
+            return Response({'error': {'code': 'NOT_FOUND', 'message': str(e)}}, status=status.HTTP_404_NOT_FOUND)
 
-        def build_node(s: Subforum, current_depth: int):
+        return build_etag_response(request, payload_of(self._with_post_counts(structure.data)))
+
+    @staticmethod
+    def _with_post_counts(tree):
+        """Copy of a cached tree with the current post counts (the cached one is shared)."""
+        ids = []
+        stack = list(tree)
+        while stack:
+            node = stack.pop()
+            ids.append(node['subforum_id'])
+            stack.extend(node['children'])
+        subforums = SubforumRepository.get_post_counts(ids)
+        subforum_counters.overlay(subforums)
+        counts = {str(s.subforum_id): s.post_count for s in subforums}
+
+        def copy(node):
+            return {**node, 'post_count': counts.get(node['subforum_id'], 0),
+                    'children': [copy(child) for child in node['children']]}
+
+        return [copy(node) for node in tree]
+
+    @staticmethod
+    def _build_tree(forum_id: str, max_depth):
+        # ensure forum exists
+        ForumService.get_forum_by_id(forum_id)
+
+        # fetch the whole subtree in one query, ordered by creation date
+        subforums = SubforumRepository.get_tree(forum_id, max_depth)
+
+        # A subforum S has its own `forum_id` (a Forum record created for the
+        # subforum); nested subforums created under S have
+        # `parent_forum_id == S.forum_id`. Index nodes by (forum, depth) and
+        # attach each subforum to the nodes one level above it.
+        nodes = []
+        by_forum = defaultdict(list)
+        for s in subforums:
             node = {
                 'subforum_id': str(s.subforum_id),
                 'name': s.name,
                 'description': s.description,
-                'post_count': s.post_count,
                 'created_at': s.created_at,
                 'children': []
             }
+            nodes.append(node)
+            by_forum[(s.forum_id_id, s.tree_depth)].append(node)
 
-            # stop if reached max depth
-            if max_depth is not None and current_depth >= max_depth:
-                return node
-
-            # gather children by treating a subforum's forum as the parent forum
-            # of nested subforums. When a subforum S has its own `forum_id` (a
-            # Forum record created for the subforum), nested subforums created
-            # under S will have `parent_forum_id == S.forum_id`. Therefore we
-            # find those subforums and treat them as children here.
-            children = Subforum.objects.filter(parent_forum_id=s.forum_id).order_by('created_at')
-
-            node['children'] = [build_node(child, current_depth + 1) for child in children]
-
-            return node
-
-        tree = [build_node(r, 1) for r in roots]
-
-        return Response(tree, status=status.HTTP_200_OK)
+        tree = []
+        for s, node in zip(subforums, nodes):
+            if s.tree_depth == 1:
+                tree.append(node)
+            else:
+                for parent in by_forum.get((s.parent_forum_id, s.tree_depth - 1), ()):
+                    parent['children'].append(node)
+        return tree
 
 
 class CreateForumSubforumView(APIView):
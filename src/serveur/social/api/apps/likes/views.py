@@ -11,7 +11,7 @@ from services.apps_services.post_service import PostService
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_general
 from common.exceptions import NotFoundError, ConflictError
-from common.utils import get_client_ip
+from common.utils import get_client_ip, get_cursor_param, build_cursor_response
 from apps.posts.serializers import LikeSerializer
 
 
@@ -68,6 +68,7 @@ class PostLikesView(APIView):
         operation_description="Get users who liked the post",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: LikeSerializer(many=True)}
@@ -76,8 +77,9 @@ class PostLikesView(APIView):
     def get(self, request, post_id):
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
 
-        likes = PostService.get_post_likes(post_id, page, page_size)
+        likes = PostService.get_post_likes(post_id, page, page_size, cursor, viewer_id=str(request.user.user_id))
 
         data = [{
             'like_id': str(like.like_id),
@@ -87,4 +89,4 @@ class PostLikesView(APIView):
             'created_at': like.created_at
         } for like in likes]
 
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, likes)
@@ -26,6 +26,64 @@ class PostSerializer(serializers.Serializer):
     updated_at = serializers.DateTimeField(read_only=True)
 
 
+class TagSummarySerializer(serializers.Serializer):
+    """Serializer for a tag shown on a post."""
+    tag_id = serializers.UUIDField(read_only=True)
+    tag_name = serializers.CharField(read_only=True)
+
+
+class PostListItemSerializer(serializers.Serializer):
+    """Serializer for a post in a feed, with the viewer's state."""
+    post_id = serializers.UUIDField(read_only=True)
+    author_id = serializers.UUIDField(read_only=True)
+    author_username = serializers.CharField(read_only=True)
+    subforum_id = serializers.UUIDField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    content = serializers.CharField(read_only=True, help_text='First 200 characters')
+    like_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    liked_by_me = serializers.BooleanField(read_only=True)
+    following_author = serializers.BooleanField(read_only=True)
+    tags = TagSummarySerializer(many=True, read_only=True)
+
+
+class PostSearchResultSerializer(serializers.Serializer):
+    """Serializer for a post search result."""
+    post_id = serializers.UUIDField(read_only=True)
+    author_id = serializers.UUIDField(read_only=True)
+    author_username = serializers.CharField(read_only=True)
+    subforum_id = serializers.UUIDField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    snippet = serializers.CharField(read_only=True, help_text='Escaped HTML excerpt, matches wrapped in <mark>')
+    rank = serializers.FloatField(read_only=True)
+    like_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+
+class PostBulkSerializer(serializers.Serializer):
+    """Serializer for bulk post retrieval."""
+    post_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        max_length=100
+    )
+
+
+class BulkErrorSerializer(serializers.Serializer):
+    """Serializer for the error of one item of a bulk retrieval."""
+    code = serializers.CharField(read_only=True, help_text='NOT_FOUND or PERMISSION_DENIED')
+    message = serializers.CharField(read_only=True)
+    status = serializers.IntegerField(read_only=True, help_text='Status the detail endpoint would return')
+
+
+class PostBulkResultSerializer(serializers.Serializer):
+    """Serializer for one item of a bulk post retrieval: the post or an error."""
+    post_id = serializers.UUIDField(read_only=True)
+    post = PostSerializer(read_only=True, required=False)
+    error = BulkErrorSerializer(read_only=True, required=False)
+
+
 class LikeSerializer(serializers.Serializer):
     """Serializer for like."""
     like_id = serializers.UUIDField(read_only=True)
@@ -5,7 +5,7 @@ from django.urls import path
 from .views import (
     CreatePostView, PostDetailView, DeletePostView,
     LikePostView, UnlikePostView, PostLikesView,
-    FeedView, DiscoverView
+    FeedView, DiscoverView, PostSearchView, PostBulkView
 )
 
 app_name = 'posts'
@@ -15,6 +15,8 @@ urlpatterns = [
     path('create/', CreatePostView.as_view(), name='create-post'),
     path('feed/', FeedView.as_view(), name='feed'),
     path('discover/', DiscoverView.as_view(), name='discover'),
+    path('search/', PostSearchView.as_view(), name='search-posts'),
+    path('bulk/', PostBulkView.as_view(), name='bulk-posts'),
     
     # Specific post
     path('<str:post_id>/', PostDetailView.as_view(), name='post-detail'),
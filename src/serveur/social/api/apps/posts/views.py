@@ -8,11 +8,16 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from services.apps_services.post_service import PostService
+from services.apps_services.search_service import SearchService
+from db.repositories.post_repository import post_counters
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_post_create, rate_limit_general
 from common.exceptions import NotFoundError, ValidationError, PermissionDeniedError
-from common.utils import get_client_ip
-from .serializers import CreatePostSerializer, PostSerializer, LikeSerializer
+from common.utils import get_client_ip, get_cursor_param, build_cursor_response
+from .serializers import (
+    CreatePostSerializer, PostSerializer, PostListItemSerializer, PostSearchResultSerializer, LikeSerializer,
+    PostBulkSerializer, PostBulkResultSerializer
+)
 
 
 class CreatePostView(APIView):
@@ -74,6 +79,7 @@ class PostDetailView(APIView):
         """Get post."""
         try:
             post = PostService.get_post_by_id(post_id, str(request.user.user_id))
+            post_counters.overlay([post])
             
             return Response({
                 'post_id': str(post.post_id),
@@ -189,6 +195,7 @@ class PostLikesView(APIView):
         operation_description="Get users who liked the post",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: LikeSerializer(many=True)}
@@ -198,8 +205,9 @@ class PostLikesView(APIView):
         """Get post likes."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
 
-        likes = PostService.get_post_likes(post_id, page, page_size)
+        likes = PostService.get_post_likes(post_id, page, page_size, cursor, viewer_id=str(request.user.user_id))
 
         data = [{
             'like_id': str(like.like_id),
@@ -209,7 +217,7 @@ class PostLikesView(APIView):
             'created_at': like.created_at
         } for like in likes]
 
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, likes)
 
 
 class FeedView(APIView):
@@ -221,17 +229,21 @@ class FeedView(APIView):
         operation_description="Get personalized feed from followed users",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
-        responses={200: PostSerializer(many=True)}
+        responses={200: PostListItemSerializer(many=True)}
     )
     @rate_limit_general
     def get(self, request):
         """Get feed."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
 
-        posts = PostService.get_feed(str(request.user.user_id), page, page_size)
+        posts = PostService.get_feed(str(request.user.user_id), page, page_size, cursor)
+        post_counters.overlay(posts)
+        PostService.enrich_posts(posts, str(request.user.user_id))
 
         data = [{
             'post_id': str(post.post_id),
@@ -242,10 +254,13 @@ class FeedView(APIView):
             'content': post.content[:200] + '...' if len(post.content) > 200 else post.content,
             'like_count': post.like_count,
             'comment_count': post.comment_count,
-            'created_at': post.created_at
+            'created_at': post.created_at,
+            'liked_by_me': post.liked_by_me,
+            'following_author': post.following_author,
+            'tags': [{'tag_id': str(tag.tag_id), 'tag_name': tag.tag_name} for tag in post.tags]
         } for post in posts]
 
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, posts)
 
 
 class DiscoverView(APIView):
@@ -256,18 +271,28 @@ class DiscoverView(APIView):
     @swagger_auto_schema(
         operation_description="Get discover feed with trending posts",
         manual_parameters=[
+            openapi.Parameter('domain_id', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Trending within a domain'),
+            openapi.Parameter('subforum_id', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Trending within a subforum'),
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
-        responses={200: PostSerializer(many=True)}
+        responses={200: PostListItemSerializer(many=True)}
     )
     @rate_limit_general
     def get(self, request):
         """Get discover feed."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
 
-        posts = PostService.get_discover(str(request.user.user_id), page, page_size)
+        posts = PostService.get_discover(
+            str(request.user.user_id), page, page_size, cursor,
+            domain_id=request.query_params.get('domain_id'),
+            subforum_id=request.query_params.get('subforum_id')
+        )
+        post_counters.overlay(posts)
+        PostService.enrich_posts(posts, str(request.user.user_id))
 
         data = [{
             'post_id': str(post.post_id),
@@ -278,8 +303,108 @@ class DiscoverView(APIView):
             'content': post.content[:200] + '...' if len(post.content) > 200 else post.content,
             'like_count': post.like_count,
             'comment_count': post.comment_count,
+            'created_at': post.created_at,
+            'liked_by_me': post.liked_by_me,
+            'following_author': post.following_author,
+            'tags': [{'tag_id': str(tag.tag_id), 'tag_name': tag.tag_name} for tag in post.tags]
+        } for post in posts]
+
+        return build_cursor_response(request, data, posts)
+
+
+class PostSearchView(APIView):
+    """Full-text post search."""
+
+    permission_classes = [IsAuthenticated, IsNotBanned]
+
+    @swagger_auto_schema(
+        operation_description="Search posts by title and content (web search syntax: \"phrase\", -word, OR)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('lang', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['fr', 'en'], description='Defaults to the user language'),
+            openapi.Parameter('domain_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('subforum_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('tag_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('author_id', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('sort', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['relevance', 'recent'], default='relevance'),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
+        ],
+        responses={200: PostSearchResultSerializer(many=True)}
+    )
+    @rate_limit_general
+    def get(self, request):
+        """Search posts."""
+        params = request.query_params
+        posts = SearchService.search_posts(
+            str(request.user.user_id), params.get('q'), language=params.get('lang'),
+            domain_id=params.get('domain_id'), subforum_id=params.get('subforum_id'),
+            tag_id=params.get('tag_id'), author_id=params.get('author_id'), sort=params.get('sort'),
+            page=int(params.get('page', 1)), page_size=int(params.get('page_size', 20)),
+            cursor=get_cursor_param(request)
+        )
+        post_counters.overlay(posts)
+
+        data = [{
+            'post_id': str(post.post_id),
+            'author_id': str(post.user_id),
+            'author_username': post.user.username if post.user else None,
+            'subforum_id': str(post.subforum_id) if post.subforum_id else None,
+            'title': post.title,
+            'snippet': post.snippet,
+            'rank': post.rank,
+            'like_count': post.like_count,
+            'comment_count': post.comment_count,
             'created_at': post.created_at
         } for post in posts]
 
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, posts)
+
 
+class PostBulkView(APIView):
+    """Get multiple posts by IDs."""
+
+    permission_classes = [IsAuthenticated, IsNotBanned]
+
+    @swagger_auto_schema(
+        operation_description="Get up to 100 posts by IDs, in request order, with an error for each post not found or not visible",
+        request_body=PostBulkSerializer,
+        responses={200: PostBulkResultSerializer(many=True)}
+    )
+    @rate_limit_general
+    def post(self, request):
+        """Get bulk posts."""
+        serializer = PostBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        post_ids = [str(post_id) for post_id in serializer.validated_data['post_ids']]
+        results = PostService.get_bulk_posts(post_ids, str(request.user.user_id))
+        post_counters.overlay([post for _, post, _ in results if post is not None])
+
+        data = []
+        for post_id, post, error in results:
+            if error is not None:
+                data.append({
+                    'post_id': post_id,
+                    'error': {'code': error.code, 'message': error.message, 'status': error.status_code}
+                })
+                continue
+            data.append({
+                'post_id': post_id,
+                'post': {
+                    'post_id': str(post.post_id),
+                    'author_id': str(post.user_id) if post.user_id else None,
+                    'author_username': post.user.username if post.user else None,
+                    'subforum_id': str(post.subforum_id) if post.subforum_id else None,
+                    'title': post.title,
+                    'content': post.content,
+                    'content_signature': post.content_signature,
+                    'like_count': post.like_count,
+                    'comment_count': post.comment_count,
+                    'created_at': post.created_at,
+                    'updated_at': post.updated_at
+                }
+            })
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -2,6 +2,7 @@
 Serializers for subforums app.
 """
 from rest_framework import serializers
+from apps.posts.serializers import TagSummarySerializer
 
 
 class SubforumSerializer(serializers.Serializer):
@@ -23,3 +24,6 @@ class PostSummarySerializer(serializers.Serializer):
     like_count = serializers.IntegerField(read_only=True)
     comment_count = serializers.IntegerField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
+    liked_by_me = serializers.BooleanField(read_only=True)
+    following_author = serializers.BooleanField(read_only=True)
+    tags = TagSummarySerializer(many=True, read_only=True)
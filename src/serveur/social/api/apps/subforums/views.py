@@ -8,10 +8,14 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from services.apps_services.domain_service import DomainService
-from db.repositories.post_repository import PostRepository
+from services.apps_services.post_service import PostService
+from db.repositories.domain_repository import subforum_counters
+from db.repositories.post_repository import PostRepository, post_counters
 from common.permissions import IsAuthenticated, IsNotBanned
 from common.rate_limiters import rate_limit_general
 from common.exceptions import NotFoundError
+from common.utils import get_cursor_param, build_cursor_response
+from common.visibility import VisibilityFilter
 
 from .serializers import SubforumSerializer, PostSummarySerializer
 
@@ -30,6 +34,7 @@ class SubforumDetailView(APIView):
         """Return subforum details."""
         try:
             subforum = DomainService.get_subforum_by_id(subforum_id)
+            subforum_counters.overlay([subforum])
 
             return Response({
                 'forum_id': str(subforum.forum_id_id),
@@ -73,7 +78,8 @@ class SubforumChildrenView(APIView):
             return Response({'error': {'code': 'NOT_FOUND', 'message': str(e)}}, status=status.HTTP_404_NOT_FOUND)
 
         from db.repositories.domain_repository import SubforumRepository
-        subforums = SubforumRepository.get_by_parent_subforum(subforum_id, page, page_size)
+        subforums = list(SubforumRepository.get_by_parent_subforum(subforum_id, page, page_size))
+        subforum_counters.overlay(subforums)
 
         data = [{
             'forum_id': str(s.forum_id_id),
@@ -97,6 +103,7 @@ class SubforumPostsView(APIView):
         operation_description="List posts in a subforum",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=1),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor (next_cursor of the previous page)'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=20)
         ],
         responses={200: PostSummarySerializer(many=True)}
@@ -106,6 +113,7 @@ class SubforumPostsView(APIView):
         """Return posts in subforum."""
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 20))
+        cursor = get_cursor_param(request)
 
         try:
             # Ensure subforum exists
@@ -116,7 +124,11 @@ class SubforumPostsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        posts = PostRepository.get_by_subforum(subforum_id, page, page_size)
+        posts = PostRepository.get_by_subforum(
+            subforum_id, page, page_size, cursor, visibility=VisibilityFilter(str(request.user.user_id))
+        )
+        post_counters.overlay(posts)
+        PostService.enrich_posts(posts, str(request.user.user_id))
 
         data = [{
             'post_id': str(post.post_id),
@@ -124,7 +136,10 @@ class SubforumPostsView(APIView):
             'title': post.title,
             'like_count': post.like_count,
             'comment_count': post.comment_count,
-            'created_at': post.created_at
+            'created_at': post.created_at,
+            'liked_by_me': post.liked_by_me,
+            'following_author': post.following_author,
+            'tags': [{'tag_id': str(tag.tag_id), 'tag_name': tag.tag_name} for tag in post.tags]
         } for post in posts]
 
-        return Response(data, status=status.HTTP_200_OK)
+        return build_cursor_response(request, data, posts)
@@ -5,7 +5,7 @@ from django.urls import path
 from .views import (
     CurrentUserView, CreateUserView, UpdateCurrentUserView, UpdateCurrentUserSettingsView,
     UserDetailView, BlockUserView, UnblockUserView, BlockedUsersView,
-    UserSearchView, UserBulkView
+    UserSearchView, UserAutocompleteView, UserBulkView
 )
 
 app_name = 'users'
@@ -22,6 +22,7 @@ urlpatterns = [
     
     # User operations
     path('search/', UserSearchView.as_view(), name='search-users'),
+    path('autocomplete/', UserAutocompleteView.as_view(), name='autocomplete-users'),
     path('bulk/', UserBulkView.as_view(), name='bulk-users'),
     
     # Specific user
@@ -332,6 +332,37 @@ class UserSearchView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class UserAutocompleteView(APIView):
+    """Username suggestions while typing."""
+
+    permission_classes = [IsAuthenticated, IsNotBanned]
+
+    @swagger_auto_schema(
+        operation_description="Complete a username prefix (or the prefix of one of its words), from an in-memory index",
+        manual_parameters=[
+            openapi.Parameter('query', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=10)
+        ],
+        responses={200: UserPublicSerializer(many=True)}
+    )
+    @rate_limit_general
+    def get(self, request):
+        """Complete a username prefix."""
+        query = request.query_params.get('query', '')
+        limit = int(request.query_params.get('limit', 10))
+
+        users = UserService.autocomplete_users(query, str(request.user.user_id), limit)
+
+        data = [{
+            'user_id': str(user.user_id),
+            'username': user.username,
+            'display_name': user.profile.display_name,
+            'profile_picture_url': user.profile.profile_picture_url
+        } for user in users]
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class UserBulkView(APIView):
     """Get multiple users by IDs."""
 
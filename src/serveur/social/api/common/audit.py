@@ -0,0 +1,209 @@
+"""
+Batched audit log writer.
+
+Events are appended to a per-process spool file (write-ahead, one JSON line
+each) and to an in-memory batch. The batch is stored with a single bulk
+insert once it holds `batch_size` events or its oldest event is
+`flush_interval` seconds old, whichever comes first. A flush renames the
+spool file to `*.pending` and deletes it only once the rows are stored, so
+a failed flush or a crashed worker leaves its events on disk for
+`replay()`. Rows carry their primary key, which makes replays idempotent.
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_SUFFIX = '.jsonl'
+PENDING_SUFFIX = '.pending'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AuditWriter:
+    """Buffers audit rows in-process and hands them to `write` in batches."""
+
+    def __init__(self, write: Callable[[List[Dict]], None], spool_dir, batch_size: int = 200,
+                 flush_interval: float = 2.0):
+        self._write = write
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._buffer: List[Dict] = []
+        self._oldest: Optional[float] = None
+        self._spool = None
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._needs_replay = True
+
+    @property
+    def spool_name(self) -> str:
+        return f'audit-{socket.gethostname()}-{self._pid}'
+
+    def enqueue(self, row: Dict) -> None:
+        """
+        Queue one audit row (a dict of model field attnames to values).
+
+        Args:
+            row: JSON-serializable row, values that are not are stored with str()
+        """
+        line = json.dumps(row, default=str)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's batch and spool file are not ours
+                self._reset()
+            try:
+                spool = self._open_spool()
+                spool.write(line + '\n')
+                spool.flush()
+            except OSError:
+                logger.exception('Audit spool %s is not writable; event kept in memory only', self.spool_dir)
+            self._buffer.append(json.loads(line))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._buffer) >= self.batch_size
+        self._ensure_flusher()
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Store the current batch.
+
+        Returns:
+            Number of rows written (0 when empty or when the write failed;
+            failed rows stay in a pending spool file until replayed)
+        """
+        with self._lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer, self._oldest = self._buffer, [], None
+            pending = self._rotate_spool()
+        try:
+            self._write(batch)
+        except Exception:
+            logger.exception('Audit flush of %d events failed, kept in %s', len(batch), pending)
+            self._needs_replay = True
+            return 0
+        if pending is not None:
+            pending.unlink(missing_ok=True)
+        return len(batch)
+
+    def replay(self) -> int:
+        """
+        Store events left on disk by failed flushes or by dead workers of this host.
+
+        Returns:
+            Number of rows written
+        """
+        if not self.spool_dir.is_dir():
+            return 0
+        written = 0
+        for path in sorted(self.spool_dir.glob('audit-*')):
+            if not self._is_replayable(path):
+                continue
+            rows = self._read_spool(path)
+            try:
+                if rows:
+                    self._write(rows)
+            except Exception:
+                logger.exception('Audit replay of %s failed', path)
+                self._needs_replay = True
+                continue
+            path.unlink(missing_ok=True)
+            written += len(rows)
+        return written
+
+    def pending_count(self) -> int:
+        """Number of events buffered in this process."""
+        return len(self._buffer)
+
+    def _open_spool(self):
+        if self._spool is None:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self._spool = open(self.spool_dir / f'{self.spool_name}{ACTIVE_SUFFIX}', 'a', encoding='utf-8')
+        return self._spool
+
+    def _rotate_spool(self) -> Optional[Path]:
+        if self._spool is None:
+            return None
+        self._spool.close()
+        self._spool = None
+        self._seq += 1
+        active = self.spool_dir / f'{self.spool_name}{ACTIVE_SUFFIX}'
+        pending = self.spool_dir / f'{self.spool_name}.{self._seq}{PENDING_SUFFIX}'
+        try:
+            active.rename(pending)
+        except OSError:
+            logger.exception('Could not rotate audit spool %s', active)
+            return None
+        return pending
+
+    def _is_replayable(self, path: Path) -> bool:
+        if path.suffix == PENDING_SUFFIX:
+            return True
+        if path.suffix != ACTIVE_SUFFIX or path.stem == self.spool_name:
+            return False
+        host, _, pid = path.stem[len('audit-'):].rpartition('-')
+        return host == socket.gethostname() and pid.isdigit() and not _pid_alive(int(pid))
+
+    @staticmethod
+    def _read_spool(path: Path) -> List[Dict]:
+        rows = []
+        with open(path, encoding='utf-8') as spool:
+            for line in spool:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # Torn last line of a crashed worker
+                    logger.warning('Skipping unreadable audit spool line in %s', path)
+        return rows
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                close_old_connections()
+                self.tick()
+            except Exception:
+                logger.exception('Audit writer tick failed')
+
+    def tick(self) -> None:
+        """Flush a batch that is older than the flush interval and retry left-over spools."""
+        oldest = self._oldest
+        if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+            self.flush()
+        if self._needs_replay:
+            self._needs_replay = False
+            self.replay()
@@ -0,0 +1,163 @@
+"""
+Two-tier cache: a small in-process L1 in front of the shared Django cache (L2).
+
+L1 absorbs repeated reads within a worker without a network round-trip;
+its short TTL bounds how long other workers may serve a value after it
+was invalidated. L2 (Redis) is shared and invalidated explicitly.
+
+VersionedCache builds on it for data invalidated by scope (e.g. everything
+under a forum): entries are keyed by the scope's version counter, so
+bumping the counter invalidates them in every worker at once.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Union
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+_MISSING = object()
+
+
+class TwoTierCache:
+    """Read-through cache with a per-process LRU (L1) and the Django cache (L2).
+
+    `ttl` may be a callable returning the lifetime of a given value (e.g. up
+    to a token's expiry); L1 entries never outlive it, and values with no
+    lifetime left are not stored.
+    """
+
+    def __init__(self, prefix: str, ttl: Union[float, Callable[[Any], float]], local_ttl: float,
+                 max_local_entries: int = 10000):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_local_entries = max_local_entries
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, key: Hashable) -> str:
+        return f'{self.prefix}:{key}'
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Get a value, loading and storing it on a miss of both tiers.
+        
+        Args:
+            key: Cache key (namespaced with the prefix)
+            loader: Callable returning the value from the source of truth
+            
+        Returns:
+            Cached or freshly loaded value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[0] > now:
+                self._local.move_to_end(key)
+                return entry[1]
+
+        value = cache.get(self._key(key), _MISSING)
+        loaded = value is _MISSING
+        if loaded:
+            value = loader()
+        ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+        if ttl <= 0:
+            return value
+        if loaded:
+            cache.set(self._key(key), value, ttl)
+        self._set_local(key, value, now + min(self.local_ttl, ttl))
+        return value
+
+    def _set_local(self, key: Hashable, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._local[key] = (expires_at, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def delete(self, *keys: Hashable) -> None:
+        """Invalidate keys in both tiers (other workers' L1 expire within `local_ttl`)."""
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        cache.delete_many([self._key(key) for key in keys])
+
+    def clear_local(self) -> None:
+        """Drop every L1 entry of this process."""
+        with self._lock:
+            self._local.clear()
+
+
+class VersionedPayload(NamedTuple):
+    """A cached response payload and its ETag."""
+    etag: str
+    data: Any
+
+
+def payload_of(data: Any) -> VersionedPayload:
+    """A payload with the ETag of its content (for data completed after the cache read)."""
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode('utf-8')
+    return VersionedPayload(f'"{hashlib.sha1(content).hexdigest()}"', data)
+
+
+class VersionedCache:
+    """Cache of response payloads per scope, invalidated by bumping the scope's version.
+
+    Versions live in the Django cache and start from a timestamp, so a
+    version lost with the cache is never reused for different content.
+    """
+
+    def __init__(self, prefix: str, ttl: float, max_local_entries: int = 1000):
+        self.prefix = prefix
+        # Entries of a bumped version are never read again, L1 can keep them as long as L2
+        self.entries = TwoTierCache(f'{prefix}:entry', ttl=ttl, local_ttl=ttl, max_local_entries=max_local_entries)
+
+    def _version_key(self, scope: str) -> str:
+        return f'{self.prefix}:version:{scope}'
+
+    def version(self, scope: str) -> int:
+        """Current version of a scope."""
+        key = self._version_key(scope)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    def get(self, scope: str, variant: str, loader: Callable[[], Any]) -> VersionedPayload:
+        """
+        Get a payload of a scope, building it on a miss.
+
+        Args:
+            scope: Invalidation scope (e.g. 'forum:<id>')
+            variant: Which payload of the scope (e.g. page or depth)
+            loader: Callable returning the JSON-serializable payload
+
+        Returns:
+            The payload with an ETag of its content
+        """
+        return self.entries.get(f'{scope}:{self.version(scope)}:{variant}', lambda: self._build(loader))
+
+    @staticmethod
+    def _build(loader: Callable[[], Any]) -> VersionedPayload:
+        return payload_of(loader())
+
+    def bump(self, *scopes: str) -> None:
+        """Invalidate scopes, now and again once the transaction commits."""
+        scopes = list(dict.fromkeys(scopes))
+        if not scopes:
+            return
+        self._bump(scopes)
+        transaction.on_commit(lambda: self._bump(scopes))
+
+    def _bump(self, scopes) -> None:
+        for scope in scopes:
+            try:
+                cache.incr(self._version_key(scope))
+            except ValueError:
+                # No version yet: the next read starts a new one
+                pass
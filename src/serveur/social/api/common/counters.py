@@ -0,0 +1,286 @@
+"""
+Write-behind counters.
+
+Hot counters (likes, comments, posts, members) are not updated in place:
+once the transaction commits, each change adds its delta to a Redis hash
+(HINCRBY, no row lock), and a background flusher applies the deltas of a
+table in batches every `COUNTER_FLUSH_INTERVAL` seconds, with one UPDATE
+per distinct set of deltas. Reads add the deltas not applied yet, pending
+or being flushed, to the stored values (`overlay`).
+
+A flush moves the pending hash aside before applying it and deletes it
+once the UPDATE committed; a flush that failed is retried with the same
+batch, a crash between the commit and the delete applies the batch twice.
+Only one worker flushes a table at a time (Redis lock, extended before
+the batch is applied, which is skipped if the lock was lost). With COUNTER_MODE
+'sync', or while Redis is unreachable, counters are updated in place.
+
+Buffered rows are also remembered in a "touched" set, so the counter
+reconciliation job only recounts rows that changed since its last run.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import redis
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from common.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: pending hash, flushing hash. Returns the batch to apply (HGETALL),
+# starting with a batch left over by a failed flush.
+TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: lock. ARGV: token, TTL (ms). Extends the lock if still held with the token.
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+LOCK_TTL_MS = 30000
+
+counter_buffers: List['CounterBuffer'] = []
+_flusher_pid: Optional[int] = None
+_flusher_lock = threading.Lock()
+
+
+def counters_buffered() -> bool:
+    return getattr(settings, 'COUNTER_MODE', 'buffered') == 'buffered'
+
+
+def apply_deltas(model, rows: Dict[str, Dict[str, int]], update_fields: Optional[Callable[[Dict[str, int]], Dict]] = None) -> int:
+    """
+    Add deltas to the counters of many rows, with one UPDATE per distinct set of deltas.
+
+    Args:
+        model: Model holding the counters
+        rows: Deltas per row {pk: {column: delta}}
+        update_fields: Builds the update() kwargs applying deltas (defaults to `column = column + delta`)
+
+    Returns:
+        Number of rows given
+    """
+    update_fields = update_fields or (lambda deltas: {c: F(c) + d for c, d in deltas.items()})
+    groups = defaultdict(list)
+    for pk, deltas in rows.items():
+        groups[tuple(sorted(deltas.items()))].append(pk)
+    with transaction.atomic():
+        for deltas, pks in groups.items():
+            model.objects.filter(pk__in=sorted(pks)).update(**update_fields(dict(deltas)))
+    return len(rows)
+
+
+class CounterBuffer:
+    """Buffered integer counters of one model."""
+
+    def __init__(self, model, columns: Sequence[str], update_fields: Optional[Callable[[Dict[str, int]], Dict]] = None,
+                 on_applied: Optional[Callable[[List[str]], None]] = None):
+        """
+        Args:
+            model: Model holding the counters
+            columns: Counter columns
+            update_fields: Builds the update() kwargs applying deltas {column: delta}
+                (defaults to `column = column + delta`)
+            on_applied: Called with the primary keys of rows whose stored counters changed
+                (e.g. to invalidate cached copies of them)
+        """
+        self.model = model
+        self.columns = tuple(columns)
+        self.update_fields = update_fields or (lambda deltas: {c: F(c) + d for c, d in deltas.items()})
+        self.on_applied = on_applied
+        table = model._meta.db_table
+        self.pending_key = f'counters:pending:{table}'
+        self.flushing_key = f'counters:flushing:{table}'
+        self.lock_key = f'counters:lock:{table}'
+        self.touched_key = f'counters:touched:{table}'
+        counter_buffers.append(self)
+
+    def add(self, pk, **deltas: int) -> None:
+        """
+        Add deltas to the counters of a row, once the current transaction commits.
+
+        Args:
+            pk: Row primary key
+            **deltas: Delta per counter column
+        """
+        deltas = {column: delta for column, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if not counters_buffered():
+            self.apply(pk, deltas)
+            return
+        transaction.on_commit(lambda: self._push(str(pk), deltas))
+
+    def apply(self, pk, deltas: Dict[str, int]) -> None:
+        """Update the counters of a row in place."""
+        self.model.objects.filter(pk=pk).update(**self.update_fields(deltas))
+        self.applied([str(pk)])
+
+    def applied(self, pks: List[str]) -> None:
+        """Notify that the stored counters of rows changed."""
+        if self.on_applied is not None and pks:
+            self.on_applied(pks)
+
+    def _push(self, pk: str, deltas: Dict[str, int]) -> None:
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for column, delta in deltas.items():
+                pipe.hincrby(self.pending_key, f'{pk}:{column}', delta)
+            pipe.sadd(self.touched_key, pk)
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning('Redis unreachable, updating counters of %s in place', self.model.__name__, exc_info=True)
+            self.apply(pk, deltas)
+            return
+        _ensure_flusher()
+
+    def overlay(self, objects: Iterable) -> None:
+        """Add the pending and flushing deltas to the counters of model instances (one Redis round trip)."""
+        objects = list({id(obj): obj for obj in objects if obj is not None}.values())
+        if not objects or not counters_buffered():
+            return
+        fields = [f'{obj.pk}:{column}' for obj in objects for column in self.columns]
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hmget(self.pending_key, fields)
+            pipe.hmget(self.flushing_key, fields)
+            pending, flushing = pipe.execute()
+        except redis.RedisError:
+            logger.warning('Redis unreachable, serving stored counters', exc_info=True)
+            return
+        values = iter(zip(pending, flushing))
+        for obj in objects:
+            for column in self.columns:
+                delta = sum(int(value) for value in next(values) if value)
+                if delta:
+                    setattr(obj, column, getattr(obj, column) + delta)
+
+    def pending(self, pk) -> Dict[str, int]:
+        """Pending deltas of a row."""
+        values = get_redis().hmget(self.pending_key, [f'{pk}:{column}' for column in self.columns])
+        return {column: int(value) for column, value in zip(self.columns, values) if value}
+
+    def acquire(self, wait: float = 0) -> Optional[str]:
+        """
+        Take the flush lock of the table.
+
+        Args:
+            wait: Seconds to retry while another worker holds it
+
+        Returns:
+            The lock token (see release), or None when the lock is held elsewhere
+        """
+        client = get_redis()
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while not client.set(self.lock_key, token, nx=True, px=LOCK_TTL_MS):
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+        return token
+
+    def extend(self, token: str) -> bool:
+        """Give the flush lock a full TTL again; False when it expired and was lost."""
+        return bool(get_redis().eval(EXTEND_SCRIPT, 1, self.lock_key, token, LOCK_TTL_MS))
+
+    def release(self, token: str) -> None:
+        """Release the flush lock if still held with the token."""
+        get_redis().eval(RELEASE_SCRIPT, 1, self.lock_key, token)
+
+    def touched(self) -> List[str]:
+        """Rows buffered since the last `untouch` (primary keys as strings)."""
+        return [pk.decode() for pk in get_redis().smembers(self.touched_key)]
+
+    def untouch(self, pks: Iterable[str]) -> None:
+        """Forget touched rows once they were reconciled."""
+        pks = list(pks)
+        if pks:
+            get_redis().srem(self.touched_key, *pks)
+
+    def flush(self) -> int:
+        """
+        Apply the pending deltas to the database.
+
+        Returns:
+            Number of rows updated (0 when another worker is flushing)
+        """
+        token = self.acquire()
+        if token is None:
+            return 0
+        try:
+            client = get_redis()
+            raw = client.eval(TAKE_SCRIPT, 2, self.pending_key, self.flushing_key)
+            rows = defaultdict(dict)
+            for field, value in zip(raw[::2], raw[1::2]):
+                pk, column = field.decode().rsplit(':', 1)
+                if int(value) and column in self.columns:
+                    rows[pk][column] = int(value)
+
+            # Another worker may have taken an expired lock and applied this batch already
+            if not self.extend(token):
+                logger.warning('Lost the %s counter flush lock, leaving the batch to its holder', self.model.__name__)
+                return 0
+            apply_deltas(self.model, rows, self.update_fields)
+            client.delete(self.flushing_key)
+            self.applied(list(rows))
+            return len(rows)
+        finally:
+            self.release(token)
+
+
+def flush_counters() -> int:
+    """Flush every counter buffer. Returns the number of rows updated."""
+    updated = 0
+    for buffer in counter_buffers:
+        try:
+            updated += buffer.flush()
+        except (redis.RedisError, DatabaseError):
+            logger.exception('Flushing %s counters failed', buffer.model.__name__)
+    return updated
+
+
+def _ensure_flusher() -> None:
+    global _flusher_pid
+    if _flusher_pid == os.getpid() or not getattr(settings, 'COUNTER_FLUSH_INTERVAL', 0.5):
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        # Also true in a forked worker: the parent's thread is not running here
+        _flusher_pid = os.getpid()
+        threading.Thread(target=_run, name='counter-flusher', daemon=True).start()
+    atexit.register(flush_counters)
+
+
+def _run() -> None:
+    while True:
+        time.sleep(getattr(settings, 'COUNTER_FLUSH_INTERVAL', 0.5))
+        try:
+            close_old_connections()
+            flush_counters()
+        except Exception:
+            logger.exception('Counter flush failed')
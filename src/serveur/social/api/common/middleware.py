@@ -0,0 +1,15 @@
+"""
+Project middleware.
+"""
+from db.repositories.entity_cache import identity_map
+
+
+class IdentityMapMiddleware:
+    """Scope the entity identity map (see db.repositories.entity_cache) to each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map():
+            return self.get_response(request)
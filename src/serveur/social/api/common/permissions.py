@@ -84,12 +84,7 @@ class IsNotBlocked(rf_permissions.BasePermission):
         current_user_id = str(request.user.user_id)
         
         # Check if either user has blocked the other
-        if BlockRepository.is_blocked(current_user_id, target_user_id):
-            return False
-        if BlockRepository.is_blocked(target_user_id, current_user_id):
-            return False
-        
-        return True
+        return not BlockRepository.is_blocked_either_way(current_user_id, target_user_id)
 
 
 class CanViewProfile(rf_permissions.BasePermission):
@@ -0,0 +1,234 @@
+"""
+In-process prefix index for autocomplete.
+
+Each worker keeps the names of a table in a sorted array (casefolded,
+accents stripped, one entry per word start), so completing a prefix is a
+binary search instead of a query. Creations bump a version counter in the
+Django cache: a worker that sees a new version loads only the rows created
+since its newest one (minus an overlap, for transactions that committed
+late) and inserts them into a copy of the array. Renames and deletions call
+`invalidate()`, which makes every worker rebuild; workers also rebuild
+every `rebuild_interval` seconds. Callers re-read the matched rows by
+primary key, which drops entries gone stale in the meantime.
+
+The array is never modified once published: searches read one snapshot
+reference, catch-ups and rebuilds swap in a new one. Full rebuilds run in
+a background thread while the previous snapshot is served (with
+AUTOCOMPLETE_REBUILD_MODE 'background'; 'sync' rebuilds inline). Until a
+worker's first build completes, searches fall back to a prefix query on
+the name column.
+"""
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from typing import Any, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Characters starting a new word inside a name
+WORD_SEPARATORS = ' -_.\''
+
+
+def fold(text: str) -> str:
+    """Normalize a name or prefix: casefolded, accents stripped."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def index_keys(name: str) -> List[str]:
+    """Keys of a name (folded): the whole name, then from each word start on."""
+    keys = [name]
+    for i, char in enumerate(name[:-1]):
+        if char in WORD_SEPARATORS and name[i + 1] not in WORD_SEPARATORS:
+            keys.append(name[i + 1:])
+    return keys
+
+
+def matches(name: str, prefix: str) -> bool:
+    """Whether a name is completed by a prefix (as indexed)."""
+    prefix = fold(prefix)
+    return any(key.startswith(prefix) for key in index_keys(fold(name)))
+
+
+class Snapshot(NamedTuple):
+    """A published state of an index (never modified)."""
+    entries: List[Tuple[str, str, Any]]
+    pks: FrozenSet
+    newest: Any
+    # Shared (version, generation) the snapshot is up to date with
+    state: Tuple[int, int]
+    built_at: float
+
+
+class PrefixIndex:
+    """Sorted (key, folded name, pk) array of a name column, kept in sync across workers."""
+
+    def __init__(self, name: str, model, field: str, rebuild_interval: float = 600,
+                 overlap: timedelta = timedelta(minutes=1)):
+        self.name = name
+        self.model = model
+        self.field = field
+        self.rebuild_interval = rebuild_interval
+        self.overlap = overlap
+        self._snapshot: Optional[Snapshot] = None
+        self._rebuilding = False
+        self._rebuilder: Optional[threading.Thread] = None
+        # Serializes catch-ups and swaps, never held by searches
+        self._lock = threading.Lock()
+
+    def _keys(self) -> Tuple[str, str]:
+        return f'prefix_index:{self.name}:version', f'prefix_index:{self.name}:generation'
+
+    def _shared_state(self) -> Tuple[int, int]:
+        """(version, generation) from the Django cache, in one round-trip."""
+        keys = self._keys()
+        state = cache.get_many(keys)
+        for key in keys:
+            if key not in state:
+                cache.add(key, time.time_ns(), None)
+                state[key] = cache.get(key)
+        return state[keys[0]], state[keys[1]]
+
+    def _rows(self, since=None) -> Iterable[Tuple[Any, str, Any]]:
+        queryset = self.model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        return queryset.values_list('pk', self.field, 'created_at').iterator(chunk_size=5000)
+
+    @staticmethod
+    def _entries_of(pk, name: str) -> List[Tuple[str, str, Any]]:
+        # Equal keys (a name and a word of another) sort by the whole name
+        name = fold(name)
+        return [(key, name, pk) for key in index_keys(name)]
+
+    def rebuild(self) -> None:
+        """Build the index from the whole table and publish it."""
+        state = self._shared_state()
+        entries, pks, newest = [], set(), None
+        for pk, name, created_at in self._rows():
+            pks.add(pk)
+            entries.extend(self._entries_of(pk, name))
+            newest = created_at if newest is None or created_at > newest else newest
+        entries.sort()
+        snapshot = Snapshot(entries, frozenset(pks), newest, state, time.monotonic())
+        with self._lock:
+            self._snapshot = snapshot
+
+    def _rebuild_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Rebuilding the %s prefix index failed', self.name)
+            finally:
+                self._rebuilding = False
+                connection.close()
+
+        self._rebuilder = threading.Thread(target=run, name=f'prefix-index-{self.name}', daemon=True)
+        self._rebuilder.start()
+
+    def _catch_up(self, version: int) -> None:
+        """Publish a copy of the snapshot with the rows created since its newest one."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.state[0] == version:
+                return
+            if snapshot.newest is None:
+                added, newest = list(self._rows()), None
+            else:
+                added, newest = list(self._rows(snapshot.newest - self.overlap)), snapshot.newest
+            entries, pks = snapshot.entries, snapshot.pks
+            new = [(pk, name) for pk, name, _ in added if pk not in pks]
+            if new:
+                entries, pks = list(entries), set(pks)
+                for pk, name in new:
+                    pks.add(pk)
+                    for entry in self._entries_of(pk, name):
+                        bisect.insort(entries, entry)
+                pks = frozenset(pks)
+            for _, _, created_at in added:
+                newest = created_at if newest is None or created_at > newest else newest
+            # Only the version is caught up: a pending generation change still rebuilds
+            self._snapshot = Snapshot(entries, pks, newest, (version, snapshot.state[1]), snapshot.built_at)
+
+    def _refresh(self) -> Optional[Snapshot]:
+        """Bring the snapshot up to date (rebuilding in the background if needed) and return it."""
+        state = self._shared_state()
+        snapshot = self._snapshot
+        if (snapshot is None or state[1] != snapshot.state[1]
+                or time.monotonic() - snapshot.built_at >= self.rebuild_interval):
+            if getattr(settings, 'AUTOCOMPLETE_REBUILD_MODE', 'background') == 'sync':
+                self.rebuild()
+                return self._snapshot
+            self._rebuild_in_background()
+            if snapshot is None:
+                return None
+        if state[0] != snapshot.state[0]:
+            self._catch_up(state[0])
+        return self._snapshot
+
+    def search(self, prefix: str, limit: int) -> List[Any]:
+        """
+        Primary keys of the names completed by a prefix, in key order.
+
+        Args:
+            prefix: Typed prefix (of the name or of one of its words)
+            limit: Maximum number of keys
+
+        Returns:
+            Distinct primary keys
+        """
+        prefix = fold(prefix)
+        if not prefix or limit <= 0:
+            return []
+        snapshot = self._refresh()
+        if snapshot is None:
+            # First build still running: whole-name prefixes only, accents not folded
+            return list(self.model.objects.filter(**{f'{self.field}__istartswith': prefix})
+                        .order_by(self.field).values_list('pk', flat=True)[:limit])
+        entries = snapshot.entries
+        found = {}
+        i = bisect.bisect_left(entries, (prefix,))
+        while i < len(entries) and len(found) < limit:
+            key, _, pk = entries[i]
+            if not key.startswith(prefix):
+                break
+            found[pk] = None
+            i += 1
+        return list(found)
+
+    def added(self) -> None:
+        """Signal new rows: now, and again once the transaction commits."""
+        self._bump()
+        transaction.on_commit(self._bump)
+
+    def _bump(self) -> None:
+        try:
+            cache.incr(self._keys()[0])
+        except ValueError:
+            # No version yet: the next search starts one, which every worker sees as a change
+            pass
+
+    def invalidate(self) -> None:
+        """Make every worker rebuild (names changed or rows removed), now and on commit."""
+        self._new_generation()
+        transaction.on_commit(self._new_generation)
+
+    def _new_generation(self) -> None:
+        cache.set(self._keys()[1], time.time_ns(), None)
+
+    def reset(self) -> None:
+        """Drop this worker's copy; the next search rebuilds it."""
+        with self._lock:
+            self._snapshot = None
@@ -1,14 +1,366 @@
 """
 Rate limiting decorators and utilities.
+
+Limits are enforced with GCRA (generic cell rate algorithm): a limit of
+N requests per period behaves as a bucket of N tokens refilled evenly
+over the period. Each check is one atomic Lua script on Redis (a single
+round trip, no race between read and write), keyed per limiter and user.
+When Redis is unreachable, checks fall back to the same algorithm in
+process memory (per worker) until Redis answers again.
+
+Hot limiters can be two-tier (TwoTierRateLimiter): each worker decides
+locally from its last view of the Redis state and pushes the hits it
+served in the background, trading bounded overshoot for latency.
 """
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from django.core.cache import cache
+from typing import NamedTuple, Optional
+import redis
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
+from common.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: limiter key; ARGV: emission interval (ms per request), limit,
+# hits already served elsewhere (counted unconditionally), whether to check
+# one more request. Stores the theoretical arrival time (TAT) in ms; returns
+# {allowed, remaining, ms until fully reset, ms until retry, TAT}.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local served = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+tat = tat + served * emission
+local allowed = 0
+local retry = 0
+if ARGV[4] == '1' then
+    local allow_at = tat + emission - emission * limit
+    if allow_at > now then
+        retry = allow_at - now
+    else
+        tat = tat + emission
+        allowed = 1
+    end
+end
+if tat > now then
+    redis.call('SET', KEYS[1], tat, 'PX', tat - now)
+end
+local remaining = math.max(0, math.floor((now + emission * limit - tat) / emission))
+return {allowed, remaining, tat - now, retry, tat}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the full quota is available again
+    retry_after: float  # seconds until the next request is allowed (0 when allowed)
+
+
+def _emission_ms(limit: int, period: int) -> int:
+    return max(1, math.ceil(period * 1000 / limit))
+
+
+class LocalRateLimiter:
+    """In-process GCRA with the same semantics, used while Redis is unreachable."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        emission = _emission_ms(limit, period)
+        now = int(time.monotonic() * 1000)
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + emission
+            allow_at = new_tat - emission * limit
+            if allow_at > now:
+                return RateLimitResult(False, limit, 0, (tat - now) / 1000, (allow_at - now) / 1000)
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return RateLimitResult(True, limit, (now - allow_at) // emission, (new_tat - now) / 1000, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+
+local_limiter = LocalRateLimiter()
+_gcra = None
+_redis_retry_at = 0.0
+
+
+def _redis_available() -> bool:
+    return time.monotonic() >= _redis_retry_at
+
+
+def _redis_failed() -> None:
+    global _redis_retry_at
+    # Don't pay a connection timeout on every request while Redis is down
+    _redis_retry_at = time.monotonic() + getattr(settings, 'RATE_LIMIT_REDIS_RETRY', 5)
+    logger.warning('Redis unreachable, rate limiting in process memory', exc_info=True)
+
+
+def _redis_gcra(key: str, limit: int, period: int, served: int = 0, check: bool = True, client=None):
+    """Run the GCRA script for a key (raises redis.RedisError)."""
+    global _gcra
+    if _gcra is None:
+        _gcra = get_redis().register_script(GCRA_SCRIPT)
+    return _gcra(keys=[f'rate_limit:gcra:{key}'], args=[_emission_ms(limit, period), limit, served, int(check)],
+                 client=client)
+
+
+def check_rate_limit(key: str, limit: int, period: int) -> RateLimitResult:
+    """
+    Count one request against a limit.
+    
+    Args:
+        key: Limiter key (limiter name and client identifier)
+        limit: Maximum number of requests
+        period: Time period in seconds
+        
+    Returns:
+        Whether the request is allowed, with the remaining quota and reset times
+    """
+    if _redis_available():
+        try:
+            allowed, remaining, reset_ms, retry_ms, _ = _redis_gcra(key, limit, period)
+            return RateLimitResult(bool(allowed), limit, int(remaining), reset_ms / 1000, retry_ms / 1000)
+        except redis.RedisError:
+            _redis_failed()
+    return local_limiter.hit(key, limit, period)
+
+
+STAT_FIELDS = ('local_checks', 'redis_checks', 'synced_hits', 'overshoot_hits')
+
+
+class _Bucket:
+    __slots__ = ('tat', 'pending')
+
+    def __init__(self, tat: float):
+        self.tat = tat  # last known TAT (epoch ms) plus the hits served here since
+        self.pending = 0  # hits served here and not yet pushed to Redis
 
 
-def rate_limit(key_prefix: str, limit: int, period: int):
+class TwoTierRateLimiter:
+    """
+    Rate limiter deciding in process memory and syncing with Redis in the background.
+
+    The first check of a key in a worker goes to Redis. After that, the
+    worker decides from its copy of the key's TAT, and a background thread
+    pushes the hits it served every `sync_interval` seconds (one pipelined
+    round trip for all keys), pulling back the global TAT. A worker serves
+    at most `local_budget` hits of a key between two syncs; the next one is
+    checked against Redis synchronously. Overshoot is therefore bounded by
+    about `local_budget` requests per worker, key and sync interval.
+
+    stats() reports how many checks were decided locally and how many of
+    the synced hits were over the limit; the same counters are accumulated
+    in Redis (`rate_limit:stats:<name>`) for the rate_limit_stats command.
+    """
+
+    def __init__(self, name: str, limit: int, period: int, sync_interval: float = 0.25,
+                 local_budget: int = 5, max_keys: int = 10000):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.sync_interval = sync_interval
+        self.local_budget = local_budget
+        self.max_keys = max_keys
+        self.emission = _emission_ms(limit, period)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid: Optional[int] = None
+        self._buckets: 'OrderedDict[str, _Bucket]' = OrderedDict()
+        self._dirty = set()
+        self._totals = dict.fromkeys(STAT_FIELDS, 0)
+        self._reported = dict.fromkeys(STAT_FIELDS, 0)
+
+    @property
+    def stats_key(self) -> str:
+        return f'rate_limit:stats:{self.name}'
+
+    def check(self, client_id: str) -> RateLimitResult:
+        """
+        Count one request of a client against the limit.
+
+        Args:
+            client_id: Client identifier (user ID or IP address)
+
+        Returns:
+            Whether the request is allowed, with the remaining quota and reset times
+        """
+        self._ensure_syncer()
+        key = f'{self.name}:{client_id}'
+        now = time.time() * 1000
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket.pending < self.local_budget:
+                self._buckets.move_to_end(key)
+                self._dirty.add(key)
+                self._totals['local_checks'] += 1
+                return self._hit(bucket, now)
+            # Unknown key or local budget spent: take the pending hits along
+            served = bucket.pending if bucket is not None else 0
+            if bucket is not None:
+                bucket.pending = 0
+
+        if _redis_available():
+            try:
+                allowed, remaining, reset_ms, retry_ms, tat = _redis_gcra(
+                    key, self.limit, self.period, served=served
+                )
+            except redis.RedisError:
+                _redis_failed()
+            else:
+                with self._lock:
+                    self._merge(key, tat)
+                    self._totals['redis_checks'] += 1
+                    self._totals['synced_hits'] += served
+                return RateLimitResult(bool(allowed), self.limit, int(remaining), reset_ms / 1000, retry_ms / 1000)
+
+        with self._lock:
+            if bucket is not None:
+                bucket.pending += served
+        return local_limiter.hit(key, self.limit, self.period)
+
+    def _hit(self, bucket: _Bucket, now: float) -> RateLimitResult:
+        tat = max(bucket.tat, now)
+        allow_at = tat + self.emission - self.emission * self.limit
+        if allow_at > now:
+            return RateLimitResult(False, self.limit, 0, (tat - now) / 1000, (allow_at - now) / 1000)
+        bucket.tat = tat + self.emission
+        bucket.pending += 1
+        remaining = int((now + self.emission * self.limit - bucket.tat) // self.emission)
+        return RateLimitResult(True, self.limit, remaining, (bucket.tat - now) / 1000, 0)
+
+    def _merge(self, key: str, tat: float) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(tat)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tat = max(bucket.tat, tat)
+            self._buckets.move_to_end(key)
+
+    def sync(self) -> int:
+        """
+        Push the hits served locally to Redis and pull back the global state.
+
+        Returns:
+            Number of keys synced
+        """
+        with self._lock:
+            batch = []
+            for key in self._dirty:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    batch.append((key, bucket.pending))
+                    bucket.pending = 0
+            self._dirty.clear()
+            unreported = {field: self._totals[field] - self._reported[field] for field in STAT_FIELDS}
+        if not batch and not any(unreported.values()):
+            return 0
+
+        results = None
+        if _redis_available():
+            try:
+                pipe = get_redis().pipeline(transaction=False)
+                for key, served in batch:
+                    _redis_gcra(key, self.limit, self.period, served=served, check=False, client=pipe)
+                for field, count in unreported.items():
+                    if count:
+                        pipe.hincrby(self.stats_key, field, count)
+                results = pipe.execute()
+            except redis.RedisError:
+                _redis_failed()
+
+        with self._lock:
+            if results is None:
+                # Keep the hits for the next sync
+                for key, served in batch:
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        bucket.pending += served
+                        self._dirty.add(key)
+                return 0
+            for field, count in unreported.items():
+                self._reported[field] += count
+            for (key, served), (_, _, reset_ms, _, tat) in zip(batch, results):
+                self._merge(key, tat)
+                # Hits beyond the full quota right now, at most the ones served here
+                over = math.ceil((reset_ms - self.emission * self.limit) / self.emission)
+                self._totals['synced_hits'] += served
+                self._totals['overshoot_hits'] += min(served, max(0, over))
+        return len(batch)
+
+    def stats(self) -> dict:
+        """Counters of this worker since it started."""
+        with self._lock:
+            return dict(self._totals, sync_interval=self.sync_interval, local_budget=self.local_budget)
+
+    def clear(self) -> None:
+        """Forget the local state (unsynced hits are dropped)."""
+        with self._lock:
+            self._buckets.clear()
+            self._dirty.clear()
+
+    def _ensure_syncer(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked worker: the parent's buckets and counters are not ours
+                self._reset()
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=f'rate-limit-sync-{self.name}', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception:
+                logger.exception('Rate limit sync failed for %s', self.name)
+
+
+# Two-tier limiters by key prefix
+two_tier_limiters = {}
+
+
+def _set_headers(response, result: RateLimitResult) -> None:
+    response['X-RateLimit-Limit'] = str(result.limit)
+    response['X-RateLimit-Remaining'] = str(result.remaining)
+    response['X-RateLimit-Reset'] = str(math.ceil(result.reset_after))
+    if not result.allowed:
+        response['Retry-After'] = str(math.ceil(result.retry_after))
+
+
+def rate_limit(key_prefix: str, limit: int, period: int, sync_interval: Optional[float] = None,
+               local_budget: int = 5):
     """
     Rate limiting decorator.
     
@@ -16,7 +368,15 @@ def rate_limit(key_prefix: str, limit: int, period: int):
         key_prefix: Prefix for the cache key
         limit: Maximum number of requests
         period: Time period in seconds
+        sync_interval: Decide in process memory and sync with Redis this often
+            (seconds, see TwoTierRateLimiter); None or 0 checks Redis on every request
+        local_budget: Hits per client a worker may serve between two syncs
     """
+    two_tier = None
+    if sync_interval:
+        two_tier = TwoTierRateLimiter(key_prefix, limit, period, sync_interval, local_budget)
+        two_tier_limiters[key_prefix] = two_tier
+
     def decorator(func):
         @wraps(func)
         def wrapper(self, request, *args, **kwargs):
@@ -31,29 +391,29 @@ def rate_limit(key_prefix: str, limit: int, period: int):
                 # Use IP address for anonymous users
                 user_id = get_client_ip(request)
             
-            # Create cache key
-            cache_key = f"rate_limit:{key_prefix}:{user_id}"
-            
-            # Get current count
-            current_count = cache.get(cache_key, 0)
+            if two_tier is not None:
+                result = two_tier.check(user_id)
+            else:
+                result = check_rate_limit(f"{key_prefix}:{user_id}", limit, period)
             
             # Check if limit exceeded
-            if current_count >= limit:
-                return Response(
+            if not result.allowed:
+                response = Response(
                     {
                         'error': {
                             'code': 'RATE_LIMIT_EXCEEDED',
-                            'message': f'Rate limit exceeded. Try again in {period} seconds.',
+                            'message': f'Rate limit exceeded. Try again in {math.ceil(result.retry_after)} seconds.',
                         }
                     },
                     status=status.HTTP_429_TOO_MANY_REQUESTS
                 )
-            
-            # Increment counter
-            cache.set(cache_key, current_count + 1, period)
+                _set_headers(response, result)
+                return response
             
             # Call the original function
-            return func(self, request, *args, **kwargs)
+            response = func(self, request, *args, **kwargs)
+            _set_headers(response, result)
+            return response
         
         return wrapper
     return decorator
@@ -70,6 +430,13 @@ def get_client_ip(request):
 
 
 # Predefined rate limiters
+_general_limit = rate_limit(
+    'general', 100, 3600,
+    sync_interval=getattr(settings, 'RATE_LIMIT_SYNC_INTERVAL', 0.25),
+    local_budget=getattr(settings, 'RATE_LIMIT_LOCAL_BUDGET', 5),
+)
+
+
 def rate_limit_auth(func):
     """Rate limit for authentication endpoints: 10 requests per minute."""
     return rate_limit('auth', 10, 60)(func)
@@ -116,6 +483,6 @@ def rate_limit_block(func):
 
 
 def rate_limit_general(func):
-    """General rate limit: 100 requests per hour."""
-    return rate_limit('general', 100, 3600)(func)
+    """General rate limit: 100 requests per hour, decided locally between syncs (read endpoints)."""
+    return _general_limit(func)
 
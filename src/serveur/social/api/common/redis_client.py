@@ -0,0 +1,30 @@
+"""
+Shared raw Redis client.
+
+The Django cache API has no server-side scripting; features that need
+atomic read-modify-write operations (e.g. rate limiting) use this client.
+It talks to the cache's Redis with short timeouts, so callers can fall
+back quickly when Redis is unreachable.
+"""
+import threading
+from typing import Optional
+import redis
+from django.conf import settings
+
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    """Get the process-wide Redis client (connections are pooled and opened lazily)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                timeout = getattr(settings, 'REDIS_SOCKET_TIMEOUT', 0.5)
+                _client = redis.Redis.from_url(
+                    settings.CACHES['default']['LOCATION'],
+                    socket_timeout=timeout,
+                    socket_connect_timeout=timeout,
+                )
+    return _client
@@ -0,0 +1,60 @@
+"""
+Time-decayed trending ("hot") score for posts.
+
+Reddit-style: hot = log10(1 + likes + 2 * comments) + (created_at - epoch) / gravity.
+Engagement counts logarithmically and every `TRENDING_GRAVITY_SECONDS` of
+age weighs as much as a tenfold engagement difference, so old viral posts
+sink without rescoring the whole table. The score only changes when counts
+change, which keeps it indexable and incrementally maintainable.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Cast, Extract, Greatest, Log
+
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+COMMENT_WEIGHT = 2
+
+
+def get_gravity() -> float:
+    """Seconds of age worth a tenfold engagement difference."""
+    return float(getattr(settings, 'TRENDING_GRAVITY_SECONDS', 45000))
+
+
+def compute_hot_score(like_count: int, comment_count: int, created_at: datetime) -> float:
+    """
+    Compute the hot score of a post in Python.
+    
+    Args:
+        like_count: Number of likes
+        comment_count: Number of comments
+        created_at: Post creation time (aware)
+        
+    Returns:
+        Hot score
+    """
+    engagement = max(like_count + COMMENT_WEIGHT * comment_count, 0)
+    return math.log10(1 + engagement) + (created_at - TRENDING_EPOCH).total_seconds() / get_gravity()
+
+
+def hot_score_expression(like_count=None, comment_count=None):
+    """
+    Build the SQL expression of the hot score, for use in UPDATE statements.
+    
+    Args:
+        like_count: Expression for the new like count (defaults to F('like_count'))
+        comment_count: Expression for the new comment count (defaults to F('comment_count'))
+        
+    Returns:
+        Float expression
+    """
+    like_count = like_count if like_count is not None else F('like_count')
+    comment_count = comment_count if comment_count is not None else F('comment_count')
+    engagement = Cast(Greatest(like_count + COMMENT_WEIGHT * comment_count, Value(0)) + 1, FloatField())
+    # Extract in UTC: the default connection time zone would shift the epoch
+    age = Cast(Extract('created_at', 'epoch', tzinfo=dt_timezone.utc), FloatField()) - Value(TRENDING_EPOCH.timestamp())
+    return ExpressionWrapper(
+        Log(Value(10.0), engagement) + age / Value(get_gravity()),
+        output_field=FloatField()
+    )
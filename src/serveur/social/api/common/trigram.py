@@ -0,0 +1,45 @@
+"""
+Trigram (pg_trgm) search on name columns.
+
+Usernames and forum names carry a GIN `gin_trgm_ops` index on
+UPPER(name::text), the expression Django's `icontains` filters on, so both
+substring matches and word similarity matches (`%>`: the query is close to
+a part of the name, which tolerates typos) are index scans.
+"""
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db.models import BooleanField, ExpressionWrapper, Q, TextField
+from django.db.models.functions import Cast, Upper
+
+
+def trigram_index_expression(field: str) -> Upper:
+    """Indexed expression of a name column: UPPER(field::text)."""
+    return Upper(Cast(field, output_field=TextField()))
+
+
+def trigram_search(queryset, field: str, query: str):
+    """
+    Filter and rank a queryset by a name column.
+
+    Names containing the query (case-insensitive) come first, then names
+    similar to one of its words, each by decreasing word similarity, then
+    similarity of the whole name.
+
+    Args:
+        queryset: Queryset to search
+        field: Name column
+        query: Search query
+
+    Returns:
+        Filtered and ordered queryset
+    """
+    contains = Q(**{f'{field}__icontains': query})
+    return (
+        queryset.alias(trigram_name=trigram_index_expression(field))
+        .filter(contains | Q(trigram_name__trigram_word_similar=query))
+        .annotate(
+            contains_query=ExpressionWrapper(contains, output_field=BooleanField()),
+            word_similarity=TrigramWordSimilarity(query, field),
+            similarity=TrigramSimilarity(field, query),
+        )
+        .order_by('-contains_query', '-word_similarity', '-similarity', field)
+    )
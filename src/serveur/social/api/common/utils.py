@@ -4,8 +4,16 @@ Common utility functions.
 import hashlib
 import hmac
 import secrets
-from typing import Optional
+import uuid
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
 from django.conf import settings
+from django.core import signing
+from django.utils.http import parse_etags
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+from common.exceptions import ValidationError
 
 
 def generate_content_signature(content: str) -> str:
@@ -132,3 +140,176 @@ def build_pagination_response(items: list, pagination_info: dict, item_serialize
         'pagination': pagination_info,
     }
 
+
+
+CURSOR_SALT = 'common.utils.cursor'
+
+
+class CursorPage(list):
+    """List of results carrying the opaque cursor of the next page (None on the last page)."""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode keyset values into an opaque, signed cursor.
+    
+    Args:
+        values: Values of the ordering fields of the last returned row
+        
+    Returns:
+        URL-safe signed cursor
+    """
+    serialized = []
+    for value in values:
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        serialized.append(value)
+    return signing.dumps(serialized, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor: str, length: Optional[int] = None) -> List[Any]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+    
+    Args:
+        cursor: Signed cursor
+        length: Expected number of values
+        
+    Returns:
+        List of keyset values (datetimes as ISO strings)
+        
+    Raises:
+        ValidationError: If the cursor is tampered with or malformed
+    """
+    try:
+        values = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise ValidationError("Invalid cursor")
+    if not isinstance(values, list) or (length is not None and len(values) != length):
+        raise ValidationError("Invalid cursor")
+    return values
+
+
+def cursor_for(item, ordering: Sequence[str]) -> str:
+    """Build the cursor pointing after `item` for the given ordering."""
+    return encode_cursor([getattr(item, field.lstrip('-')) for field in ordering])
+
+
+def seek_filter(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """
+    Build the keyset condition selecting rows strictly after `values`.
+    
+    The condition is expanded as (a < x) OR (a = x AND b < y) ..., plus a
+    redundant bound on the leading field so the planner can seek on the
+    composite index instead of scanning.
+    
+    Args:
+        ordering: Ordering fields, '-' prefix for descending
+        values: Keyset values of the last returned row
+        
+    Returns:
+        Q object
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values):
+            clause &= Q(**{previous.lstrip('-'): value})
+        condition |= clause
+
+    leading = ordering[0]
+    bound = 'lte' if leading.startswith('-') else 'gte'
+    return Q(**{f'{leading.lstrip("-")}__{bound}': values[0]}) & condition
+
+
+def keyset_paginate(queryset, ordering: Sequence[str], page: int = 1, page_size: int = 20,
+                    cursor: Optional[str] = None) -> CursorPage:
+    """
+    Paginate a queryset by keyset when a cursor is given, by offset otherwise.
+    
+    The ordering must end with a unique field (the primary key) so rows are
+    totally ordered. Either way the returned page carries the cursor of the
+    next page, so clients can switch from `page` to `cursor` at any point.
+    
+    Args:
+        queryset: Django queryset
+        ordering: Ordering fields, '-' prefix for descending
+        page: Page number (1-indexed), ignored when a cursor is given
+        page_size: Number of items per page
+        cursor: Cursor returned with the previous page
+        
+    Returns:
+        CursorPage of items
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(seek_filter(ordering, decode_cursor(cursor, len(ordering))))
+    else:
+        offset = (max(1, page) - 1) * page_size
+        queryset = queryset[offset:]
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = cursor_for(rows[page_size - 1], ordering) if len(rows) > page_size else None
+    return CursorPage(rows[:page_size], next_cursor)
+
+
+def get_cursor_param(request) -> Optional[str]:
+    """Get the `cursor` query parameter (None when absent or empty)."""
+    return request.query_params.get('cursor') or None
+
+
+def build_cursor_response(request, data: list, items, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Build a list response carrying the next-page cursor.
+    
+    Requests using cursor pagination (a `cursor` query parameter, possibly
+    empty for the first page) get `{'results': [...], 'next_cursor': ...}`;
+    page-based requests keep the plain list body. The cursor is always
+    exposed in the `X-Next-Cursor` header.
+    
+    Args:
+        request: DRF request
+        data: Serialized items
+        items: Page returned by the repository (CursorPage or plain list)
+        status_code: HTTP status
+        
+    Returns:
+        Response
+    """
+    next_cursor = getattr(items, 'next_cursor', None)
+    if 'cursor' in request.query_params:
+        body = {'results': data, 'next_cursor': next_cursor}
+    else:
+        body = data
+    response = Response(body, status=status_code)
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def build_etag_response(request, payload) -> Response:
+    """
+    Build a response for a cached payload, honouring `If-None-Match`.
+    
+    Args:
+        request: DRF request
+        payload: VersionedPayload (ETag and data)
+        
+    Returns:
+        304 without a body when the client has the current version, else 200
+    """
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in client_etags or payload.etag in {etag.removeprefix('W/') for etag in client_etags}:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(payload.data, status=status.HTTP_200_OK)
+    response['ETag'] = payload.etag
+    return response
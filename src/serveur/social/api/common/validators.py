@@ -2,6 +2,7 @@
 Input validators and sanitizers.
 """
 import re
+import uuid
 import bleach
 from typing import Optional
 from common.exceptions import ValidationError
@@ -120,6 +121,29 @@ class Validator:
             raise ValidationError(f"Description must be max {max_length} characters")
         
         return Sanitizer.sanitize_html(description)
+    
+    @staticmethod
+    def validate_search_query(query: Optional[str]) -> str:
+        """Validate a full-text search query."""
+        query = (query or '').strip()
+        if not query:
+            raise ValidationError("Search query is required")
+        
+        if len(query) > 200:
+            raise ValidationError("Search query must be max 200 characters")
+        
+        return query
+    
+    @staticmethod
+    def validate_uuid(value: Optional[str], field: str) -> Optional[str]:
+        """Validate an optional UUID parameter."""
+        if not value:
+            return None
+        
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            raise ValidationError(f"{field} must be a valid UUID")
 
 
 class Sanitizer:
@@ -2,8 +2,11 @@
 Domain entity models for database layer.
 """
 import uuid
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.core.validators import MinLengthValidator
+from common.trigram import trigram_index_expression
 from db.entities.user_entity import User
 
 
@@ -57,6 +60,8 @@ class Forum(models.Model):
             models.Index(fields=['creator']),
             models.Index(fields=['forum_name']),
             models.Index(fields=['created_at']),
+            # Substring and similarity search (see common.trigram)
+            GinIndex(OpClass(trigram_index_expression('forum_name'), name='gin_trgm_ops'), name='forums_name_trgm'),
         ]
     
     def __str__(self):
@@ -98,6 +103,9 @@ class Subforum(models.Model):
     subforum_name = models.CharField(max_length=200, validators=[MinLengthValidator(3)])
     description = models.TextField(max_length=1000, null=True, blank=True)
     post_count = models.IntegerField(default=0)
+    # Materialized path: IDs of the forums above this subforum, from the top
+    # forum down to `parent_forum` (empty under a domain)
+    path = ArrayField(models.UUIDField(), default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -106,6 +114,7 @@ class Subforum(models.Model):
             models.Index(fields=['parent_domain']),
             models.Index(fields=['parent_forum']),
             models.Index(fields=['creator']),
+            GinIndex(fields=['path'], name='subforums_path_gin'),
         ]
         constraints = [
             # Ensure exactly one parent is set
@@ -2,7 +2,9 @@
 Message entity models for database layer.
 """
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from db.entities.user_entity import User
 
 
@@ -12,6 +14,8 @@ class Message(models.Model):
     message_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
+    # Ordered pair of participant ids ("<smaller>:<larger>"): one value per conversation
+    conversation_key = models.CharField(max_length=73)
     encrypted_content = models.TextField()
     encryption_key_sender = models.CharField(max_length=512)
     encryption_key_receiver = models.CharField(max_length=512)
@@ -26,6 +30,7 @@ class Message(models.Model):
             models.Index(fields=['sender']),
             models.Index(fields=['receiver']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['conversation_key', '-created_at', '-message_id']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -37,6 +42,76 @@ class Message(models.Model):
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username}"
 
+    @staticmethod
+    def conversation_key_for(user1_id, user2_id) -> str:
+        """Canonical key of the conversation between two users (order-independent)."""
+        low, high = sorted([str(user1_id), str(user2_id)])
+        return f"{low}:{high}"
+
+    def save(self, *args, **kwargs):
+        """Save the message and, when new, fold it into both participants' conversation summaries."""
+        adding = self._state.adding
+        if not self.conversation_key:
+            self.conversation_key = Message.conversation_key_for(self.sender_id, self.receiver_id)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ConversationSummary.record_message(self)
+
+
+class ConversationSummary(models.Model):
+    """
+    Denormalized inbox row of one user for one conversation partner.
+
+    Kept in step with messages (see `Message.save` and MessageRepository)
+    so the inbox is a single indexed range read instead of per-partner
+    last-message and unread-count queries.
+    """
+
+    summary_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_summaries')
+    partner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity_at = models.DateTimeField()
+    unread_count = models.PositiveIntegerField(default=0)
+    # Conversation deleted by `user` (hidden until a new message arrives)
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'conversation_summaries'
+        unique_together = [['user', 'partner']]
+        indexes = [
+            models.Index(fields=['user', 'is_deleted', '-last_activity_at']),
+        ]
+
+    def __str__(self):
+        return f"Conversation of {self.user_id} with {self.partner_id}"
+
+    @classmethod
+    def record_message(cls, message: Message) -> None:
+        """Make the message the last one of both sides (unless deleted for that side) and count it unread."""
+        sides = [
+            (message.sender_id, message.receiver_id, message.deleted_by_sender, 0),
+            (message.receiver_id, message.sender_id, message.deleted_by_receiver, 0 if message.is_read else 1),
+        ]
+        for user_id, partner_id, deleted, unread in sides:
+            if deleted:
+                continue
+            values = {'last_message': message, 'last_activity_at': message.created_at, 'is_deleted': False}
+            updated = cls.objects.filter(user_id=user_id, partner_id=partner_id).update(
+                unread_count=F('unread_count') + unread, **values
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user_id=user_id, partner_id=partner_id, unread_count=unread, **values)
+            except IntegrityError:
+                # Created concurrently by the other participant's first message
+                cls.objects.filter(user_id=user_id, partner_id=partner_id).update(
+                    unread_count=F('unread_count') + unread, **values
+                )
+
 
 class Report(models.Model):
     """Content and user reports."""
@@ -85,6 +160,7 @@ class Report(models.Model):
             models.Index(fields=['reporter']),
             models.Index(fields=['status']),
             models.Index(fields=['target_type', 'target_id']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
@@ -92,7 +168,7 @@ class Report(models.Model):
 
 
 class AuditLog(models.Model):
-    """Audit logging for critical actions."""
+    """Audit logging for critical actions (table partitioned by month, see AuditPartitionRepository)."""
     
     ACTION_TYPE_CHOICES = [
         ('create', 'Create'),
@@ -121,14 +197,15 @@ class AuditLog(models.Model):
     resource_id = models.CharField(max_length=100, null=True, blank=True)
     details = models.TextField(null=True, blank=True)  # JSON details
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the event happens, not when the batched writer stores it
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     
     class Meta:
         db_table = 'audit_logs'
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['action_type']),
-            models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at', '-log_id']),
         ]
     
     def __str__(self):
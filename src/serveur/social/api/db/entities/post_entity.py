@@ -2,10 +2,33 @@
 Post entity models for database layer.
 """
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.core.validators import RegexValidator
 from db.entities.user_entity import User
 from db.entities.domain_entity import Subforum
+from common.trending import compute_hot_score
+
+# Text search configuration per UserSettings.language
+SEARCH_CONFIGS = {'fr': 'french', 'en': 'english'}
+
+
+def search_vector_field(config: str, *weighted_fields) -> models.GeneratedField:
+    """Stored tsvector column kept up to date by Postgres, from (field, weight) pairs."""
+    vector = None
+    for field, weight in weighted_fields:
+        part = SearchVector(field, weight=weight, config=config)
+        vector = part if vector is None else vector + part
+    return models.GeneratedField(expression=vector, output_field=SearchVectorField(), db_persist=True)
+
+
+class SearchableManager(models.Manager):
+    """Leaves the search vectors out of loaded rows: they are only used inside queries."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_fr', 'search_en')
 
 
 class Post(models.Model):
@@ -33,8 +56,15 @@ class Post(models.Model):
     content_signature = models.CharField(max_length=512, null=True, blank=True)
     like_count = models.IntegerField(default=0)
     comment_count = models.IntegerField(default=0)
+    # Time-decayed trending score, see common.trending
+    hot_score = models.FloatField(default=0)
+    # Full-text search: title ranked above content, see db.repositories.search_repository
+    search_fr = search_vector_field('french', ('title', 'A'), ('content', 'B'))
+    search_en = search_vector_field('english', ('title', 'A'), ('content', 'B'))
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SearchableManager()
     
     class Meta:
         db_table = 'posts'
@@ -43,11 +73,21 @@ class Post(models.Model):
             models.Index(fields=['subforum']),
             models.Index(fields=['-created_at']),
             models.Index(fields=['subforum', '-created_at']),
+            models.Index(fields=['-hot_score', '-post_id']),
+            models.Index(fields=['subforum', '-hot_score', '-post_id']),
+            GinIndex(fields=['search_fr'], name='posts_search_fr_gin'),
+            GinIndex(fields=['search_en'], name='posts_search_en_gin'),
         ]
     
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Seed the hot score of new posts (later kept up to date by count updates)."""
+        if self._state.adding and not self.hot_score:
+            self.hot_score = compute_hot_score(self.like_count, self.comment_count, self.created_at or timezone.now())
+        return super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Comments on posts."""
@@ -63,8 +103,12 @@ class Comment(models.Model):
         related_name='replies'
     )
     content = models.TextField(max_length=2000)
+    search_fr = search_vector_field('french', ('content', 'B'))
+    search_en = search_vector_field('english', ('content', 'B'))
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SearchableManager()
     
     class Meta:
         db_table = 'comments'
@@ -74,6 +118,8 @@ class Comment(models.Model):
             models.Index(fields=['parent_comment']),
             models.Index(fields=['-created_at']),
             models.Index(fields=['post', '-created_at']),
+            GinIndex(fields=['search_fr'], name='comments_search_fr_gin'),
+            GinIndex(fields=['search_en'], name='comments_search_en_gin'),
         ]
     
     def __str__(self):
@@ -94,6 +140,7 @@ class Like(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['post']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
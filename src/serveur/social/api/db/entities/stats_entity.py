@@ -0,0 +1,26 @@
+"""
+Statistics entity models for database layer.
+
+Daily rollups of the activity counters shown on admin dashboards, so
+time series are read from one row per day instead of scanning users,
+posts, comments, likes and reports.
+"""
+from django.db import models
+
+
+class DailyStats(models.Model):
+    """Rows created on one day (in TIME_ZONE), filled by the rollup_daily_stats command."""
+
+    day = models.DateField(primary_key=True)
+    new_users = models.IntegerField(default=0)
+    new_posts = models.IntegerField(default=0)
+    new_comments = models.IntegerField(default=0)
+    new_likes = models.IntegerField(default=0)
+    new_reports = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'daily_stats'
+
+    def __str__(self):
+        return f"Stats of {self.day}"
@@ -0,0 +1,44 @@
+"""
+Timeline entity models for database layer.
+
+Materialized home timelines: each user owns a bounded list of post ids
+filled on write (fan-out) so `/feed` pages are a single indexed range read.
+"""
+import uuid
+from django.db import models
+from db.entities.user_entity import User
+from db.entities.post_entity import Post
+
+
+class Timeline(models.Model):
+    """Marker for a materialized (warm) home timeline."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='timeline')
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'timelines'
+
+    def __str__(self):
+        return f"Timeline of {self.user_id}"
+
+
+class TimelineEntry(models.Model):
+    """One post in a user's materialized home timeline."""
+
+    entry_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Denormalized from the post so pages are read from the index alone
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'timeline_entries'
+        unique_together = [['user', 'post']]
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['post']),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.user_id}"
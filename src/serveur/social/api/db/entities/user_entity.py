@@ -2,8 +2,10 @@
 User entity models for database layer.
 """
 import uuid
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.core.validators import RegexValidator
+from common.trigram import trigram_index_expression
 
 
 class User(models.Model):
@@ -39,6 +41,9 @@ class User(models.Model):
             models.Index(fields=['email']),
             models.Index(fields=['firebase_uid']),
             models.Index(fields=['username']),
+            models.Index(fields=['created_at']),
+            # Substring and similarity search (see common.trigram)
+            GinIndex(OpClass(trigram_index_expression('username'), name='gin_trgm_ops'), name='users_username_trgm'),
         ]
     
     def __str__(self):
@@ -0,0 +1,70 @@
+"""
+Django management command to micro-benchmark message encryption.
+
+Compares, for a batch of messages:
+- encryption re-parsing both PEM public keys per message vs. the parsed
+  key cache;
+- decryption one message at a time (private key parsed per message) vs.
+  `decrypt_many` serially and on the thread pool.
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from services.apps_services.encryption_service import EncryptionService
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark message encryption and batch decryption'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Number of messages per run')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        count = options['messages']
+        sender_private, sender_public = EncryptionService.generate_rsa_keypair()
+        _, receiver_public = EncryptionService.generate_rsa_keypair()
+        contents = [f'Message {i}' for i in range(count)]
+
+        def encrypt_uncached():
+            for content in contents:
+                EncryptionService.clear_key_cache()
+                EncryptionService.encrypt_message(content, sender_public, receiver_public)
+
+        def encrypt_cached():
+            for content in contents:
+                EncryptionService.encrypt_message(content, sender_public, receiver_public)
+
+        encrypted = [EncryptionService.encrypt_message(c, sender_public, receiver_public) for c in contents]
+        pairs = [(e['encrypted_content'], e['encryption_key_sender']) for e in encrypted]
+
+        def decrypt_one_by_one():
+            for content, key in pairs:
+                EncryptionService.decrypt_message(content, key, sender_private)
+
+        def decrypt_many_serial():
+            with override_settings(ENCRYPTION_PARALLEL_THRESHOLD=count + 1):
+                EncryptionService.decrypt_many(pairs, sender_private)
+
+        def decrypt_many_threaded():
+            with override_settings(ENCRYPTION_PARALLEL_THRESHOLD=1):
+                EncryptionService.decrypt_many(pairs, sender_private)
+
+        self.stdout.write(f'{count} messages')
+        for label, baseline, candidate in [
+            ('encrypt: key cache', encrypt_uncached, encrypt_cached),
+            ('decrypt: decrypt_many (serial)', decrypt_one_by_one, decrypt_many_serial),
+            ('decrypt: decrypt_many (thread pool)', decrypt_one_by_one, decrypt_many_threaded),
+        ]:
+            before = self._time(baseline)
+            after = self._time(candidate)
+            self.stdout.write(f'{label:<38} {before:9.1f} ms -> {after:9.1f} ms  (x{before / after:.1f})')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    @staticmethod
+    def _time(operation) -> float:
+        """Wall time of `operation` in milliseconds."""
+        start = time.perf_counter()
+        operation()
+        return (time.perf_counter() - start) * 1000
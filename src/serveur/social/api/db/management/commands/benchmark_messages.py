@@ -0,0 +1,111 @@
+"""
+Django management command to benchmark conversation reads and writes as the
+messages table grows.
+
+Filler messages between synthetic users are generated server-side
+(generate_series) up to each requested table size. At every size the
+command times a conversation page, mark-as-read and a soft delete for a
+fixed pair of users, and prints the plan of the page query. With the
+conversation key index, timings should stay flat as the table grows.
+
+Everything runs in one transaction that is rolled back unless --keep is
+given, so it is safe to point at a scratch copy of a real database.
+"""
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from db.entities.user_entity import User
+from db.entities.message_entity import Message
+from db.repositories.message_repository import MessageRepository
+
+FILL_SQL = """
+INSERT INTO messages (
+    message_id, sender_id, receiver_id, conversation_key, encrypted_content,
+    encryption_key_sender, encryption_key_receiver, is_read, deleted_by_sender,
+    deleted_by_receiver, created_at
+)
+SELECT gen_random_uuid(), s, r, LEAST(s, r)::text || ':' || GREATEST(s, r)::text, 'x', 'k', 'k',
+       true, false, false, now() - (g || ' seconds')::interval
+FROM (
+    SELECT g,
+           u[1 + g %% n] AS s,
+           u[1 + (g %% n + 1 + (g / n) %% (n - 1)) %% n] AS r
+    FROM generate_series(%s, %s) AS g,
+         (SELECT %s::uuid[] AS u, %s AS n) AS pool
+) AS pairs
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conversation queries against a growing messages table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Table sizes (filler messages) to measure at, ascending')
+        parser.add_argument('--users', type=int, default=1000, help='Number of synthetic users')
+        parser.add_argument('--conversation-size', type=int, default=500,
+                            help='Messages in the measured conversation')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per operation')
+        parser.add_argument('--keep', action='store_true', help='Commit the generated data')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        with transaction.atomic():
+            run_id = uuid.uuid4().hex[:8]
+            users = User.objects.bulk_create([
+                User(firebase_uid=f'bench-{run_id}-{i}', email=f'bench-{run_id}-{i}@example.com',
+                     username=f'bench_{run_id}_{i}')
+                for i in range(options['users'])
+            ])
+            user_ids = [str(user.user_id) for user in users]
+            alice, bob = user_ids[0], user_ids[1]
+            for i in range(options['conversation_size']):
+                sender, receiver = (alice, bob) if i % 2 else (bob, alice)
+                Message.objects.create(sender_id=sender, receiver_id=receiver, encrypted_content='x',
+                                       encryption_key_sender='k', encryption_key_receiver='k')
+
+            filled = 0
+            self.stdout.write(f"{'messages':>12} {'page p50 ms':>12} {'read p50 ms':>12} {'delete p50 ms':>14}")
+            for size in options['sizes']:
+                if size > filled:
+                    with connection.cursor() as cursor:
+                        cursor.execute(FILL_SQL, [filled + 1, size, user_ids, len(user_ids)])
+                        cursor.execute('ANALYZE messages')
+                    filled = size
+
+                page = self._time(options['runs'], lambda: list(MessageRepository.get_conversation(alice, bob, page_size=50)))
+                read = self._time(options['runs'], lambda: MessageRepository.mark_as_read(bob, alice))
+                delete = self._time(options['runs'], lambda: self._rolled_back(
+                    lambda: MessageRepository.mark_conversation_as_deleted(alice, bob)
+                ))
+                self.stdout.write(f'{size:>12} {page:>12.2f} {read:>12.2f} {delete:>14.2f}')
+
+            self.stdout.write(Message.objects.filter(
+                conversation_key=Message.conversation_key_for(alice, bob)
+            ).order_by('-created_at', '-message_id')[:51].explain())
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete' + ('' if options['keep'] else ' (data rolled back)')))
+
+    @staticmethod
+    def _time(runs, operation) -> float:
+        """Median wall time of `operation` in milliseconds."""
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    @staticmethod
+    def _rolled_back(operation) -> None:
+        """Run `operation` in a savepoint that is rolled back."""
+        sid = transaction.savepoint()
+        try:
+            operation()
+        finally:
+            transaction.savepoint_rollback(sid)
@@ -0,0 +1,31 @@
+"""
+Django management command removing a large comment thread.
+
+A request deletes a thread inside its own transaction, so all its batches
+commit together. This deletes it outside any transaction: each batch of
+`--batch-size` comments commits on its own and releases its row locks,
+which keeps a thread of many thousands of replies from blocking writers.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from db.repositories.post_repository import CommentRepository
+
+
+class Command(BaseCommand):
+    help = 'Delete a comment and all its replies in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('comment_id', help='Root comment of the thread')
+        parser.add_argument('--batch-size', type=int, default=None, help='Comments per DELETE (default: COMMENT_DELETE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many comments would be deleted')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        comment = CommentRepository.get_by_id(options['comment_id'])
+        if comment is None:
+            raise CommandError(f"Comment {options['comment_id']} not found")
+        if options['dry_run']:
+            size = CommentRepository.get_subtree_size(comment.comment_id)
+            self.stdout.write(self.style.SUCCESS(f'Comments that would be deleted: {size}'))
+            return
+        deleted = CommentRepository.delete_subtree(comment.comment_id, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Comments deleted: {deleted}'))
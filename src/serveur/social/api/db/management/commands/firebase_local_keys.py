@@ -0,0 +1,41 @@
+"""
+Django management command for the local Firebase stand-in key set.
+
+Generates a signing key and certificates file (point FIREBASE_CERTS_FILE
+and FIREBASE_PROJECT_ID at them), and mints ID tokens signed with it, so
+authentication can be exercised and load-tested offline.
+"""
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.custom_auth.local_keys import PRIVATE_KEY_FILE, generate_local_keys, mint_token
+
+
+class Command(BaseCommand):
+    help = 'Generate a local Firebase stand-in key set and mint ID tokens with it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', required=True, help='Directory of the key set')
+        parser.add_argument('--generate', action='store_true', help='Generate a new key set in --dir')
+        parser.add_argument('--mint', metavar='UID', action='append', default=[],
+                            help='Print an ID token for this Firebase UID (repeatable)')
+        parser.add_argument('--email', help='Email claim of the minted tokens')
+        parser.add_argument('--project', default=getattr(settings, 'FIREBASE_PROJECT_ID', None),
+                            help='Firebase project ID (default: FIREBASE_PROJECT_ID)')
+        parser.add_argument('--lifetime', type=int, default=3600, help='Token lifetime in seconds')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        directory = Path(options['dir'])
+        if options['generate']:
+            _, certs_path = generate_local_keys(directory)
+            self.stdout.write(self.style.SUCCESS(f'Key set written, set FIREBASE_CERTS_FILE={certs_path}'))
+
+        if options['mint']:
+            if not options['project']:
+                raise CommandError('A project ID is required to mint tokens (--project)')
+            if not (directory / PRIVATE_KEY_FILE).exists():
+                raise CommandError(f'No key set in {directory}, run with --generate first')
+            for uid in options['mint']:
+                self.stdout.write(mint_token(directory / PRIVATE_KEY_FILE, options['project'], uid,
+                                             email=options['email'], lifetime=options['lifetime']))
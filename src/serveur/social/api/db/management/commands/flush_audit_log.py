@@ -0,0 +1,19 @@
+"""
+Django management command to store spooled audit log events.
+
+Audit rows are spooled to AUDIT_LOG_SPOOL_DIR before they are written in
+batches. Events of a flush that failed, or of a worker that died before
+flushing, stay there; running this command (e.g. at container start or
+from cron) writes them. Replays are idempotent.
+"""
+from django.core.management.base import BaseCommand
+from db.repositories.message_repository import audit_writer
+
+
+class Command(BaseCommand):
+    help = 'Write audit log events left in the spool directory'
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        written = audit_writer.flush() + audit_writer.replay()
+        self.stdout.write(self.style.SUCCESS(f'Audit events written: {written}'))
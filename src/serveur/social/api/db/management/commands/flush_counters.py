@@ -0,0 +1,20 @@
+"""
+Django management command to apply buffered counter deltas.
+
+Like/comment/post/member counts are buffered in Redis and applied by a
+background flusher in each worker. Run this (e.g. from cron, or when the
+flusher is disabled with COUNTER_FLUSH_INTERVAL=0) to apply them now.
+"""
+from django.core.management.base import BaseCommand
+from common.counters import flush_counters
+import db.repositories.domain_repository  # noqa: F401 (registers the counter buffers)
+import db.repositories.post_repository  # noqa: F401
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered like/comment/post/member count deltas to the database'
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        updated = flush_counters()
+        self.stdout.write(self.style.SUCCESS(f'Counter rows updated: {updated}'))
@@ -0,0 +1,96 @@
+"""
+Django management command to maintain the monthly audit_logs partitions.
+
+Creates the partitions of the coming months (rows outside existing
+partitions land in the default partition, which makes creating their
+month later more expensive), then archives months older than the
+retention period: each is detached, exported to a gzip JSON-lines file
+in AUDIT_LOG_ARCHIVE_DIR and dropped. Schedule it daily or monthly (cron).
+Use --search to query archived months.
+"""
+import json
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from db.repositories.audit_partition_repository import (
+    AuditArchiveRepository,
+    AuditPartitionRepository,
+    add_months,
+    month_of,
+)
+
+
+def _month(value: str) -> date:
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming audit log partitions and archive the expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.AUDIT_LOG_PARTITIONS_AHEAD,
+                            help='Number of future months to create partitions for')
+        parser.add_argument('--retain-months', type=int, default=settings.AUDIT_LOG_RETENTION_MONTHS,
+                            help='Number of past months kept in the database (0: keep everything)')
+        parser.add_argument('--archive-dir', default=settings.AUDIT_LOG_ARCHIVE_DIR,
+                            help='Directory of the archived months')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only print the partitions that would be archived')
+        parser.add_argument('--search', action='store_true',
+                            help='Search the archive instead (with --user, --action, --resource-type, '
+                                 '--resource-id, --from, --to)')
+        parser.add_argument('--user', help='Archived rows of this user ID')
+        parser.add_argument('--action', help='Archived rows with this action type')
+        parser.add_argument('--resource-type', help='Archived rows with this resource type')
+        parser.add_argument('--resource-id', help='Archived rows about this resource ID')
+        parser.add_argument('--from', dest='start', type=_month, help='First archived month to search (YYYY-MM)')
+        parser.add_argument('--to', dest='end', type=_month, help='Last archived month to search (YYYY-MM)')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['search']:
+            return self._search(options)
+
+        current = month_of(timezone.now())
+        created = 0
+        for offset in range(options['months_ahead'] + 1):
+            if not options['dry_run'] and AuditPartitionRepository.create(add_months(current, offset)):
+                created += 1
+
+        expired = []
+        if options['retain_months'] > 0:
+            cutoff = add_months(current, -options['retain_months'])
+            expired = [month for month in AuditPartitionRepository.get_months() if month < cutoff]
+        for month in expired:
+            if options['dry_run']:
+                self.stdout.write(f'Would archive {month:%Y-%m}')
+            else:
+                AuditPartitionRepository.detach(month)
+        # Also resumes months detached by an interrupted run
+        archived = 0
+        for month in [] if options['dry_run'] else AuditPartitionRepository.get_detached_months():
+            rows = AuditArchiveRepository.export(month, options['archive_dir'])
+            AuditPartitionRepository.drop_detached(month)
+            self.stdout.write(f'Archived {month:%Y-%m}: {rows} rows')
+            archived += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Partitions created: {created}, months archived: {archived}'
+        ))
+
+    def _search(self, options):
+        found = 0
+        for row in AuditArchiveRepository.search(
+            start=options['start'],
+            end=options['end'],
+            user_id=options['user'],
+            action_type=options['action'],
+            resource_type=options['resource_type'],
+            resource_id=options['resource_id'],
+            archive_dir=options['archive_dir'],
+        ):
+            self.stdout.write(json.dumps(row))
+            found += 1
+        self.stdout.write(self.style.SUCCESS(f'Archived rows found: {found}'))
@@ -0,0 +1,39 @@
+"""
+Django management command reporting the accuracy of two-tier rate limiters.
+
+Two-tier limiters decide most checks in worker memory and sync with Redis
+in the background, so a client can briefly exceed its limit. Workers
+accumulate their counters in Redis; this prints, per limiter, the share of
+checks decided without a Redis round trip and how many served hits were
+over the limit.
+"""
+from django.core.management.base import BaseCommand
+from common.rate_limiters import STAT_FIELDS, two_tier_limiters
+from common.redis_client import get_redis
+
+
+class Command(BaseCommand):
+    help = 'Report local decisions and overshoot of the two-tier rate limiters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reporting')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        client = get_redis()
+        for name, limiter in sorted(two_tier_limiters.items()):
+            raw = client.hgetall(limiter.stats_key)
+            stats = {field: int(raw.get(field.encode(), 0)) for field in STAT_FIELDS}
+            checks = stats['local_checks'] + stats['redis_checks']
+            local_share = stats['local_checks'] / checks if checks else 0
+            overshoot = stats['overshoot_hits'] / stats['synced_hits'] if stats['synced_hits'] else 0
+            self.stdout.write(
+                f'{name}: {limiter.limit}/{limiter.period}s, sync every {limiter.sync_interval}s, '
+                f'local budget {limiter.local_budget}\n'
+                f'  checks: {checks} ({local_share:.1%} decided locally)\n'
+                f'  hits over the limit: {stats["overshoot_hits"]} of {stats["synced_hits"]} synced ({overshoot:.2%})'
+            )
+            if options['reset']:
+                client.delete(limiter.stats_key)
+
+        self.stdout.write(self.style.SUCCESS(f'{len(two_tier_limiters)} two-tier limiter(s)'))
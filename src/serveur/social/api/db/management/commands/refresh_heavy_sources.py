@@ -0,0 +1,33 @@
+"""
+Django management command recomputing the heavy feed sources.
+
+Authors with at least FEED_HEAVY_FOLLOWER_THRESHOLD followers and
+subforums with at least FEED_HEAVY_SUBFORUM_THRESHOLD subscribers or
+posters are not fanned out to timelines; their posts are merged at read
+time. Finding them takes full-table aggregates, so the feed only reads the
+cached result of this command. Schedule it, or keep it running with
+`--interval`.
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from services.apps_services.timeline_service import TimelineService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the authors and subforums whose posts are merged into feeds at read time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Run again every N seconds instead of once')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        while True:
+            sources = TimelineService.refresh_heavy_sources()
+            self.stdout.write(self.style.SUCCESS(
+                f"Heavy sources: {len(sources['users'])} authors, {len(sources['subforums'])} subforums"))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+            close_old_connections()
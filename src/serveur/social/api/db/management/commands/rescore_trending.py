@@ -0,0 +1,42 @@
+"""
+Django management command to recompute post trending (hot) scores.
+
+Scores are maintained incrementally on like/comment events; this job
+realigns them with the stored counts (e.g. after bulk imports, counter
+reconciliation or a change of TRENDING_GRAVITY_SECONDS). Schedule it
+periodically (cron) to keep trending lists exact.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from db.entities.post_entity import Post
+from db.repositories.post_repository import PostRepository
+
+
+class Command(BaseCommand):
+    help = 'Recompute post trending scores from like/comment counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only rescore posts created in the last N days (default: all posts)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts updated per statement')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        queryset = Post.objects.order_by('post_id')
+        if options['days'] is not None:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+
+        batch_size = options['batch_size']
+        rescored = 0
+        last_id = None
+        while True:
+            batch = queryset if last_id is None else queryset.filter(post_id__gt=last_id)
+            post_ids = list(batch.values_list('post_id', flat=True)[:batch_size])
+            if not post_ids:
+                break
+            rescored += PostRepository.rescore(post_ids)
+            last_id = post_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Posts rescored: {rescored}'))
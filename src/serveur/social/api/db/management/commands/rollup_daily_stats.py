@@ -0,0 +1,30 @@
+"""
+Django management command filling the daily_stats rollup.
+
+Counts the users, posts, comments, likes and reports created per day and
+stores one row per day, read by the admin daily stats endpoint. By default
+it rolls up the days since the last run (that day included, since it was
+possibly partial) up to today; schedule it periodically (cron). `--days`
+recomputes the last N days, e.g. after bulk deletions.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from db.repositories.stats_repository import StatsRepository
+
+
+class Command(BaseCommand):
+    help = 'Roll up daily counts of new users, posts, comments, likes and reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Recompute the last N days (default: the days since the last rollup)')
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['days'] is not None:
+            today = timezone.localdate()
+            written = StatsRepository.rollup(today - timedelta(days=options['days'] - 1), today)
+        else:
+            written = StatsRepository.rollup_pending()
+        self.stdout.write(self.style.SUCCESS(f'Days rolled up: {written}'))
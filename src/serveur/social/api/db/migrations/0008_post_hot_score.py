@@ -0,0 +1,37 @@
+"""Add `Post.hot_score` (trending) with its indexes and backfill it.
+
+The backfill computes the score from the stored like/comment counts, see
+common.trending. It is reversible as a noop (the column is dropped).
+"""
+from django.db import migrations, models
+
+
+def backfill_hot_score(apps, schema_editor):
+    from common.trending import hot_score_expression
+
+    Post = apps.get_model('db', 'Post')
+    Post.objects.update(hot_score=hot_score_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0007_timeline_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-post_id'], name='posts_hot_sco_318f2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['subforum', '-hot_score', '-post_id'], name='posts_subforu_d6edb2_idx'),
+        ),
+        migrations.RunPython(backfill_hot_score, migrations.RunPython.noop),
+    ]
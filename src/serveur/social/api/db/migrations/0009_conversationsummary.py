@@ -0,0 +1,68 @@
+"""Create `ConversationSummary` (inbox rows) and backfill it from messages.
+
+For each (user, partner) pair with at least one message not deleted by
+`user`, store the last such message, its time and the number of unread
+messages received from `partner`. It is reversible as a noop (the table
+is dropped).
+"""
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def backfill_conversation_summaries(apps, schema_editor):
+    Message = apps.get_model('db', 'Message')
+    ConversationSummary = apps.get_model('db', 'ConversationSummary')
+
+    summaries = {}
+    messages = Message.objects.order_by('created_at', 'message_id').values_list(
+        'message_id', 'sender_id', 'receiver_id', 'created_at', 'is_read', 'deleted_by_sender', 'deleted_by_receiver'
+    )
+    for message_id, sender_id, receiver_id, created_at, is_read, deleted_by_sender, deleted_by_receiver in messages.iterator():
+        sides = [
+            (sender_id, receiver_id, deleted_by_sender, 0),
+            (receiver_id, sender_id, deleted_by_receiver, 0 if is_read else 1),
+        ]
+        for user_id, partner_id, deleted, unread in sides:
+            if deleted:
+                continue
+            summary = summaries.setdefault((user_id, partner_id), {'unread_count': 0})
+            summary['last_message_id'] = message_id
+            summary['last_activity_at'] = created_at
+            summary['unread_count'] += unread
+
+    ConversationSummary.objects.bulk_create(
+        [
+            ConversationSummary(user_id=user_id, partner_id=partner_id, **summary)
+            for (user_id, partner_id), summary in summaries.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0008_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('summary_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('last_activity_at', models.DateTimeField()),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='db.message')),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='db.user')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_summaries', to='db.user')),
+            ],
+            options={
+                'db_table': 'conversation_summaries',
+                'indexes': [models.Index(fields=['user', 'is_deleted', '-last_activity_at'], name='conversatio_user_id_5398cd_idx')],
+                'unique_together': {('user', 'partner')},
+            },
+        ),
+        migrations.RunPython(backfill_conversation_summaries, migrations.RunPython.noop),
+    ]
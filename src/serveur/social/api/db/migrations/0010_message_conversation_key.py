@@ -0,0 +1,38 @@
+"""Add `Message.conversation_key` (ordered participant pair), backfill it, and index it.
+
+The backfill is a single set-based UPDATE: uuid ordering in PostgreSQL
+matches the ordering of their canonical text form, which is what
+`Message.conversation_key_for` sorts on. It is reversible (the column
+and index are dropped).
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0009_conversationsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='conversation_key',
+            field=models.CharField(max_length=73, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE messages SET conversation_key = "
+            "LEAST(sender_id, receiver_id)::text || ':' || GREATEST(sender_id, receiver_id)::text "
+            "WHERE conversation_key IS NULL",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='conversation_key',
+            field=models.CharField(max_length=73),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation_key', '-created_at', '-message_id'], name='messages_convers_54c82b_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+"""Prepare `audit_logs` for batched inserts.
+
+- `created_at` is set by the caller (event time) instead of on insert,
+  since rows are stored in batches after the request commits.
+- The `resource_id` column becomes varchar(100), matching the model
+  (`AuditLog.resource_id_raw`): it was still uuid in the database, so
+  non-UUID resource IDs and typed bulk inserts failed. Existing values
+  are kept (cast to text); the model state is aligned without touching
+  the column otherwise.
+"""
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0010_message_conversation_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE audit_logs ALTER COLUMN resource_id TYPE varchar(100) USING resource_id::text',
+                    'ALTER TABLE audit_logs ALTER COLUMN resource_id TYPE uuid USING resource_id::uuid',
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='auditlog',
+                    name='resource_id',
+                ),
+                migrations.AddField(
+                    model_name='auditlog',
+                    name='resource_id_raw',
+                    field=models.CharField(blank=True, db_column='resource_id', max_length=100, null=True),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,97 @@
+"""Range-partition `audit_logs` by month on created_at.
+
+The table is rebuilt as a partitioned table (primary key (log_id,
+created_at), as PostgreSQL requires the partition key in it) with one
+partition per month holding data plus the next months, and a default
+partition. Rows, indexes and the user foreign key are carried over.
+New months are created ahead, and old ones archived, by the
+`manage_audit_partitions` command. The admin listing index becomes
+(-created_at, -log_id) to match its keyset ordering. Reversible.
+"""
+from datetime import date
+from django.db import migrations, models
+
+
+# Frozen copies of db.repositories.audit_partition_repository helpers, as of this migration
+
+def month_of(value) -> date:
+    """First day of the month of a date or datetime."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL creating the partition of a month, with literal UTC bounds."""
+    start, end = f"'{month:%Y-%m-%d} 00:00:00+00'", f"'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'"
+    return f'CREATE TABLE audit_logs_p{month:%Y_%m} PARTITION OF audit_logs FOR VALUES FROM ({start}) TO ({end})'
+
+
+def _rebuild(schema_editor, partitioned):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = 'audit_logs' AND indexname <> 'audit_logs_pkey'"
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'audit_logs'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+        cursor.execute('ALTER TABLE audit_logs RENAME TO audit_logs_old')
+        cursor.execute('ALTER TABLE audit_logs_old RENAME CONSTRAINT audit_logs_pkey TO audit_logs_old_pkey')
+
+        if partitioned:
+            cursor.execute('CREATE TABLE audit_logs (LIKE audit_logs_old INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+            cursor.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (log_id, created_at)')
+            cursor.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+            cursor.execute('SELECT min(created_at) FROM audit_logs_old')
+            oldest = cursor.fetchone()[0]
+            month = month_of(oldest or date.today())
+            last = add_months(month_of(date.today()), 3)
+            while month <= last:
+                cursor.execute(create_partition_sql(month))
+                month = add_months(month, 1)
+        else:
+            cursor.execute('CREATE TABLE audit_logs (LIKE audit_logs_old INCLUDING DEFAULTS)')
+            cursor.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (log_id)')
+
+        cursor.execute('INSERT INTO audit_logs SELECT * FROM audit_logs_old')
+        cursor.execute('DROP TABLE audit_logs_old')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE audit_logs ADD CONSTRAINT {name} {definition}')
+        for _, definition in indexes:
+            cursor.execute(definition.replace(' ON ONLY ', ' ON '))
+
+
+def partition_audit_logs(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition_audit_logs(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auditlog_batched_writes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_audit_logs, unpartition_audit_logs),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_logs_created_43fcd6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at', '-log_id'], name='audit_logs_created_970b7d_idx'),
+        ),
+    ]
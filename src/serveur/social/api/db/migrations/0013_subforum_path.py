@@ -0,0 +1,54 @@
+"""Store the subforum hierarchy as a materialized path.
+
+`subforums.path` holds the IDs of the forums above each subforum, from the
+top forum down to `parent_forum`, so a whole subtree is one GIN-indexed
+`path @> ARRAY[forum]` query. Existing rows are backfilled from the
+parent links.
+"""
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Subforum = apps.get_model('db', 'Subforum')
+    rows = list(Subforum.objects.order_by('created_at').values_list('subforum_id', 'forum_id_id', 'parent_forum_id'))
+    # Forum -> parent forum of the first subforum it backs (not counting its own top-level subforums)
+    parent_of = {}
+    for _, forum_id, parent_forum_id in rows:
+        if parent_forum_id != forum_id:
+            parent_of.setdefault(forum_id, parent_forum_id)
+
+    def path_of(forum_id):
+        path = [forum_id]
+        forum_id = parent_of.get(forum_id)
+        while forum_id and forum_id not in path:
+            path.insert(0, forum_id)
+            forum_id = parent_of.get(forum_id)
+        return path
+
+    for subforum_id, _, parent_forum_id in rows:
+        path = path_of(parent_forum_id) if parent_forum_id else []
+        Subforum.objects.filter(subforum_id=subforum_id).update(path=path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0012_auditlog_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subforum',
+            name='path',
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(), blank=True, default=list, size=None
+            ),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='subforum',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['path'], name='subforums_path_gin'),
+        ),
+    ]
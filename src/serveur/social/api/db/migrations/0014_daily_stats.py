@@ -0,0 +1,46 @@
+"""Daily statistics rollup table and created_at indexes.
+
+`daily_stats` holds one row per day with the number of users, posts,
+comments, likes and reports created that day (filled by the
+rollup_daily_stats command). The created_at indexes let the admin stats
+and the rollup read day ranges instead of scanning users, likes and
+reports.
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0013_subforum_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('new_users', models.IntegerField(default=0)),
+                ('new_posts', models.IntegerField(default=0)),
+                ('new_comments', models.IntegerField(default=0)),
+                ('new_likes', models.IntegerField(default=0)),
+                ('new_reports', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at'], name='users_created_6541e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['created_at'], name='likes_created_6ac82b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['created_at'], name='reports_created_c5f642_idx'),
+        ),
+    ]
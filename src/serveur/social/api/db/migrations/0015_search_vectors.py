@@ -0,0 +1,66 @@
+"""Full-text search vectors on posts and comments.
+
+Stored generated `tsvector` columns, one per text search configuration
+(French and English, the languages of UserSettings), so Postgres keeps
+them up to date on every write, each with a GIN index. Post titles are
+weighted above their content.
+"""
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def _vector(config, *weighted_fields):
+    vector = None
+    for field, weight in weighted_fields:
+        part = django.contrib.postgres.search.SearchVector(field, config=config, weight=weight)
+        vector = part if vector is None else vector + part
+    return models.GeneratedField(
+        db_persist=True, expression=vector, output_field=django.contrib.postgres.search.SearchVectorField()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0014_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_fr',
+            field=_vector('french', ('title', 'A'), ('content', 'B')),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_en',
+            field=_vector('english', ('title', 'A'), ('content', 'B')),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='search_fr',
+            field=_vector('french', ('content', 'B')),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='search_en',
+            field=_vector('english', ('content', 'B')),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_fr'], name='posts_search_fr_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_en'], name='posts_search_en_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_fr'], name='comments_search_fr_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_en'], name='comments_search_en_gin'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+"""Trigram indexes on usernames and forum names.
+
+GIN `gin_trgm_ops` indexes on UPPER(name::text), the expression Django's
+`icontains` filters on, so substring and word similarity (`%>`) searches are
+index scans instead of full table scans.
+"""
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def _trigram_index(field, name):
+    expression = django.db.models.functions.text.Upper(
+        django.db.models.functions.comparison.Cast(field, output_field=models.TextField())
+    )
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(expression, name='gin_trgm_ops'), name=name
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0015_search_vectors'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='user',
+            index=_trigram_index('username', 'users_username_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='forum',
+            index=_trigram_index('forum_name', 'forums_name_trgm'),
+        ),
+    ]
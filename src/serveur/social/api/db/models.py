@@ -4,7 +4,9 @@ Expose all database models for Django migrations.
 from db.entities.user_entity import User, UserProfile, UserSettings, Block, Follow
 from db.entities.domain_entity import Domain, Forum, Subforum, Membership
 from db.entities.post_entity import Post, Comment, Like, Tag, PostTag, ForumTag
-from db.entities.message_entity import Message, Report, AuditLog
+from db.entities.message_entity import Message, ConversationSummary, Report, AuditLog
+from db.entities.timeline_entity import Timeline, TimelineEntry
+from db.entities.stats_entity import DailyStats
 
 __all__ = [
     'User',
@@ -23,7 +25,11 @@ __all__ = [
     'PostTag',
     'ForumTag',
     'Message',
+    'ConversationSummary',
     'Report',
     'AuditLog',
+    'Timeline',
+    'TimelineEntry',
+    'DailyStats',
 ]
 
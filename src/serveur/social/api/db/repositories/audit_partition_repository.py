@@ -0,0 +1,191 @@
+"""
+Audit log partition and archive repository.
+
+`audit_logs` is range-partitioned by month on created_at: one
+`audit_logs_pYYYY_MM` table per month, plus `audit_logs_default` for rows
+outside the months created so far. Months past the retention period are
+detached, exported to one gzip JSON-lines file each and dropped; the
+archived months stay searchable through AuditArchiveRepository.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+
+TABLE = 'audit_logs'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_RE = re.compile(r'^audit_logs_p(\d{4})_(\d{2})$')
+ARCHIVE_RE = re.compile(r'^audit_logs_(\d{4})_(\d{2})\.jsonl\.gz$')
+
+
+def month_of(value) -> date:
+    """First day of the month of a date or datetime."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def _bounds(month: date):
+    # Literal UTC bounds: the partition does not depend on the session time zone
+    return f"'{month:%Y-%m-%d} 00:00:00+00'", f"'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'"
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL creating the partition of a month (the default partition must not hold rows of it)."""
+    start, end = _bounds(month)
+    return f'CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} FOR VALUES FROM ({start}) TO ({end})'
+
+
+class AuditPartitionRepository:
+    """Repository for the monthly partitions of the audit_logs table."""
+
+    @staticmethod
+    def get_months() -> List[date]:
+        """Months with an attached partition, oldest first."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+                'WHERE i.inhparent = %s::regclass',
+                [TABLE]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        return sorted(date(int(m[1]), int(m[2]), 1) for m in map(PARTITION_RE.match, names) if m)
+
+    @staticmethod
+    def get_detached_months() -> List[date]:
+        """Months whose partition was detached but not archived yet (e.g. an interrupted run)."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+                "AND relnamespace = current_schema()::regnamespace AND relname ~ %s",
+                [PARTITION_RE.pattern]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        return sorted(date(int(m[1]), int(m[2]), 1) for m in map(PARTITION_RE.match, names))
+
+    @staticmethod
+    @transaction.atomic
+    def create(month: date) -> bool:
+        """
+        Create the partition of a month.
+
+        Rows of that month already stored in the default partition are moved
+        into the new partition.
+
+        Returns:
+            False if the partition already exists
+        """
+        name = partition_name(month)
+        start, end = _bounds(month)
+        in_month = f'created_at >= {start} AND created_at < {end}'
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is not None:
+                return False
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})')
+            if not cursor.fetchone()[0]:
+                cursor.execute(create_partition_sql(month))
+                return True
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+            cursor.execute(create_partition_sql(month))
+            cursor.execute(f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}')
+            cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}')
+            cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+        return True
+
+    @staticmethod
+    def detach(month: date) -> None:
+        """Detach a month's partition; it stays as a standalone table until dropped."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {partition_name(month)}')
+
+    @staticmethod
+    def drop_detached(month: date) -> None:
+        """Drop a detached month table."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {partition_name(month)}')
+
+
+class AuditArchiveRepository:
+    """Repository for archived audit months (gzip JSON lines, one row per line)."""
+
+    @staticmethod
+    def get_path(month: date, archive_dir: Optional[str] = None) -> Path:
+        return Path(archive_dir or settings.AUDIT_LOG_ARCHIVE_DIR) / f'{TABLE}_{month:%Y_%m}.jsonl.gz'
+
+    @staticmethod
+    def get_months(archive_dir: Optional[str] = None) -> List[date]:
+        """Archived months, oldest first."""
+        directory = Path(archive_dir or settings.AUDIT_LOG_ARCHIVE_DIR)
+        if not directory.is_dir():
+            return []
+        return sorted(date(int(m[1]), int(m[2]), 1) for m in map(ARCHIVE_RE.match, os.listdir(directory)) if m)
+
+    @staticmethod
+    def export(month: date, archive_dir: Optional[str] = None) -> int:
+        """
+        Export a detached month table, newest rows first.
+
+        The file is written under a temporary name and renamed once complete,
+        so an existing archive is never left truncated.
+
+        Returns:
+            Number of rows exported
+        """
+        path = AuditArchiveRepository.get_path(month, archive_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        exported = 0
+        with transaction.atomic(), connection.chunked_cursor() as cursor:
+            cursor.execute(f'SELECT * FROM {partition_name(month)} ORDER BY created_at DESC, log_id DESC')
+            columns = [column[0] for column in cursor.description]
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+                for row in cursor:
+                    archive.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+                    exported += 1
+        os.replace(tmp_path, path)
+        return exported
+
+    @staticmethod
+    def search(start: Optional[date] = None, end: Optional[date] = None, user_id: Optional[str] = None,
+               action_type: Optional[str] = None, resource_type: Optional[str] = None,
+               resource_id: Optional[str] = None, archive_dir: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Search archived months, newest first.
+
+        Args:
+            start: First month to search (inclusive)
+            end: Last month to search (inclusive)
+            user_id: Only rows of this user
+            action_type: Only rows with this action type
+            resource_type: Only rows with this resource type
+            resource_id: Only rows about this resource
+
+        Yields:
+            Archived rows as dicts of column name to value (as text)
+        """
+        filters = {
+            'user_id': user_id, 'action_type': action_type,
+            'resource_type': resource_type, 'resource_id': resource_id,
+        }
+        filters = {key: str(value) for key, value in filters.items() if value is not None}
+        for month in reversed(AuditArchiveRepository.get_months(archive_dir)):
+            if (start and month < month_of(start)) or (end and month > month_of(end)):
+                continue
+            with gzip.open(AuditArchiveRepository.get_path(month, archive_dir), 'rt', encoding='utf-8') as archive:
+                for line in archive:
+                    row = json.loads(line)
+                    if all(row.get(key) is not None and str(row[key]) == value for key, value in filters.items()):
+                        yield row
@@ -2,12 +2,32 @@
 Domain and Forum repository for data access.
 """
 from typing import Optional, List
-from django.db.models import F
-from django.db import IntegrityError
+from django.conf import settings
+from django.db.models import F, Func, IntegerField, UUIDField, Value
+from django.db import IntegrityError, connection
+from common.cache import VersionedCache
+from common.counters import CounterBuffer
 from common.exceptions import ConflictError
+from common.prefix_index import PrefixIndex, matches
+from common.trigram import trigram_search
 from db.entities.domain_entity import Domain, Forum, Subforum, Membership
 import uuid
 
+# Response payloads of the forum/domain structure, by scope: 'domains' (the
+# domain list), 'domain:<id>' (its subforums), 'forum:<id>' (its subtree).
+# Versions are bumped when subforums are created or removed under a scope.
+structure_cache = VersionedCache('structure', ttl=getattr(settings, 'STRUCTURE_CACHE_TTL', 300))
+
+# Member/post counts, written behind (see common.counters); overlay() them on reads
+forum_counters = CounterBuffer(Forum, ['member_count', 'post_count'])
+subforum_counters = CounterBuffer(Subforum, ['post_count'])
+
+# Forum names for autocomplete, caught up on forum creation
+forum_name_index = PrefixIndex(
+    'forums:forum_name', Forum, 'forum_name',
+    rebuild_interval=getattr(settings, 'AUTOCOMPLETE_REBUILD_INTERVAL', 600),
+)
+
 
 class DomainRepository:
     """Repository for Domain entity operations."""
@@ -37,11 +57,13 @@ class DomainRepository:
     @staticmethod
     def create(domain_name: str, description: Optional[str] = None, icon_url: Optional[str] = None) -> Domain:
         """Create a new domain."""
-        return Domain.objects.create(
+        domain = Domain.objects.create(
             domain_name=domain_name,
             description=description,
             icon_url=icon_url
         )
+        structure_cache.bump('domains')
+        return domain
 
     @staticmethod
     def update(domain: Domain, domain_name: Optional[str] = None,
@@ -54,12 +76,23 @@ class DomainRepository:
         if icon_url is not None:
             domain.icon_url = icon_url
         domain.save()
+        structure_cache.bump('domains')
         return domain
 
     @staticmethod
     def delete(domain_id: str) -> bool:
         """Delete a domain by id. Returns True if a row was removed."""
+        from db.entities.post_entity import Post
+        from db.repositories.post_repository import post_cache
+        # Posts of its subforums are kept, with their subforum set to NULL
+        post_ids = list(Post.objects.filter(subforum__parent_domain_id=domain_id).values_list('post_id', flat=True))
+        # Its subforums (and their subtrees) are deleted with it: so are the trees they appear in
+        scopes = ['domains', f'domain:{domain_id}']
+        for forum_id, path in Subforum.objects.filter(parent_domain_id=domain_id).values_list('forum_id', 'path'):
+            scopes += [f'forum:{ancestor}' for ancestor in path] + [f'forum:{forum_id}']
         deleted, _ = Domain.objects.filter(domain_id=domain_id).delete()
+        post_cache.invalidate(*post_ids)
+        structure_cache.bump(*scopes)
         return deleted > 0
     
     @staticmethod
@@ -81,12 +114,14 @@ class ForumRepository:
         except Exception:
             cid = creator_id
 
-        return Forum.objects.create(
+        forum = Forum.objects.create(
             creator_id=cid,
             forum_name=forum_name,
             description=description,
             forum_image_url=forum_image_url
         )
+        forum_name_index.added()
+        return forum
     
     @staticmethod
     def get_by_id(forum_id: str) -> Optional[Forum]:
@@ -104,24 +139,47 @@ class ForumRepository:
     
     @staticmethod
     def search(query: str, page: int = 1, page_size: int = 20) -> List[Forum]:
-        """Search forums by name."""
+        """Search forums by name: names containing the query first, then similar ones (see common.trigram)."""
         offset = (page - 1) * page_size
-        return Forum.objects.filter(forum_name__icontains=query).select_related('creator')[offset:offset + page_size]
+        queryset = trigram_search(Forum.objects.select_related('creator'), 'forum_name', query)
+        return queryset[offset:offset + page_size]
+
+    @staticmethod
+    def autocomplete(prefix: str, limit: int = 10) -> List[Forum]:
+        """
+        Complete a forum name prefix from the in-memory index.
+
+        Args:
+            prefix: Typed prefix (of the name or of one of its words)
+            limit: Maximum number of forums
+
+        Returns:
+            Forums in alphabetical order of the matched key
+        """
+        forum_ids = forum_name_index.search(prefix, limit)
+        forums = Forum.objects.in_bulk(forum_ids)
+        found = [forums[forum_id] for forum_id in forum_ids if forum_id in forums]
+        return [forum for forum in found if matches(forum.forum_name, prefix)]
     
     @staticmethod
     def increment_member_count(forum_id: str) -> None:
         """Increment member count."""
-        Forum.objects.filter(forum_id=forum_id).update(member_count=F('member_count') + 1)
+        forum_counters.add(forum_id, member_count=1)
     
     @staticmethod
     def decrement_member_count(forum_id: str) -> None:
         """Decrement member count."""
-        Forum.objects.filter(forum_id=forum_id).update(member_count=F('member_count') - 1)
+        forum_counters.add(forum_id, member_count=-1)
     
     @staticmethod
     def increment_post_count(forum_id: str) -> None:
         """Increment post count."""
-        Forum.objects.filter(forum_id=forum_id).update(post_count=F('post_count') + 1)
+        forum_counters.add(forum_id, post_count=1)
+    
+    @staticmethod
+    def decrement_post_count(forum_id: str) -> None:
+        """Decrement post count."""
+        forum_counters.add(forum_id, post_count=-1)
 
 
 class SubforumRepository:
@@ -160,14 +218,21 @@ class SubforumRepository:
             # parent_forum to satisfy DB constraint.
             if not pdid and not pfid:
                 pfid = fid
-            return Subforum.objects.create(
+            # The forum gets a subforum above it: its existing subtree moves under that subforum
+            was_top_level = not SubforumRepository._backing(fid).exists()
+            subforum = Subforum.objects.create(
                 creator_id=creator_id,
                 forum_id_id=fid,
                 subforum_name=subforum_name,
                 description=description,
                 parent_domain_id=pdid,
-                parent_forum_id=pfid
+                parent_forum_id=pfid,
+                path=SubforumRepository._path_under(pfid)
             )
+            if was_top_level and pfid != fid and fid not in subforum.path:
+                SubforumRepository._reroot(fid, subforum.path)
+            SubforumRepository._structure_changed(subforum)
+            return subforum
 
         # Create a new forum record for this subforum (its own forum context)
         try:
@@ -197,15 +262,78 @@ class SubforumRepository:
         if not pdid and not pfid:
             effective_parent_forum_id = new_forum.forum_id
 
-        return Subforum.objects.create(
+        subforum = Subforum.objects.create(
             creator_id=creator_id,
             forum_id=new_forum,
             subforum_name=subforum_name,
             description=description,
             parent_domain_id=pdid,
-            parent_forum_id=effective_parent_forum_id
+            parent_forum_id=effective_parent_forum_id,
+            path=SubforumRepository._path_under(effective_parent_forum_id)
+        )
+        SubforumRepository._structure_changed(subforum)
+        return subforum
+
+    @staticmethod
+    def _structure_changed(subforum: Subforum) -> None:
+        """Invalidate the cached trees and listings a subforum appears in."""
+        scopes = [f'forum:{forum_id}' for forum_id in subforum.path]
+        if subforum.parent_domain_id:
+            scopes.append(f'domain:{subforum.parent_domain_id}')
+        structure_cache.bump(*scopes)
+
+    @staticmethod
+    def _backing(forum_id):
+        """Subforums backed by a forum, other than its own top-level ones."""
+        return Subforum.objects.filter(forum_id_id=forum_id).exclude(parent_forum_id=forum_id)
+
+    @staticmethod
+    def _path_under(parent_forum_id) -> list:
+        """Path of a subforum created under a forum (the forum's path, then the forum)."""
+        if not parent_forum_id:
+            return []
+        parent_path = SubforumRepository._backing(parent_forum_id).order_by('created_at').values_list(
+            'path', flat=True
+        ).first()
+        return (parent_path or []) + [uuid.UUID(str(parent_forum_id))]
+
+    @staticmethod
+    def _reroot(forum_id, prefix: list) -> None:
+        """Replace the part of the paths above a forum by a new prefix, for its whole subtree."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE subforums SET path = %s::uuid[] || path[array_position(path, %s::uuid):] '
+                'WHERE path @> ARRAY[%s::uuid]',
+                [[str(p) for p in prefix], str(forum_id), str(forum_id)],
+            )
+
+    @staticmethod
+    def get_tree(forum_id: str, max_depth: Optional[int] = None) -> List[Subforum]:
+        """
+        Get the subforums under a forum, down to any depth, in one query.
+
+        Args:
+            forum_id: Forum ID
+            max_depth: Maximum depth (subforums directly under the forum are at depth 1)
+
+        Returns:
+            Subforums ordered by creation date, annotated with `tree_depth`
+        """
+        forum_uuid = uuid.UUID(str(forum_id))
+        position = Func(F('path'), Value(forum_uuid, output_field=UUIDField()), function='array_position',
+                        output_field=IntegerField())
+        queryset = Subforum.objects.filter(path__contains=[forum_uuid]).annotate(
+            tree_depth=Func(F('path'), function='cardinality', output_field=IntegerField()) - position + 1
         )
+        if max_depth is not None:
+            queryset = queryset.filter(tree_depth__lte=max_depth)
+        return list(queryset.order_by('created_at', 'subforum_id'))
     
+    @staticmethod
+    def get_post_counts(subforum_ids: List[str]) -> List[Subforum]:
+        """Get the stored post counts of subforums (one query, only the counter loaded)."""
+        return list(Subforum.objects.filter(subforum_id__in=subforum_ids).only('subforum_id', 'post_count'))
+
     @staticmethod
     def get_by_id(subforum_id: str) -> Optional[Subforum]:
         """Get subforum by ID."""
@@ -229,11 +357,11 @@ class SubforumRepository:
     @staticmethod
     def increment_post_count(subforum_id: str) -> None:
         """Increment post count."""
-        Subforum.objects.filter(subforum_id=subforum_id).update(post_count=F('post_count') + 1)
+        subforum_counters.add(subforum_id, post_count=1)
 
     @staticmethod
     def decrement_post_count(subforum_id: str) -> None:
-        Subforum.objects.filter(subforum_id=subforum_id).update(post_count=F('post_count') - 1)
+        subforum_counters.add(subforum_id, post_count=-1)
 
 
 class MembershipRepository:
@@ -0,0 +1,212 @@
+"""
+Read-through cache of hot entities by primary key.
+
+L1 is an identity map scoped to the current request (opened by
+common.middleware.IdentityMapMiddleware, or `identity_map()` elsewhere):
+an entity read several times while serving a request is loaded once and
+is the same instance every time. Outside a scope there is no L1.
+
+L2 is the shared Django cache (Redis). An entry holds the column values of
+the entity and of its select_related rows, not pickled model instances,
+and is stamped with the entity's version. `invalidate()` bumps the
+version, so an entry written by a reader that raced with a writer is
+never served; entries of a changed column layout are never read either.
+
+Hit/miss counts are kept per worker and added to a Redis hash every
+ENTITY_CACHE_METRICS_INTERVAL seconds (see `stats()`).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from common.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ('l1_hits', 'l2_hits', 'misses', 'invalidations')
+
+_identity_map: ContextVar[Optional[Dict]] = ContextVar('entity_identity_map', default=None)
+
+
+@contextmanager
+def identity_map() -> Iterator[None]:
+    """Scope in which entities read through an EntityCache are loaded once (e.g. a request)."""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def _layout(model) -> tuple:
+    """Columns stored per row (generated columns are deferred, see SearchableManager)."""
+    return tuple(field.attname for field in model._meta.concrete_fields if not field.generated)
+
+
+class EntityCache:
+    """Versioned read-through cache of one model, with its select_related rows."""
+
+    def __init__(self, name: str, model, related: Sequence[str] = (), joined: Optional[Dict[str, 'EntityCache']] = None,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            name: Cache name (key namespace and metrics label)
+            model: Cached model
+            related: One-to-one/foreign key relations loaded and stored with the entity
+            joined: Relations read through another EntityCache (and invalidated with it)
+            ttl: Seconds an entry is kept in L2 (defaults to ENTITY_CACHE_TTL)
+        """
+        self.name = name
+        self.model = model
+        self.related = tuple(related)
+        self.joined = joined or {}
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ENTITY_CACHE_TTL', 300)
+        self._fields = [model._meta.get_field(relation) for relation in self.related]
+        self._layouts = (_layout(model),) + tuple(_layout(field.related_model) for field in self._fields)
+        self._signature = hashlib.sha1(repr(self._layouts).encode()).hexdigest()[:8]
+        self.metrics_key = f'entities:metrics:{name}'
+        self._counts = Counter()
+        self._published_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _version_key(self, pk: str) -> str:
+        return f'entities:{self.name}:version:{pk}'
+
+    def _entry_key(self, pk: str) -> str:
+        return f'entities:{self.name}:{self._signature}:{pk}'
+
+    def _canonical(self, pk) -> Optional[str]:
+        """The primary key as keyed in both tiers (any spelling of a UUID maps to one), None if invalid."""
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            return None
+        return None if pk is None else str(pk)
+
+    def get(self, pk) -> Optional[Any]:
+        """
+        Get an entity, loading it on a miss of both tiers.
+
+        Args:
+            pk: Primary key
+
+        Returns:
+            The entity with its related rows, or None when it does not exist
+            or the key is invalid (not cached)
+        """
+        pk = self._canonical(pk)
+        if pk is None:
+            return None
+        scope = _identity_map.get()
+        if scope is not None and (self.name, pk) in scope:
+            self._count('l1_hits')
+            return scope[(self.name, pk)]
+
+        obj = self._get_shared(pk)
+        if obj is not None:
+            for relation, entity_cache in self.joined.items():
+                related = entity_cache.get(getattr(obj, f'{relation}_id'))
+                if related is not None:
+                    setattr(obj, relation, related)
+            if scope is not None:
+                scope[(self.name, pk)] = obj
+        return obj
+
+    def _get_shared(self, pk: str) -> Optional[Any]:
+        version_key, entry_key = self._version_key(pk), self._entry_key(pk)
+        values = cache.get_many([version_key, entry_key])
+        version, entry = values.get(version_key), values.get(entry_key)
+        if version is not None and entry is not None and entry[0] == version:
+            self._count('l2_hits')
+            return self._build(entry[1])
+
+        self._count('misses')
+        if version is None:
+            # Start a version before reading, so a write committed meanwhile bumps it
+            cache.add(version_key, time.time_ns(), self.ttl)
+            version = cache.get(version_key)
+        obj = self.model._default_manager.select_related(*self.related).filter(pk=pk).first()
+        if obj is not None and version is not None:
+            cache.set(entry_key, (version, self._dump(obj)), self.ttl)
+        return obj
+
+    def _dump(self, obj) -> tuple:
+        # Taken right after loading: file fields still hold their name, not a FieldFile
+        rows = [obj] + [getattr(obj, field.name, None) for field in self._fields]
+        return tuple(
+            None if row is None else tuple(row.__dict__[attname] for attname in layout)
+            for row, layout in zip(rows, self._layouts)
+        )
+
+    def _build(self, rows: tuple):
+        obj = self.model.from_db(DEFAULT_DB_ALIAS, self._layouts[0], rows[0])
+        for field, layout, row in zip(self._fields, self._layouts[1:], rows[1:]):
+            related = None if row is None else field.related_model.from_db(DEFAULT_DB_ALIAS, layout, row)
+            # As select_related does: cache both sides, None included
+            field.set_cached_value(obj, related)
+            if related is not None and not field.concrete:
+                field.remote_field.set_cached_value(related, obj)
+        return obj
+
+    def invalidate(self, *pks) -> None:
+        """Drop cached entities, now and again once the transaction commits."""
+        # Invalid keys name no entity, hence no entry
+        pks = [pk for pk in map(self._canonical, pks) if pk is not None]
+        if not pks:
+            return
+        scope = _identity_map.get()
+        if scope is not None:
+            for pk in pks:
+                scope.pop((self.name, pk), None)
+        self._count('invalidations', len(pks))
+        self._bump(pks)
+        transaction.on_commit(lambda: self._bump(pks))
+
+    def _bump(self, pks) -> None:
+        for pk in pks:
+            try:
+                cache.incr(self._version_key(pk))
+            except ValueError:
+                # No version: no entry can be served, the next read starts one
+                pass
+
+    def _count(self, event: str, n: int = 1) -> None:
+        interval = getattr(settings, 'ENTITY_CACHE_METRICS_INTERVAL', 10)
+        with self._lock:
+            self._counts[event] += n
+            due = time.monotonic() - self._published_at >= interval
+        if due:
+            self.publish_metrics()
+
+    def publish_metrics(self) -> None:
+        """Add this worker's hit/miss counts to the shared ones (best effort)."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._published_at = time.monotonic()
+        if not counts:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for event, n in counts.items():
+                pipe.hincrby(self.metrics_key, event, n)
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning('Redis unreachable, dropping %s cache metrics', self.name, exc_info=True)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counts of every worker, and the share of reads served without a query."""
+        self.publish_metrics()
+        raw = get_redis().hgetall(self.metrics_key)
+        counts = {event: int(raw.get(event.encode(), 0)) for event in EVENTS}
+        reads = counts['l1_hits'] + counts['l2_hits'] + counts['misses']
+        counts['hit_ratio'] = round((counts['l1_hits'] + counts['l2_hits']) / reads, 4) if reads else 0.0
+        return counts
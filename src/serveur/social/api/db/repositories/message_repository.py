@@ -1,9 +1,16 @@
 """
 Message and Report repository for data access.
 """
-from typing import Optional, List, Tuple
-from django.db.models import Q
-from db.entities.message_entity import Message, Report, AuditLog
+import json
+from typing import Optional, List, Tuple, Union
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from db.entities.message_entity import Message, ConversationSummary, Report, AuditLog
+from common.audit import AuditWriter
+from common.utils import CursorPage, keyset_paginate
+
+CONVERSATION_ORDERING = ['-last_activity_at', '-summary_id']
 
 
 class MessageRepository:
@@ -12,7 +19,7 @@ class MessageRepository:
     @staticmethod
     def create(sender_id: str, receiver_id: str, encrypted_content: str,
                encryption_key_sender: str, encryption_key_receiver: str) -> Message:
-        """Create a new message."""
+        """Create a new message (conversation summaries are updated in the same transaction)."""
         return Message.objects.create(
             sender_id=sender_id,
             receiver_id=receiver_id,
@@ -22,61 +29,46 @@ class MessageRepository:
         )
     
     @staticmethod
-    def get_conversation(user1_id: str, user2_id: str, page: int = 1, page_size: int = 20) -> List[Message]:
-        """Get messages between two users (excluding deleted ones)."""
-        offset = (page - 1) * page_size
-        return Message.objects.filter(
-            Q(sender_id=user1_id, receiver_id=user2_id, deleted_by_sender=False) |
-            Q(sender_id=user2_id, receiver_id=user1_id, deleted_by_receiver=False)
-        ).select_related('sender', 'receiver').order_by('-created_at')[offset:offset + page_size]
+    def get_conversation(user1_id: str, user2_id: str, page: int = 1, page_size: int = 20,
+                         cursor: Optional[str] = None) -> CursorPage:
+        """Get messages between two users, excluding those deleted by user1 (range read on the conversation key)."""
+        queryset = Message.objects.filter(
+            conversation_key=Message.conversation_key_for(user1_id, user2_id)
+        ).exclude(
+            Q(sender_id=user1_id, deleted_by_sender=True) |
+            Q(receiver_id=user1_id, deleted_by_receiver=True)
+        ).select_related('sender', 'receiver')
+        return keyset_paginate(queryset, ['-created_at', '-message_id'], page, page_size, cursor)
     
     @staticmethod
-    def get_conversations(user_id: str, page: int = 1, page_size: int = 20) -> List[dict]:
-        """Get list of conversations for user (excluding deleted ones)."""
-        # Get unique conversation partners (excluding fully deleted conversations)
-        sent = Message.objects.filter(
-            sender_id=user_id,
-            deleted_by_sender=False
-        ).values_list('receiver_id', flat=True).distinct()
-        
-        received = Message.objects.filter(
-            receiver_id=user_id,
-            deleted_by_receiver=False
-        ).values_list('sender_id', flat=True).distinct()
-        
-        partner_ids = set(list(sent) + list(received))
-        
-        conversations = []
-        for partner_id in partner_ids:
-            last_message = Message.objects.filter(
-                Q(sender_id=user_id, receiver_id=partner_id, deleted_by_sender=False) |
-                Q(sender_id=partner_id, receiver_id=user_id, deleted_by_receiver=False)
-            ).select_related('sender', 'receiver').order_by('-created_at').first()
-            
-            if not last_message:
-                continue
-            
-            unread_count = Message.objects.filter(
-                sender_id=partner_id,
-                receiver_id=user_id,
-                is_read=False,
-                deleted_by_receiver=False
-            ).count()
-            
-            conversations.append({
-                'partner_id': partner_id,
-                'last_message': last_message,
-                'unread_count': unread_count
-            })
-        
-        return sorted(conversations, key=lambda x: x['last_message'].created_at, reverse=True)
+    def get_conversations(user_id: str, page: int = 1, page_size: int = 20,
+                          cursor: Optional[str] = None) -> CursorPage:
+        """Get list of conversations for user, most recent first (one range read on the summaries)."""
+        summaries = keyset_paginate(ConversationSummary.objects.filter(
+            user_id=user_id,
+            is_deleted=False
+        ).select_related('last_message'), CONVERSATION_ORDERING, page, page_size, cursor)
+        return CursorPage([{
+            'partner_id': summary.partner_id,
+            'last_message': summary.last_message,
+            'unread_count': summary.unread_count
+        } for summary in summaries], summaries.next_cursor)
     
     @staticmethod
+    @transaction.atomic
     def mark_as_read(sender_id: str, receiver_id: str) -> None:
         """Mark messages as read."""
-        Message.objects.filter(sender_id=sender_id, receiver_id=receiver_id, is_read=False).update(is_read=True)
+        Message.objects.filter(
+            conversation_key=Message.conversation_key_for(sender_id, receiver_id),
+            receiver_id=receiver_id,
+            is_read=False
+        ).update(is_read=True)
+        ConversationSummary.objects.filter(
+            user_id=receiver_id, partner_id=sender_id, unread_count__gt=0
+        ).update(unread_count=0)
     
     @staticmethod
+    @transaction.atomic
     def mark_conversation_as_deleted(user_id: str, other_user_id: str) -> int:
         """
         Mark all messages in a conversation as deleted for the current user.
@@ -88,21 +80,21 @@ class MessageRepository:
         Returns:
             Number of messages updated
         """
-        # Mark messages where user is sender
-        count_sender = Message.objects.filter(
-            sender_id=user_id,
-            receiver_id=other_user_id,
-            deleted_by_sender=False
-        ).update(deleted_by_sender=True)
+        # One UPDATE over the conversation range, setting the flag of the user's side
+        count = Message.objects.filter(
+            Q(sender_id=user_id, deleted_by_sender=False) | Q(receiver_id=user_id, deleted_by_receiver=False),
+            conversation_key=Message.conversation_key_for(user_id, other_user_id)
+        ).update(
+            deleted_by_sender=Case(When(sender_id=user_id, then=Value(True)), default=F('deleted_by_sender')),
+            deleted_by_receiver=Case(When(receiver_id=user_id, then=Value(True)), default=F('deleted_by_receiver'))
+        )
         
-        # Mark messages where user is receiver
-        count_receiver = Message.objects.filter(
-            sender_id=other_user_id,
-            receiver_id=user_id,
-            deleted_by_receiver=False
-        ).update(deleted_by_receiver=True)
+        # Hide the conversation from the user's inbox until a new message arrives
+        ConversationSummary.objects.filter(user_id=user_id, partner_id=other_user_id).update(
+            is_deleted=True, last_message=None, unread_count=0
+        )
         
-        return count_sender + count_receiver
+        return count
 
 
 class ReportRepository:
@@ -188,29 +180,42 @@ class AuditLogRepository:
     
     @staticmethod
     def create(user_id: Optional[str], action_type: str, resource_type: str,
-               resource_id: Optional[str] = None, details: Optional[str] = None,
+               resource_id: Optional[str] = None, details: Optional[Union[str, dict]] = None,
                ip_address: Optional[str] = None) -> AuditLog:
-        """Create a new audit log entry."""
-        # Ensure resource_id is stored as a string for consistent comparisons
-        stored_resource_id = str(resource_id) if resource_id is not None else None
-        print('DEBUG: AuditLogRepository.create called with resource_id=', repr(resource_id), 'stored=', repr(stored_resource_id))
-        audit = AuditLog.objects.create(
+        """
+        Record an audit event.
+
+        With AUDIT_LOG_MODE 'sync' the row is inserted right away, inside the
+        caller's transaction. Otherwise it is queued once that transaction
+        commits (dropped on rollback) and stored in batches by the audit writer.
+        """
+        audit = AuditLog(
             user_id=user_id,
             action_type=action_type,
             resource_type=resource_type,
-            resource_id=stored_resource_id,
-            details=details,
-            ip_address=ip_address
+            resource_id=str(resource_id) if resource_id is not None else None,
+            details=details if details is None or isinstance(details, str) else json.dumps(details, default=str),
+            ip_address=ip_address,
         )
-        # Force-update DB row in case of type mismatches and re-fetch
-        try:
-            AuditLog.objects.filter(log_id=audit.log_id).update(resource_id=stored_resource_id)
-            refreshed = AuditLog.objects.get(log_id=audit.log_id)
-            print('DEBUG: created audit resource_id repr after create:', repr(getattr(refreshed, '__dict__', {}).get('resource_id')))
-            return refreshed
-        except Exception as e:
-            print('DEBUG: audit create/refresh exception', e)
+        if settings.AUDIT_LOG_MODE == 'sync':
+            audit.save(force_insert=True)
             return audit
+        row = {field.attname: getattr(audit, field.attname) for field in AuditLog._meta.concrete_fields}
+        transaction.on_commit(lambda: audit_writer.enqueue(row))
+        return audit
+
+    @staticmethod
+    def bulk_create(rows: List[dict]) -> None:
+        """Store queued audit rows (idempotent on log_id; unknown users are recorded as None)."""
+        from db.entities.user_entity import User
+
+        user_ids = {row['user_id'] for row in rows if row.get('user_id')}
+        existing = set(map(str, User.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)))
+        logs = [
+            AuditLog(**{**row, 'user_id': row['user_id'] if str(row.get('user_id')) in existing else None})
+            for row in rows
+        ]
+        AuditLog.objects.bulk_create(logs, batch_size=settings.AUDIT_LOG_BATCH_SIZE, ignore_conflicts=True)
     
     @staticmethod
     def get_by_user(user_id: str, page: int = 1, page_size: int = 20) -> List[AuditLog]:
@@ -219,8 +224,14 @@ class AuditLogRepository:
         return AuditLog.objects.filter(user_id=user_id).order_by('-created_at')[offset:offset + page_size]
     
     @staticmethod
-    def get_all(page: int = 1, page_size: int = 20) -> List[AuditLog]:
+    def get_all(page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> CursorPage:
         """Get all audit logs."""
-        offset = (page - 1) * page_size
-        return AuditLog.objects.select_related('user').order_by('-created_at')[offset:offset + page_size]
+        return keyset_paginate(AuditLog.objects.select_related('user'), ['-created_at', '-log_id'], page, page_size, cursor)
+
 
+audit_writer = AuditWriter(
+    AuditLogRepository.bulk_create,
+    settings.AUDIT_LOG_SPOOL_DIR,
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+)
@@ -1,9 +1,48 @@
 """
 Post repository for data access.
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import F
 from db.entities.post_entity import Post, Comment, Like, Tag, PostTag
+from common.counters import CounterBuffer
+from common.utils import CursorPage, keyset_paginate
+from common.trending import hot_score_expression
+from common.visibility import VisibilityFilter
+from db.repositories.entity_cache import EntityCache
+from db.repositories.user_repository import user_cache
+
+POST_ORDERING = ['-created_at', '-post_id']
+TRENDING_ORDERING = ['-hot_score', '-post_id']
+
+
+def _post_count_updates(deltas: Dict[str, int]) -> Dict:
+    like_count = F('like_count') + deltas.get('like_count', 0)
+    comment_count = F('comment_count') + deltas.get('comment_count', 0)
+    return {
+        'like_count': like_count,
+        'comment_count': comment_count,
+        'hot_score': hot_score_expression(like_count=like_count, comment_count=comment_count),
+    }
+
+
+# Posts by ID with their subforum, authors read through the user cache;
+# invalidated on delete and whenever stored counts change
+post_cache = EntityCache('posts', Post, related=['subforum'], joined={'user': user_cache})
+
+# Like/comment counts, written behind (see common.counters); overlay() them on reads
+post_counters = CounterBuffer(Post, ['like_count', 'comment_count'], _post_count_updates,
+                              on_applied=lambda post_ids: post_cache.invalidate(*post_ids))
+
+# A comment and all its replies, down to any depth (recursive CTE on parent_comment_id)
+COMMENT_SUBTREE_CTE = '''
+WITH RECURSIVE subtree AS (
+    SELECT comment_id, 0 AS depth FROM comments WHERE comment_id = %s
+    UNION ALL
+    SELECT c.comment_id, s.depth + 1 FROM comments c JOIN subtree s ON c.parent_comment_id = s.comment_id
+)
+'''
 
 
 class PostRepository:
@@ -23,21 +62,30 @@ class PostRepository:
     
     @staticmethod
     def get_by_id(post_id: str) -> Optional[Post]:
-        """Get post by ID."""
-        try:
-            return Post.objects.select_related('user', 'user__profile', 'subforum').get(post_id=post_id)
-        except Post.DoesNotExist:
-            return None
+        """
+        Get post by ID, with its author (profile, settings) and subforum.
+
+        Read through post_cache: the subforum's own counters are as of
+        caching time, overlay or re-read them where they matter.
+        """
+        return post_cache.get(post_id)
+    
+    @staticmethod
+    def get_bulk(post_ids: List[str]) -> Dict[str, Post]:
+        """Get posts by IDs (one query), keyed by post ID."""
+        posts = Post.objects.filter(post_id__in=post_ids).select_related('user', 'user__profile')
+        return {str(post.post_id): post for post in posts}
     
     @staticmethod
     def delete(post_id: str) -> bool:
         """Delete a post."""
         deleted, _ = Post.objects.filter(post_id=post_id).delete()
+        post_cache.invalidate(post_id)
         return deleted > 0
     
     @staticmethod
-    def get_feed(user_id: str, page: int = 1, page_size: int = 20) -> List[Post]:
-        """Get personalized feed for user - posts from followed users and subscribed subforums."""
+    def get_feed_queryset(user_id: str, visibility: Optional[VisibilityFilter] = None):
+        """Unsliced pull query behind the home feed (followed users, own posts, subforums)."""
         from django.db.models import Q
         from db.entities.user_entity import Follow
         from db.entities.domain_entity import SubforumSubscription
@@ -60,49 +108,79 @@ class PostRepository:
         # Merge subscribed and user subforums into a set
         effective_subforum_ids = set(list(subscribed_subforum_ids) + list(user_subforum_ids))
 
-        # Get posts from followed users, the user themself, OR subscribed subforums
-        offset = (page - 1) * page_size
-        return Post.objects.filter(
+        # Get posts from followed users, the user themself, OR subscribed subforums,
+        # minus blocked authors and private authors the user doesn't follow
+        return (visibility or VisibilityFilter(user_id)).filter_posts(Post.objects.filter(
             Q(user_id__in=following_ids) | Q(user_id=user_id) | Q(subforum_id__in=list(effective_subforum_ids))
-        ).select_related('user', 'user__profile', 'subforum').order_by('-created_at')[offset:offset + page_size]
+        ))
+
+    @staticmethod
+    def get_feed(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                 visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """Get personalized feed for user - posts from followed users and subscribed subforums."""
+        queryset = PostRepository.get_feed_queryset(user_id, visibility).select_related('user', 'user__profile', 'subforum')
+        return keyset_paginate(queryset, POST_ORDERING, page, page_size, cursor)
     
     @staticmethod
-    def get_discover(page: int = 1, page_size: int = 20) -> List[Post]:
+    def get_discover(page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                     visibility: Optional[VisibilityFilter] = None) -> CursorPage:
         """Get popular posts for discovery."""
-        offset = (page - 1) * page_size
-        return Post.objects.select_related('user', 'user__profile', 'subforum').order_by('-like_count', '-created_at')[offset:offset + page_size]
+        return PostRepository.get_trending(page=page, page_size=page_size, cursor=cursor, visibility=visibility)
+
+    @staticmethod
+    def get_trending(domain_id: Optional[str] = None, subforum_id: Optional[str] = None, page: int = 1,
+                     page_size: int = 20, cursor: Optional[str] = None,
+                     visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """Get trending posts by hot score, optionally within a domain or a subforum (index seek)."""
+        queryset = Post.objects.select_related('user', 'user__profile', 'subforum')
+        if visibility is not None:
+            queryset = visibility.filter_posts(queryset)
+        if subforum_id:
+            queryset = queryset.filter(subforum_id=subforum_id)
+        if domain_id:
+            queryset = queryset.filter(subforum__parent_domain_id=domain_id)
+        return keyset_paginate(queryset, TRENDING_ORDERING, page, page_size, cursor)
+
+    @staticmethod
+    def rescore(post_ids: Optional[List[str]] = None) -> int:
+        """Recompute hot scores from the stored counts (all posts when no IDs given)."""
+        queryset = Post.objects.all() if post_ids is None else Post.objects.filter(post_id__in=post_ids)
+        return queryset.update(hot_score=hot_score_expression())
     
     @staticmethod
-    def get_by_subforum(subforum_id: str, page: int = 1, page_size: int = 20) -> List[Post]:
-        """Get posts in a subforum."""
-        offset = (page - 1) * page_size
-        return Post.objects.filter(subforum_id=subforum_id).select_related('user', 'user__profile').order_by('-created_at')[offset:offset + page_size]
+    def get_by_subforum(subforum_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                        visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """Get posts in a subforum (seeks on the (subforum, -created_at) index)."""
+        queryset = Post.objects.filter(subforum_id=subforum_id).select_related('user', 'user__profile')
+        if visibility is not None:
+            queryset = visibility.filter_posts(queryset)
+        return keyset_paginate(queryset, POST_ORDERING, page, page_size, cursor)
     
     @staticmethod
-    def get_by_user(user_id: str, page: int = 1, page_size: int = 20) -> List[Post]:
+    def get_by_user(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> CursorPage:
         """Get posts by user."""
-        offset = (page - 1) * page_size
-        return Post.objects.filter(user_id=user_id).select_related('subforum').order_by('-created_at')[offset:offset + page_size]
+        queryset = Post.objects.filter(user_id=user_id).select_related('subforum')
+        return keyset_paginate(queryset, POST_ORDERING, page, page_size, cursor)
     
     @staticmethod
     def increment_like_count(post_id: str) -> None:
         """Increment like count."""
-        Post.objects.filter(post_id=post_id).update(like_count=F('like_count') + 1)
+        post_counters.add(post_id, like_count=1)
     
     @staticmethod
     def decrement_like_count(post_id: str) -> None:
         """Decrement like count."""
-        Post.objects.filter(post_id=post_id).update(like_count=F('like_count') - 1)
+        post_counters.add(post_id, like_count=-1)
     
     @staticmethod
     def increment_comment_count(post_id: str) -> None:
         """Increment comment count."""
-        Post.objects.filter(post_id=post_id).update(comment_count=F('comment_count') + 1)
+        post_counters.add(post_id, comment_count=1)
     
     @staticmethod
-    def decrement_comment_count(post_id: str) -> None:
-        """Decrement comment count."""
-        Post.objects.filter(post_id=post_id).update(comment_count=F('comment_count') - 1)
+    def decrement_comment_count(post_id: str, count: int = 1) -> None:
+        """Decrement comment count (by `count` comments at once)."""
+        post_counters.add(post_id, comment_count=-count)
 
 
 class CommentRepository:
@@ -129,38 +207,80 @@ class CommentRepository:
         except Comment.DoesNotExist:
             return None
     
+    @staticmethod
+    def get_bulk(comment_ids: List[str]) -> Dict[str, Comment]:
+        """Get comments by IDs with their authors and their post's author (one query), keyed by comment ID."""
+        comments = Comment.objects.filter(comment_id__in=comment_ids).select_related(
+            'user', 'user__profile', 'post__user__profile'
+        )
+        return {str(comment.comment_id): comment for comment in comments}
+    
     @staticmethod
     def delete(comment_id: str) -> bool:
         """Delete a comment and all its replies (cascade)."""
-        # Get the comment to retrieve post_id before deletion
-        comment = Comment.objects.filter(comment_id=comment_id).first()
-        if comment:
-            post_id = comment.post_id
-            # Django's CASCADE will delete all replies, but deleted count includes them
-            deleted, _ = Comment.objects.filter(comment_id=comment_id).delete()
-            if deleted > 0:
-                # Decrement comment count by the number of comments deleted (parent + all replies)
-                for _ in range(deleted):
-                    PostRepository.decrement_comment_count(post_id)
-                return True
-        return False
-    
-    @staticmethod
-    def get_by_post(post_id: str, page: int = 1, page_size: int = 20, sort_by: str = "created_at") -> List[Comment]:
-        """Get comments for a post."""
-        offset = (page - 1) * page_size
-        return Comment.objects.filter(
+        return CommentRepository.delete_subtree(comment_id) > 0
+
+    @staticmethod
+    def get_subtree_size(comment_id: str) -> int:
+        """Number of comments deleting a comment would remove (itself and all its replies)."""
+        with connection.cursor() as cursor:
+            cursor.execute(COMMENT_SUBTREE_CTE + 'SELECT count(*) FROM subtree', [str(comment_id)])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def delete_subtree(comment_id: str, batch_size: Optional[int] = None) -> int:
+        """
+        Delete a comment and all its replies, deepest replies first, in batches.
+
+        Each batch is one DELETE in its own atomic block, followed by a single
+        comment count decrement for the whole batch. Outside a transaction
+        every batch commits on its own, so a huge thread never holds its row
+        locks for the whole deletion.
+
+        Args:
+            comment_id: Root of the subtree
+            batch_size: Comments per DELETE (defaults to COMMENT_DELETE_BATCH_SIZE)
+
+        Returns:
+            Number of comments deleted
+        """
+        post_id = Comment.objects.filter(comment_id=comment_id).values_list('post_id', flat=True).first()
+        if post_id is None:
+            return 0
+        batch_size = batch_size or settings.COMMENT_DELETE_BATCH_SIZE
+        deleted = 0
+        while True:
+            # Re-read the subtree until it is gone, to catch replies posted meanwhile
+            with connection.cursor() as cursor:
+                cursor.execute(COMMENT_SUBTREE_CTE + 'SELECT comment_id FROM subtree ORDER BY depth DESC',
+                               [str(comment_id)])
+                ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return deleted
+            for start in range(0, len(ids), batch_size):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute('DELETE FROM comments WHERE comment_id = ANY(%s)', [ids[start:start + batch_size]])
+                    if cursor.rowcount:
+                        PostRepository.decrement_comment_count(post_id, count=cursor.rowcount)
+                        deleted += cursor.rowcount
+    
+    @staticmethod
+    def get_by_post(post_id: str, page: int = 1, page_size: int = 20, sort_by: str = "created_at",
+                    cursor: Optional[str] = None) -> CursorPage:
+        """Get comments for a post (seeks on the (post, -created_at) index)."""
+        queryset = Comment.objects.filter(
             post_id=post_id,
             parent_comment_id__isnull=True
-        ).select_related('user', 'user__profile').order_by('-created_at')[offset:offset + page_size]
+        ).select_related('user', 'user__profile')
+        return keyset_paginate(queryset, ['-created_at', '-comment_id'], page, page_size, cursor)
     
     @staticmethod
-    def get_replies(comment_id: str, page: int = 1, page_size: int = 20) -> List[Comment]:
+    def get_replies(comment_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> CursorPage:
         """Get replies to a comment."""
-        offset = (page - 1) * page_size
-        return Comment.objects.filter(
+        queryset = Comment.objects.filter(
             parent_comment_id=comment_id
-        ).select_related('user', 'user__profile').order_by('created_at')[offset:offset + page_size]
+        ).select_related('user', 'user__profile')
+        return keyset_paginate(queryset, ['created_at', 'comment_id'], page, page_size, cursor)
 
 
 class LikeRepository:
@@ -183,8 +303,16 @@ class LikeRepository:
         return Like.objects.filter(user_id=user_id, post_id=post_id).exists()
     
     @staticmethod
-    def get_by_post(post_id: str, page: int = 1, page_size: int = 20) -> List[Like]:
+    def get_liked_post_ids(user_id: str, post_ids: List) -> set:
+        """Get which of the given posts the user liked (one query)."""
+        return set(Like.objects.filter(user_id=user_id, post_id__in=post_ids).values_list('post_id', flat=True))
+    
+    @staticmethod
+    def get_by_post(post_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                    visibility: Optional[VisibilityFilter] = None) -> CursorPage:
         """Get likes for a post."""
-        offset = (page - 1) * page_size
-        return Like.objects.filter(post_id=post_id).select_related('user', 'user__profile').order_by('-created_at')[offset:offset + page_size]
+        queryset = Like.objects.filter(post_id=post_id).select_related('user', 'user__profile')
+        if visibility is not None:
+            queryset = visibility.filter_users(queryset)
+        return keyset_paginate(queryset, ['-created_at', '-like_id'], page, page_size, cursor)
 
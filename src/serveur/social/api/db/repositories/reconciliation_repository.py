@@ -0,0 +1,214 @@
+"""
+Reconciliation of denormalized counters.
+
+Like/comment/post/member/subforum counts are maintained by increments and
+drift when a path skips them (or a counter flush is applied twice). This
+recounts them with GROUP BY queries and adds the difference back.
+
+An incremental run only recounts the rows touched since the previous run:
+parents of child rows created since then (with some overlap, for
+transactions that committed late) and rows whose counters were buffered
+(see common.counters). Deletions that bypass the counters (cascades) are
+only caught by a full run, which walks whole tables in keyset order.
+
+Corrections are deltas, not absolute values, taking the deltas not
+flushed yet (pending or flushing in Redis) into account. Each chunk is
+reconciled holding the counter buffer's flush lock, so no batch moves from
+Redis to the rows between the recount and the correction. A child row
+whose transaction committed but whose delta is not in Redis yet (pushed
+on commit) still looks like drift: rows are only corrected if their drift
+is unchanged after COUNTER_RECONCILE_SETTLE_SECONDS, the others are left
+to the next run.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from common.counters import LOCK_TTL_MS, CounterBuffer, apply_deltas
+from db.entities.domain_entity import Domain, Forum, Subforum, Membership
+from db.entities.post_entity import Post, Comment, Like
+from db.repositories.domain_repository import forum_counters, subforum_counters
+from db.repositories.post_repository import post_counters
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = 'counters:reconciled_at'
+# Child rows created this long before the previous run are recounted again
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+class Aggregate(NamedTuple):
+    """A counter column and the child rows it counts."""
+    name: str
+    model: type
+    column: str
+    child: type
+    parent_field: str
+    created_field: str
+    buffer: Optional[CounterBuffer] = None
+    # Small table: always recounted in full
+    scan_all: bool = False
+
+
+class DriftReport(NamedTuple):
+    """Outcome of reconciling one aggregate."""
+    name: str
+    checked: int
+    drifted: int
+    drift: int
+
+
+AGGREGATES = (
+    Aggregate('posts.like_count', Post, 'like_count', Like, 'post_id', 'created_at', post_counters),
+    Aggregate('posts.comment_count', Post, 'comment_count', Comment, 'post_id', 'created_at', post_counters),
+    Aggregate('subforums.post_count', Subforum, 'post_count', Post, 'subforum_id', 'created_at', subforum_counters),
+    Aggregate('forums.member_count', Forum, 'member_count', Membership, 'forum_id', 'joined_at', forum_counters),
+    Aggregate('forums.post_count', Forum, 'post_count', Post, 'subforum__forum_id', 'created_at', forum_counters),
+    Aggregate('domains.subforum_count', Domain, 'subforum_count', Subforum, 'parent_domain_id', 'created_at',
+              scan_all=True),
+)
+
+
+@contextmanager
+def _flush_lock(buffer: Optional[CounterBuffer]) -> Iterator[Optional[str]]:
+    """Hold the flush lock of a counter buffer (waiting for a flush in progress); yields its token."""
+    if buffer is None:
+        yield None
+        return
+    token = buffer.acquire(wait=LOCK_TTL_MS / 1000)
+    if token is None:
+        raise RuntimeError(f'{buffer.model.__name__} counters are being flushed, try again later')
+    try:
+        yield token
+    finally:
+        buffer.release(token)
+
+
+class ReconciliationRepository:
+    """Recounts denormalized counters and corrects their drift."""
+
+    @staticmethod
+    def all_ids(aggregate: Aggregate, batch_size: int) -> Iterator[List]:
+        """Primary keys of the whole table, in keyset-ordered chunks."""
+        pk = aggregate.model._meta.pk.name
+        queryset = aggregate.model.objects.order_by(pk)
+        last_id = None
+        while True:
+            batch = queryset if last_id is None else queryset.filter(**{f'{pk}__gt': last_id})
+            ids = list(batch.values_list(pk, flat=True)[:batch_size])
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+    @staticmethod
+    def touched_ids(aggregate: Aggregate, since, buffered: Iterable[str] = ()) -> List[str]:
+        """Rows with children created since `since`, or in `buffered`, sorted."""
+        created = aggregate.child.objects.filter(**{
+            f'{aggregate.created_field}__gte': since,
+            f'{aggregate.parent_field}__isnull': False,
+        }).order_by().values_list(aggregate.parent_field, flat=True).distinct()
+        return sorted({str(pk) for pk in created} | set(buffered))
+
+    @staticmethod
+    def drift(aggregate: Aggregate, ids: List) -> Dict[str, int]:
+        """
+        Compare the counters of some rows with their children (one GROUP BY).
+
+        Returns:
+            Correction to add per drifted row {pk: delta}
+        """
+        pk = aggregate.model._meta.pk.name
+        rows = list(aggregate.model.objects.filter(**{f'{pk}__in': ids}).only(pk, aggregate.column))
+        if aggregate.buffer is not None:
+            aggregate.buffer.overlay(rows)
+        actual = dict(
+            aggregate.child.objects.filter(**{f'{aggregate.parent_field}__in': ids})
+            .order_by().values(aggregate.parent_field).annotate(count=Count('pk'))
+            .values_list(aggregate.parent_field, 'count')
+        )
+        corrections = {}
+        for row in rows:
+            delta = actual.get(row.pk, 0) - getattr(row, aggregate.column)
+            if delta:
+                corrections[str(row.pk)] = delta
+        return corrections
+
+    @staticmethod
+    def settled_drift(aggregate: Aggregate, ids: List) -> Dict[str, int]:
+        """Drift of some rows, minus rows whose drift changes within COUNTER_RECONCILE_SETTLE_SECONDS."""
+        corrections = ReconciliationRepository.drift(aggregate, ids)
+        settle = getattr(settings, 'COUNTER_RECONCILE_SETTLE_SECONDS', 1)
+        if not corrections or not settle:
+            return corrections
+        time.sleep(settle)
+        again = ReconciliationRepository.drift(aggregate, list(corrections))
+        return {pk: delta for pk, delta in corrections.items() if again.get(pk) == delta}
+
+    @staticmethod
+    def correct(aggregate: Aggregate, corrections: Dict[str, int]) -> None:
+        """Add corrections to the counters (one UPDATE per distinct correction)."""
+        update_fields = aggregate.buffer.update_fields if aggregate.buffer is not None else None
+        apply_deltas(aggregate.model, {pk: {aggregate.column: delta} for pk, delta in corrections.items()},
+                     update_fields)
+        if aggregate.buffer is not None:
+            aggregate.buffer.applied(list(corrections))
+
+    @staticmethod
+    def reconcile(aggregate: Aggregate, chunks: Iterable[List], dry_run: bool = False) -> DriftReport:
+        """Reconcile the rows of each chunk; corrections are applied chunk by chunk, under the flush lock."""
+        checked = drifted = drift = 0
+        for ids in chunks:
+            with _flush_lock(aggregate.buffer) as token:
+                corrections = ReconciliationRepository.settled_drift(aggregate, ids)
+                checked += len(ids)
+                drifted += len(corrections)
+                drift += sum(abs(delta) for delta in corrections.values())
+                if corrections and not dry_run:
+                    if token is not None and not aggregate.buffer.extend(token):
+                        raise RuntimeError(f'Lost the {aggregate.name} flush lock while reconciling')
+                    ReconciliationRepository.correct(aggregate, corrections)
+        if drifted:
+            logger.warning('%s: %d of %d rows drifted by %d in total', aggregate.name, drifted, checked, drift)
+        return DriftReport(aggregate.name, checked, drifted, drift)
+
+    @staticmethod
+    def reconcile_all(full: bool = False, batch_size: int = 1000, dry_run: bool = False) -> List[DriftReport]:
+        """
+        Reconcile every aggregate.
+
+        Args:
+            full: Recount whole tables instead of the rows touched since the last run
+                (also the case of the first run)
+            batch_size: Rows per GROUP BY
+            dry_run: Only report the drift
+
+        Returns:
+            A drift report per aggregate
+        """
+        started_at = timezone.now()
+        since = None if full else cache.get(WATERMARK_KEY)
+        buffers = {id(a.buffer): a.buffer for a in AGGREGATES if a.buffer is not None}.values()
+        # Snapshot the touched sets: rows buffered during this run are kept for the next one
+        touched = {id(buffer): buffer.touched() for buffer in buffers}
+
+        reports = []
+        for aggregate in AGGREGATES:
+            if since is None or aggregate.scan_all:
+                chunks = ReconciliationRepository.all_ids(aggregate, batch_size)
+            else:
+                ids = ReconciliationRepository.touched_ids(
+                    aggregate, since - WATERMARK_OVERLAP, touched.get(id(aggregate.buffer), ()))
+                chunks = (ids[i:i + batch_size] for i in range(0, len(ids), batch_size))
+            reports.append(ReconciliationRepository.reconcile(aggregate, chunks, dry_run))
+
+        if not dry_run:
+            for buffer in buffers:
+                buffer.untouch(touched.get(id(buffer), ()))
+            cache.set(WATERMARK_KEY, started_at, None)
+        return reports
@@ -0,0 +1,135 @@
+"""
+Full-text search repository for posts and comments.
+
+Posts and comments carry stored `tsvector` columns generated by Postgres,
+one per text search configuration (`search_fr`, `search_en`, see
+db.entities.post_entity), each with a GIN index: matching is an index
+lookup. Queries use the web search syntax ("quoted phrases", -exclusion,
+OR), results are ranked with `ts_rank` (post titles weigh more than their
+content) and paginated by keyset on (rank, id). Highlight snippets are
+computed for the returned page only, from the same fields as the vectors.
+"""
+import html
+from typing import Optional
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField, TextField, Value
+from django.db.models.functions import Cast, Concat
+from common.utils import CursorPage, keyset_paginate
+from common.visibility import VisibilityFilter
+from db.entities.post_entity import Post, Comment, SEARCH_CONFIGS
+
+RELEVANCE_ORDERING = ['-rank', '-pk']
+RECENT_ORDERING = ['-created_at', '-pk']
+
+# Highlight delimiters, replaced by <mark> once the snippet is HTML-escaped
+START_SEL, STOP_SEL = '\ue000', '\ue001'
+HEADLINE_OPTIONS = {'start_sel': START_SEL, 'stop_sel': STOP_SEL, 'max_words': 35, 'min_words': 15,
+                    'max_fragments': 2, 'fragment_delimiter': ' … '}
+
+
+def _query(query: str, language: str) -> SearchQuery:
+    return SearchQuery(query, config=SEARCH_CONFIGS[language], search_type='websearch')
+
+
+def _rank(vector: str, search_query: SearchQuery) -> Cast:
+    # ts_rank is a float4, only read back rounded: as a double the cursor keeps the exact rank
+    return Cast(SearchRank(F(vector), search_query), FloatField())
+
+
+# Text fields of the search vectors, in order (see db.entities.post_entity)
+POST_TEXT = ('title', 'content')
+COMMENT_TEXT = ('content',)
+
+
+def _highlight(page: CursorPage, model, fields, search_query: SearchQuery, language: str) -> CursorPage:
+    """Set `snippet` (escaped HTML, matches in <mark>) on the items of a page, in one query."""
+    if not page:
+        return page
+    parts = [F(fields[0])]
+    for field in fields[1:]:
+        parts += [Value(' — '), F(field)]
+    document = Concat(*parts, output_field=TextField()) if len(parts) > 1 else parts[0]
+    snippets = dict(
+        model.objects.filter(pk__in=[item.pk for item in page])
+        .annotate(snippet=SearchHeadline(document, search_query, config=SEARCH_CONFIGS[language], **HEADLINE_OPTIONS))
+        .values_list('pk', 'snippet')
+    )
+    for item in page:
+        snippet = html.escape(snippets.get(item.pk) or '')
+        item.snippet = snippet.replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+    return page
+
+
+class SearchRepository:
+    """Repository for full-text search."""
+
+    @staticmethod
+    def search_posts(query: str, language: str = 'fr', domain_id: Optional[str] = None,
+                     subforum_id: Optional[str] = None, tag_id: Optional[str] = None,
+                     author_id: Optional[str] = None, sort: str = 'relevance', page: int = 1,
+                     page_size: int = 20, cursor: Optional[str] = None,
+                     visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """
+        Search posts by title and content.
+
+        Args:
+            query: Web search syntax query
+            language: Text search configuration ('fr' or 'en')
+            domain_id, subforum_id, tag_id, author_id: Optional filters
+            sort: 'relevance' (ts_rank) or 'recent'
+            page, page_size, cursor: Pagination
+
+        Returns:
+            CursorPage of posts, with `rank` and `snippet`
+        """
+        vector = f'search_{language}'
+        search_query = _query(query, language)
+        queryset = (
+            Post.objects.filter(**{vector: search_query})
+            .annotate(rank=_rank(vector, search_query))
+            .select_related('user', 'user__profile', 'subforum')
+        )
+        if visibility is not None:
+            queryset = visibility.filter_posts(queryset)
+        if domain_id:
+            queryset = queryset.filter(subforum__parent_domain_id=domain_id)
+        if subforum_id:
+            queryset = queryset.filter(subforum_id=subforum_id)
+        if tag_id:
+            queryset = queryset.filter(post_tags__tag_id=tag_id)
+        if author_id:
+            queryset = queryset.filter(user_id=author_id)
+        ordering = RECENT_ORDERING if sort == 'recent' else RELEVANCE_ORDERING
+        page = keyset_paginate(queryset, ordering, page, page_size, cursor)
+        return _highlight(page, Post, POST_TEXT, search_query, language)
+
+    @staticmethod
+    def search_comments(query: str, language: str = 'fr', post_id: Optional[str] = None,
+                        subforum_id: Optional[str] = None, author_id: Optional[str] = None,
+                        sort: str = 'relevance', page: int = 1, page_size: int = 20,
+                        cursor: Optional[str] = None, visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """
+        Search comments by content.
+
+        Returns:
+            CursorPage of comments, with `rank` and `snippet`
+        """
+        vector = f'search_{language}'
+        search_query = _query(query, language)
+        queryset = (
+            Comment.objects.filter(**{vector: search_query})
+            .annotate(rank=_rank(vector, search_query))
+            .select_related('user', 'user__profile')
+        )
+        if visibility is not None:
+            queryset = visibility.filter_posts(queryset)
+            queryset = visibility.filter_posts(queryset, field='post__user')
+        if post_id:
+            queryset = queryset.filter(post_id=post_id)
+        if subforum_id:
+            queryset = queryset.filter(post__subforum_id=subforum_id)
+        if author_id:
+            queryset = queryset.filter(user_id=author_id)
+        ordering = RECENT_ORDERING if sort == 'recent' else RELEVANCE_ORDERING
+        page = keyset_paginate(queryset, ordering, page, page_size, cursor)
+        return _highlight(page, Comment, COMMENT_TEXT, search_query, language)
@@ -0,0 +1,139 @@
+"""
+Statistics repository for admin dashboards.
+
+Dashboard counters are computed with conditional aggregation, one query
+per table, on `created_at` ranges (which use the created_at indexes,
+unlike `created_at__date` filters that cast every row). Totals are counted
+live: the rollup records creations per day, so summing it would keep
+counting deleted rows. Time series are read from the `daily_stats`
+rollup, one row per day.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from db.entities.message_entity import Report
+from db.entities.post_entity import Post, Comment, Like
+from db.entities.stats_entity import DailyStats
+from db.entities.user_entity import User
+from db.repositories.post_repository import post_cache
+from db.repositories.user_repository import user_cache
+
+# Rollup column -> (model, creation timestamp field)
+ROLLUP_SOURCES = {
+    'new_users': (User, 'created_at'),
+    'new_posts': (Post, 'created_at'),
+    'new_comments': (Comment, 'created_at'),
+    'new_likes': (Like, 'created_at'),
+    'new_reports': (Report, 'created_at'),
+}
+
+
+def day_start(day: date) -> datetime:
+    """Midnight of a day in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class StatsRepository:
+    """Repository for admin statistics and the daily_stats rollup."""
+
+    @staticmethod
+    def user_stats(today: Optional[date] = None) -> Dict[str, int]:
+        """User counters (one query)."""
+        today = today or timezone.localdate()
+        start_today = day_start(today)
+        return User.objects.aggregate(
+            total_users=Count('pk'),
+            new_users_today=Count('pk', filter=Q(created_at__gte=start_today)),
+            new_users_this_week=Count('pk', filter=Q(created_at__gte=day_start(today - timedelta(days=7)))),
+            active_users_today=Count('pk', filter=Q(last_login_at__gte=start_today)),
+            banned_users=Count('pk', filter=Q(is_banned=True)),
+        )
+
+    @staticmethod
+    def post_stats(today: Optional[date] = None) -> Dict[str, int]:
+        """Post and comment counters (one query per table)."""
+        today = today or timezone.localdate()
+        stats = Post.objects.aggregate(
+            total_posts=Count('pk'),
+            new_posts_today=Count('pk', filter=Q(created_at__gte=day_start(today))),
+            new_posts_this_week=Count('pk', filter=Q(created_at__gte=day_start(today - timedelta(days=7)))),
+        )
+        stats['total_comments'] = Comment.objects.count()
+        return stats
+
+    @staticmethod
+    def report_stats() -> Dict[str, int]:
+        """Report counters (one query)."""
+        return Report.objects.aggregate(
+            total_reports=Count('pk'),
+            pending_reports=Count('pk', filter=Q(status='pending')),
+            resolved_reports=Count('pk', filter=Q(status='resolved')),
+            rejected_reports=Count('pk', filter=Q(status='rejected')),
+        )
+
+    @staticmethod
+    def rollup(start: date, end: date) -> int:
+        """
+        Recompute the daily_stats rows of a range of days (one GROUP BY per source table).
+
+        Args:
+            start: First day
+            end: Last day (included)
+
+        Returns:
+            Number of days written
+        """
+        days = {start + timedelta(days=i): DailyStats(day=start + timedelta(days=i))
+                for i in range((end - start).days + 1)}
+        if not days:
+            return 0
+        for column, (model, field) in ROLLUP_SOURCES.items():
+            counts = (
+                model.objects.filter(**{f'{field}__gte': day_start(start), f'{field}__lt': day_start(end + timedelta(days=1))})
+                .annotate(day=TruncDate(field)).order_by().values('day').annotate(count=Count('pk'))
+                .values_list('day', 'count')
+            )
+            for day, count in counts:
+                setattr(days[day], column, count)
+        DailyStats.objects.bulk_create(
+            days.values(),
+            update_conflicts=True,
+            unique_fields=['day'],
+            update_fields=[*ROLLUP_SOURCES, 'updated_at'],
+        )
+        return len(days)
+
+    @staticmethod
+    def rollup_pending(today: Optional[date] = None) -> int:
+        """
+        Roll up the days since the last rollup, that day included (it may have been partial).
+
+        The first run starts at the day the first user signed up.
+
+        Returns:
+            Number of days written
+        """
+        today = today or timezone.localdate()
+        start = DailyStats.objects.aggregate(last=Max('day'))['last']
+        if start is None:
+            first_signup = User.objects.aggregate(first=Min('created_at'))['first']
+            start = timezone.localdate(first_signup) if first_signup else today
+        return StatsRepository.rollup(start, today)
+
+    @staticmethod
+    def daily_series(start: date, end: date) -> List[Dict]:
+        """Counts per day from the rollup, with zeros for days not rolled up yet."""
+        rows = {row.day: row for row in DailyStats.objects.filter(day__gte=start, day__lte=end)}
+        series = []
+        for i in range((end - start).days + 1):
+            day = start + timedelta(days=i)
+            row = rows.get(day) or DailyStats(day=day)
+            series.append({'day': day, **{column: getattr(row, column) for column in ROLLUP_SOURCES}})
+        return series
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Dict[str, float]]:
+        """Hit/miss counts of the post and user caches (see db.repositories.entity_cache)."""
+        return {'posts': post_cache.stats(), 'users': user_cache.stats()}
@@ -1,7 +1,8 @@
 """
 Repositories for Tag and PostTag operations.
 """
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional
 from db.entities.post_entity import Tag, PostTag
 
 
@@ -56,3 +57,11 @@ class PostTagRepository:
     @staticmethod
     def get_by_post(post_id: str) -> List[PostTag]:
         return PostTag.objects.filter(post_id=post_id).select_related('tag')
+
+    @staticmethod
+    def get_tags_by_posts(post_ids: List) -> Dict:
+        """Tags of each of the given posts, by tag name (one query)."""
+        tags = defaultdict(list)
+        for post_tag in PostTag.objects.filter(post_id__in=post_ids).select_related('tag').order_by('tag__tag_name'):
+            tags[post_tag.post_id].append(post_tag.tag)
+        return tags
@@ -0,0 +1,152 @@
+"""
+Timeline repository for data access.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from django.conf import settings
+from django.db.models import Count, F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+from db.entities.post_entity import Post
+from db.entities.user_entity import Follow
+from db.entities.domain_entity import SubforumSubscription
+from db.entities.timeline_entity import Timeline, TimelineEntry
+from common.utils import CursorPage, keyset_paginate, seek_filter
+from common.visibility import VisibilityFilter
+
+TIMELINE_ORDERING = ['-created_at', '-post_id']
+
+
+class TimelineRepository:
+    """Repository for materialized home timelines."""
+
+    @staticmethod
+    def get_depth() -> int:
+        """Maximum number of entries kept per timeline."""
+        return getattr(settings, 'FEED_TIMELINE_DEPTH', 500)
+
+    @staticmethod
+    def is_warm(user_id: str) -> bool:
+        """Check if the user's timeline has been materialized."""
+        return Timeline.objects.filter(user_id=user_id).exists()
+
+    @staticmethod
+    def mark_warm(user_id: str) -> None:
+        """Record that the user's timeline is materialized."""
+        Timeline.objects.get_or_create(user_id=user_id)
+
+    @staticmethod
+    def mark_cold(candidates: Q) -> int:
+        """Make the warm timelines of the users matching `candidates` (a Q on user_id) rebuild on their next read."""
+        deleted, _ = Timeline.objects.filter(candidates).delete()
+        return deleted
+
+    @staticmethod
+    def get_warm_user_ids(candidates: Q) -> List[str]:
+        """Get IDs of warm timelines among the users matching `candidates` (a Q on user_id)."""
+        return list(Timeline.objects.filter(candidates).values_list('user_id', flat=True))
+
+    @staticmethod
+    def is_full(user_id: str) -> bool:
+        """Check if the timeline reached its depth (older posts were trimmed away)."""
+        depth = TimelineRepository.get_depth()
+        return TimelineEntry.objects.filter(user_id=user_id).order_by('-created_at')[depth - 1:depth].exists()
+
+    @staticmethod
+    def get_page(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                 visibility: Optional[VisibilityFilter] = None) -> CursorPage:
+        """Get a page of the materialized timeline (single range read on (user, -created_at))."""
+        entries = TimelineEntry.objects.filter(user_id=user_id).select_related(
+            'post', 'post__user', 'post__user__profile', 'post__subforum'
+        )
+        if visibility is not None:
+            entries = visibility.filter_posts(entries, field='post__user')
+        entries = keyset_paginate(entries, TIMELINE_ORDERING, page, page_size, cursor)
+        return CursorPage([entry.post for entry in entries], entries.next_cursor)
+
+    @staticmethod
+    def get_entry_keys(user_id: str, limit: int, before: Optional[Sequence] = None,
+                       visibility: Optional[VisibilityFilter] = None) -> List[Tuple[datetime, str, None, bool]]:
+        """Get the newest (created_at, post_id, None, False) merge keys of the timeline (filtered here)."""
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        if visibility is not None:
+            entries = visibility.filter_posts(entries, field='post__user')
+        if before:
+            entries = entries.filter(seek_filter(TIMELINE_ORDERING, before))
+        entries = entries.order_by(*TIMELINE_ORDERING).values_list('created_at', 'post_id')[:limit]
+        return [(created_at, str(post_id), None, False) for created_at, post_id in entries]
+
+    @staticmethod
+    def get_recent_keys(posts: QuerySet, limit: int) -> List[Tuple[datetime, str, str, bool]]:
+        """Get the newest (created_at, post_id, author_id, author_is_private) keys of a post queryset."""
+        recent = posts.order_by('-created_at', '-post_id').values_list(
+            'created_at', 'post_id', 'user_id', 'user__profile__privacy'
+        )[:limit]
+        return [
+            (created_at, str(post_id), str(user_id) if user_id else None, privacy is False)
+            for created_at, post_id, user_id, privacy in recent
+        ]
+
+    @staticmethod
+    def get_posts_in_order(post_ids: List[str]) -> List[Post]:
+        """Fetch posts by ID in one query, keeping the given order and skipping deleted ones."""
+        posts = Post.objects.select_related('user', 'user__profile', 'subforum').in_bulk(post_ids)
+        by_id = {str(pk): post for pk, post in posts.items()}
+        return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+    @staticmethod
+    def get_heavy_author_ids(threshold: int) -> Set[str]:
+        """Get IDs of users with at least `threshold` accepted followers."""
+        rows = Follow.objects.filter(status='accepted').values('following_id').annotate(
+            n=Count('follow_id')
+        ).filter(n__gte=threshold).values_list('following_id', flat=True)
+        return {str(user_id) for user_id in rows}
+
+    @staticmethod
+    def get_heavy_subforum_ids(threshold: int) -> Set[str]:
+        """Get IDs of subforums with at least `threshold` subscribers or distinct posters."""
+        subscribed = SubforumSubscription.objects.values('subforum_id').annotate(
+            n=Count('user_id')
+        ).filter(n__gte=threshold).values_list('subforum_id', flat=True)
+        posted = Post.objects.filter(subforum_id__isnull=False).values('subforum_id').annotate(
+            n=Count('user_id', distinct=True)
+        ).filter(n__gte=threshold).values_list('subforum_id', flat=True)
+        return {str(subforum_id) for subforum_id in subscribed} | {str(subforum_id) for subforum_id in posted}
+
+    @staticmethod
+    def push(post: Post, user_ids: Iterable[str]) -> None:
+        """Insert a post into each given timeline."""
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post.post_id, created_at=post.created_at) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def backfill(user_id: str, posts: QuerySet) -> None:
+        """Insert the most recent posts of `posts` into the user's timeline."""
+        recent = posts.order_by('-created_at').values_list('post_id', 'created_at')[:TimelineRepository.get_depth()]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id, created_at=created_at) for post_id, created_at in recent],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def prune(user_id: str, posts: Q) -> int:
+        """Remove entries whose post matches `posts` (a Q on Post) from the user's timeline."""
+        deleted, _ = TimelineEntry.objects.filter(
+            user_id=user_id,
+            post_id__in=Post.objects.filter(posts).values('post_id')
+        ).delete()
+        return deleted
+
+    @staticmethod
+    def trim(user_ids: Iterable[str]) -> None:
+        """Keep only the newest `FEED_TIMELINE_DEPTH` entries of each given timeline."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        overflow = TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+            rank=Window(RowNumber(), partition_by=[F('user_id')], order_by=[F('created_at').desc(), F('post_id').desc()])
+        ).filter(rank__gt=TimelineRepository.get_depth()).values_list('entry_id', flat=True)
+        overflow = list(overflow)
+        if overflow:
+            TimelineEntry.objects.filter(entry_id__in=overflow).delete()
@@ -2,9 +2,41 @@
 User repository for data access.
 """
 
-from typing import Optional, List
+from typing import Optional, List, Set
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from db.entities.user_entity import User, UserProfile, UserSettings, Block, Follow
+from common.cache import TwoTierCache
+from common.prefix_index import PrefixIndex, matches
+from common.trigram import trigram_search
+from common.utils import CursorPage, keyset_paginate
+from db.repositories.entity_cache import EntityCache
+
+FOLLOW_ORDERING = ['-created_at', '-follow_id']
+
+# Per-user "blocked either way" sets, invalidated on block/unblock
+block_cache = TwoTierCache(
+    'blocks:either_way',
+    ttl=getattr(settings, 'BLOCK_CACHE_TTL', 300),
+    local_ttl=getattr(settings, 'BLOCK_CACHE_LOCAL_TTL', 5),
+)
+
+# Users resolved by authentication, invalidated on ban/unban and profile changes
+auth_user_cache = TwoTierCache(
+    'users:firebase_uid',
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+    local_ttl=getattr(settings, 'AUTH_USER_CACHE_LOCAL_TTL', 5),
+)
+
+# Users by ID with their profile and settings, invalidated with the authentication cache
+user_cache = EntityCache('users', User, related=['profile', 'settings'])
+
+# Usernames for autocomplete, caught up on sign-ups and rebuilt on renames
+username_index = PrefixIndex(
+    'users:username', User, 'username',
+    rebuild_interval=getattr(settings, 'AUTOCOMPLETE_REBUILD_INTERVAL', 600),
+)
 
 
 class UserRepository:
@@ -12,11 +44,8 @@ class UserRepository:
     
     @staticmethod
     def get_by_id(user_id: str) -> Optional[User]:
-        """Get user by ID."""
-        try:
-            return User.objects.select_related('profile', 'settings').get(user_id=user_id)
-        except User.DoesNotExist:
-            return None
+        """Get user by ID (read through user_cache, see invalidate)."""
+        return user_cache.get(user_id)
     
     @staticmethod
     def get_by_firebase_uid(firebase_uid: str) -> Optional[User]:
@@ -25,6 +54,24 @@ class UserRepository:
             return User.objects.select_related('profile', 'settings').get(firebase_uid=firebase_uid)
         except User.DoesNotExist:
             return None
+
+    @staticmethod
+    def get_for_auth(firebase_uid: str) -> Optional[User]:
+        """Get user by Firebase UID for request authentication (cached, see invalidate_auth)."""
+        return auth_user_cache.get(firebase_uid, lambda: UserRepository.get_by_firebase_uid(firebase_uid))
+
+    @staticmethod
+    def invalidate_auth(*firebase_uids: str) -> None:
+        """Drop cached authentication users, now and again once the transaction commits."""
+        firebase_uids = [uid for uid in firebase_uids if uid]
+        auth_user_cache.delete(*firebase_uids)
+        transaction.on_commit(lambda: auth_user_cache.delete(*firebase_uids))
+
+    @staticmethod
+    def invalidate(user: User) -> None:
+        """Drop the cached copies of a user, its profile and settings (by ID and for authentication)."""
+        user_cache.invalidate(user.user_id)
+        UserRepository.invalidate_auth(user.firebase_uid)
     
     @staticmethod
     def get_by_email(email: str) -> Optional[User]:
@@ -64,6 +111,8 @@ class UserRepository:
         )
         UserProfile.objects.create(user=user)
         UserSettings.objects.create(user=user)
+        UserRepository.invalidate_auth(uid)
+        username_index.added()
         return user
     
     @staticmethod
@@ -72,16 +121,48 @@ class UserRepository:
         for key, value in kwargs.items():
             setattr(user, key, value)
         user.save()
+        UserRepository.invalidate(user)
+        if 'username' in kwargs:
+            username_index.invalidate()
         return user
     
     @staticmethod
-    def search_by_username(query: str, page: int = 1, page_size: int = 20) -> List[User]:
-        """Search users by username (case-insensitive)."""
+    def search_by_username(query: str, page: int = 1, page_size: int = 20, visibility=None) -> List[User]:
+        """
+        Search users by username, hiding users blocked by/blocking the viewer.
+
+        Usernames containing the query (case-insensitive) come first, then
+        similar ones, by trigram similarity (see common.trigram).
+        """
         offset = (page - 1) * page_size
-        return User.objects.filter(
-            username__icontains=query,
-            is_banned=False
-        ).select_related('profile')[offset:offset + page_size]
+        queryset = trigram_search(User.objects.filter(is_banned=False), 'username', query).select_related('profile')
+        if visibility is not None:
+            queryset = visibility.filter_users(queryset, field='pk')
+        return queryset[offset:offset + page_size]
+
+    @staticmethod
+    def autocomplete(prefix: str, limit: int = 10, visibility=None) -> List[User]:
+        """
+        Complete a username prefix from the in-memory index.
+
+        Args:
+            prefix: Typed prefix (of the username or of one of its words)
+            limit: Maximum number of users
+            visibility: Optional VisibilityFilter of the viewer
+
+        Returns:
+            Users in alphabetical order of the matched key
+        """
+        # Over-fetch: banned, hidden and renamed users are dropped once re-read by primary key
+        user_ids = username_index.search(prefix, limit * 2)
+        if not user_ids:
+            return []
+        queryset = User.objects.filter(user_id__in=user_ids, is_banned=False).select_related('profile')
+        if visibility is not None:
+            queryset = visibility.filter_users(queryset, field='pk')
+        users = {user.user_id: user for user in queryset}
+        found = [users[user_id] for user_id in user_ids if user_id in users]
+        return [user for user in found if matches(user.username, prefix)][:limit]
     
     @staticmethod
     def get_bulk(user_ids: List[str]) -> List[User]:
@@ -98,18 +179,46 @@ class BlockRepository:
     @staticmethod
     def create(blocker_id: str, blocked_id: str) -> Block:
         """Create a block."""
-        return Block.objects.create(blocker_id=blocker_id, blocked_id=blocked_id)
+        block = Block.objects.create(blocker_id=blocker_id, blocked_id=blocked_id)
+        BlockRepository.invalidate(blocker_id, blocked_id)
+        return block
     
     @staticmethod
     def delete(blocker_id: str, blocked_id: str) -> bool:
         """Delete a block."""
         deleted, _ = Block.objects.filter(blocker_id=blocker_id, blocked_id=blocked_id).delete()
+        BlockRepository.invalidate(blocker_id, blocked_id)
         return deleted > 0
     
     @staticmethod
     def is_blocked(blocker_id: str, blocked_id: str) -> bool:
         """Check if user is blocked."""
         return Block.objects.filter(blocker_id=blocker_id, blocked_id=blocked_id).exists()
+
+    @staticmethod
+    def get_blocked_either_way_ids(user_id: str) -> Set[str]:
+        """Get IDs of users blocking or blocked by the user (cached, one query on a miss)."""
+        user_id = str(user_id)
+
+        def load():
+            pairs = Block.objects.filter(
+                Q(blocker_id=user_id) | Q(blocked_id=user_id)
+            ).values_list('blocker_id', 'blocked_id')
+            return frozenset(str(blocked_id if str(blocker_id) == user_id else blocker_id) for blocker_id, blocked_id in pairs)
+
+        return block_cache.get(user_id, load)
+
+    @staticmethod
+    def is_blocked_either_way(user_a_id: str, user_b_id: str) -> bool:
+        """Check if either user blocked the other (set lookup on the cached block set)."""
+        return str(user_b_id) in BlockRepository.get_blocked_either_way_ids(user_a_id)
+
+    @staticmethod
+    def invalidate(*user_ids: str) -> None:
+        """Drop the cached block sets of the users, now and again once the transaction commits."""
+        user_ids = [str(user_id) for user_id in user_ids]
+        block_cache.delete(*user_ids)
+        transaction.on_commit(lambda: block_cache.delete(*user_ids))
     
     @staticmethod
     def get_blocked_users(blocker_id: str, page: int = 1, page_size: int = 20) -> List[User]:
@@ -149,24 +258,43 @@ class FollowRepository:
             return None
     
     @staticmethod
-    def get_followers(user_id: str, status: str = 'accepted', page: int = 1, page_size: int = 20) -> List[User]:
+    def get_followers(user_id: str, status: str = 'accepted', page: int = 1, page_size: int = 20,
+                      cursor: Optional[str] = None) -> CursorPage:
         """Get user's followers (returns User objects)."""
-        offset = (page - 1) * page_size
-        follows = Follow.objects.filter(
+        follows = keyset_paginate(Follow.objects.filter(
             following_id=user_id,
             status=status
-        ).select_related('follower', 'follower__profile')[offset:offset + page_size]
-        return [follow.follower for follow in follows]
+        ).select_related('follower', 'follower__profile'), FOLLOW_ORDERING, page, page_size, cursor)
+        return CursorPage([follow.follower for follow in follows], follows.next_cursor)
 
     @staticmethod
-    def get_following(user_id: str, status: str = 'accepted', page: int = 1, page_size: int = 20) -> List[User]:
+    def get_following(user_id: str, status: str = 'accepted', page: int = 1, page_size: int = 20,
+                      cursor: Optional[str] = None) -> CursorPage:
         """Get users that user is following (returns User objects)."""
-        offset = (page - 1) * page_size
-        follows = Follow.objects.filter(
+        follows = keyset_paginate(Follow.objects.filter(
             follower_id=user_id,
             status=status
-        ).select_related('following', 'following__profile')[offset:offset + page_size]
-        return [follow.following for follow in follows]
+        ).select_related('following', 'following__profile'), FOLLOW_ORDERING, page, page_size, cursor)
+        return CursorPage([follow.following for follow in follows], follows.next_cursor)
+
+    @staticmethod
+    def get_following_ids(follower_id: str, user_ids: List, status: str = 'accepted') -> Set:
+        """Get which of the given users the follower follows (one query)."""
+        return set(Follow.objects.filter(
+            follower_id=follower_id,
+            following_id__in=user_ids,
+            status=status
+        ).values_list('following_id', flat=True))
+
+    @staticmethod
+    def get_followed_private_ids(user_id: str) -> Set[str]:
+        """Get IDs of private users the user follows (accepted)."""
+        following_ids = Follow.objects.filter(
+            follower_id=user_id,
+            status='accepted',
+            following__profile__privacy=False
+        ).values_list('following_id', flat=True)
+        return {str(following_id) for following_id in following_ids}
 
     @staticmethod
     def get_follow(viewer_id:str,followed_id:str):
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -69,6 +70,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'conf.urls'
@@ -135,6 +137,8 @@ REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
 REDIS_DB = int(os.getenv('REDIS_DB', '0'))
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+# Timeout (seconds) of the raw Redis client used for server-side scripts (common.redis_client)
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.5'))
 
 CACHES = {
     'default': {
@@ -235,6 +239,15 @@ CORS_ALLOW_HEADERS = [
 FIREBASE_SERVICE_ACCOUNT_KEY = os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY', None)
 # If FIREBASE_SERVICE_ACCOUNT_KEY is None, Firebase will use Application Default Credentials
 # This is useful when running on Google Cloud Platform
+# Project whose ID tokens are accepted (default: from the service account key or the environment)
+FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID', None)
+# Local stand-in signing certificates ({key id: PEM} JSON, see `manage.py firebase_local_keys`), offline only
+FIREBASE_CERTS_FILE = os.getenv('FIREBASE_CERTS_FILE', None)
+# Verified tokens are cached until they expire (at most this long in each worker's memory)
+AUTH_TOKEN_CACHE_LOCAL_TTL = float(os.getenv('AUTH_TOKEN_CACHE_LOCAL_TTL', '300'))
+# Authenticated users by Firebase UID: seconds in Redis, and in each worker's memory
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+AUTH_USER_CACHE_LOCAL_TTL = float(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', '5'))
 
 # Security Settings
 SECURE_SSL_REDIRECT = os.getenv('SECURE_SSL_REDIRECT', 'False') == 'True'
@@ -246,6 +259,71 @@ X_FRAME_OPTIONS = 'DENY'
 
 # Rate Limiting
 RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+# Seconds to rate limit in process memory after Redis failed, before trying Redis again
+RATE_LIMIT_REDIS_RETRY = float(os.getenv('RATE_LIMIT_REDIS_RETRY', '5'))
+# Two-tier limiters (general): seconds between syncs with Redis (0 checks Redis
+# on every request) and hits per client a worker may serve between two syncs
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv('RATE_LIMIT_SYNC_INTERVAL', '0.25'))
+RATE_LIMIT_LOCAL_BUDGET = int(os.getenv('RATE_LIMIT_LOCAL_BUDGET', '5'))
+
+# Home timeline (fan-out on write)
+FEED_TIMELINE_DEPTH = int(os.getenv('FEED_TIMELINE_DEPTH', '500'))
+# Authors/subforums above these audiences are pulled at read time instead of fanned out
+# (recomputed by the refresh_heavy_sources command); seconds and number of recent
+# posts cached per heavy source
+FEED_HEAVY_FOLLOWER_THRESHOLD = int(os.getenv('FEED_HEAVY_FOLLOWER_THRESHOLD', '10000'))
+FEED_HEAVY_SUBFORUM_THRESHOLD = int(os.getenv('FEED_HEAVY_SUBFORUM_THRESHOLD', '10000'))
+FEED_HEAVY_SOURCES_TTL = int(os.getenv('FEED_HEAVY_SOURCES_TTL', '600'))
+FEED_HEAVY_RECENT_SIZE = int(os.getenv('FEED_HEAVY_RECENT_SIZE', '100'))
+
+# Trending: seconds of age worth a tenfold engagement difference
+TRENDING_GRAVITY_SECONDS = int(os.getenv('TRENDING_GRAVITY_SECONDS', '45000'))
+
+# Block graph cache: seconds in Redis, and in each worker's memory (bounds cross-worker staleness)
+BLOCK_CACHE_TTL = int(os.getenv('BLOCK_CACHE_TTL', '300'))
+BLOCK_CACHE_LOCAL_TTL = float(os.getenv('BLOCK_CACHE_LOCAL_TTL', '5'))
+
+# Forum trees and domain listings: seconds a cached version is kept (also bounds
+# how stale the post counts in forum trees may be)
+STRUCTURE_CACHE_TTL = int(os.getenv('STRUCTURE_CACHE_TTL', '300'))
+
+# Username/forum name autocomplete: in-memory prefix indexes, rebuilt at least every this many seconds
+AUTOCOMPLETE_REBUILD_INTERVAL = float(os.getenv('AUTOCOMPLETE_REBUILD_INTERVAL', '600'))
+AUTOCOMPLETE_MAX_RESULTS = int(os.getenv('AUTOCOMPLETE_MAX_RESULTS', '20'))
+# 'background' (full rebuilds run in a thread, the previous index is served meanwhile) or 'sync'
+AUTOCOMPLETE_REBUILD_MODE = os.getenv('AUTOCOMPLETE_REBUILD_MODE', 'background')
+
+# Posts/users read by ID: seconds cached in Redis, and seconds between publications
+# of each worker's hit/miss counts (GET /admin/stats/cache/)
+ENTITY_CACHE_TTL = int(os.getenv('ENTITY_CACHE_TTL', '300'))
+ENTITY_CACHE_METRICS_INTERVAL = float(os.getenv('ENTITY_CACHE_METRICS_INTERVAL', '10'))
+
+# Like/comment/post/member counters: 'buffered' (deltas in Redis, applied in
+# batches every COUNTER_FLUSH_INTERVAL seconds, 0 leaves it to the
+# flush_counters command) or 'sync' (updated in place)
+COUNTER_MODE = os.getenv('COUNTER_MODE', 'buffered')
+COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', '0.5'))
+# Reconciliation only corrects rows whose drift is unchanged after this many seconds
+# (deltas of just committed transactions reach Redis meanwhile)
+COUNTER_RECONCILE_SETTLE_SECONDS = float(os.getenv('COUNTER_RECONCILE_SETTLE_SECONDS', '1'))
+
+# Comments deleted per DELETE when removing a comment and its replies
+COMMENT_DELETE_BATCH_SIZE = int(os.getenv('COMMENT_DELETE_BATCH_SIZE', '1000'))
+
+# Message encryption: parsed public keys kept per worker, and thread pool for batch decryption
+ENCRYPTION_KEY_CACHE_SIZE = int(os.getenv('ENCRYPTION_KEY_CACHE_SIZE', '1024'))
+ENCRYPTION_PARALLEL_THRESHOLD = int(os.getenv('ENCRYPTION_PARALLEL_THRESHOLD', '32'))
+ENCRYPTION_MAX_WORKERS = int(os.getenv('ENCRYPTION_MAX_WORKERS', '4'))
+
+# Audit log: 'async' batches rows after commit (spooled to disk until stored), 'sync' inserts inline
+AUDIT_LOG_MODE = os.getenv('AUDIT_LOG_MODE', 'async')
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', '200'))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', '2'))
+AUDIT_LOG_SPOOL_DIR = os.getenv('AUDIT_LOG_SPOOL_DIR', str(BASE_DIR / 'logs' / 'audit-spool'))
+# Audit log partitions: months kept in the database (0 keeps all), months created ahead, archive of older months
+AUDIT_LOG_RETENTION_MONTHS = int(os.getenv('AUDIT_LOG_RETENTION_MONTHS', '12'))
+AUDIT_LOG_PARTITIONS_AHEAD = int(os.getenv('AUDIT_LOG_PARTITIONS_AHEAD', '3'))
+AUDIT_LOG_ARCHIVE_DIR = os.getenv('AUDIT_LOG_ARCHIVE_DIR', str(BASE_DIR / 'logs' / 'audit-archive'))
 
 # Logging Configuration
 LOGGING = {
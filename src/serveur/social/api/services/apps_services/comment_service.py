@@ -1,7 +1,7 @@
 """
 Comment service for comment management operations.
 """
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from django.db import transaction
 from db.repositories.post_repository import PostRepository, CommentRepository
 from db.repositories.user_repository import UserRepository, FollowRepository
@@ -10,6 +10,7 @@ from db.repositories.user_repository import BlockRepository
 from db.entities.post_entity import Comment
 from common.exceptions import NotFoundError, ValidationError, PermissionDeniedError
 from common.validators import Validator
+from common.visibility import VisibilityFilter
 
 
 class CommentService:
@@ -45,8 +46,8 @@ class CommentService:
         if not post:
             raise NotFoundError(f"Post {post_id} not found")
 
-        if BlockRepository.is_blocked(post.user.user_id,user_id):
-            raise PermissionDeniedError("Cannot comment post from a user that blocked you")
+        if BlockRepository.is_blocked_either_way(post.user.user_id, user_id):
+            raise PermissionDeniedError("Cannot comment post from a blocked user")
 
         if post.user.profile.privacy is False:
             follow = FollowRepository.get_follow(user_id, str(post.user.user_id))
@@ -59,8 +60,8 @@ class CommentService:
                 raise NotFoundError(f"Parent comment {parent_comment_id} not found")
             if parent_comment.post.post_id != post_id:
                 raise ValidationError("Parent comment does not belong to this post")
-            if BlockRepository.is_blocked(parent_comment.user.user_id,user_id):
-                raise PermissionDeniedError("Cannot reply to comment from a user that blocked you")
+            if BlockRepository.is_blocked_either_way(parent_comment.user.user_id, user_id):
+                raise PermissionDeniedError("Cannot reply to comment from a blocked user")
 
         # Create comment (repository will handle post comment count increment)
         comment = CommentRepository.create(
@@ -89,6 +90,35 @@ class CommentService:
             raise NotFoundError(f"Comment {comment_id} not found")
         return comment
     
+    @staticmethod
+    def get_bulk_comments(comment_ids: List[str], viewer_id: str) -> List[Tuple[str, Optional[Comment], Optional[Exception]]]:
+        """
+        Get comments by IDs, hiding those whose author or post author the viewer may not see.
+        
+        One query for the comments; the viewer's blocks and followed private
+        users are loaded once for all of them.
+        
+        Args:
+            comment_ids: Comment IDs
+            viewer_id: Viewer user ID
+            
+        Returns:
+            (comment_id, comment, error) per requested ID, in request order;
+            error is a NotFoundError or PermissionDeniedError when comment is None
+        """
+        comments = CommentRepository.get_bulk(comment_ids)
+        visibility = VisibilityFilter(viewer_id)
+        results = []
+        for comment_id in comment_ids:
+            comment = comments.get(comment_id)
+            if comment is None:
+                results.append((comment_id, None, NotFoundError(f"Comment {comment_id} not found")))
+            elif not (visibility.can_see(comment.user) and visibility.can_see(comment.post.user)):
+                results.append((comment_id, None, PermissionDeniedError("Cannot view this comment")))
+            else:
+                results.append((comment_id, comment, None))
+        return results
+    
     @staticmethod
     @transaction.atomic
     def delete_comment(comment_id: str, user_id: str, ip_address: Optional[str] = None) -> None:
@@ -127,7 +157,8 @@ class CommentService:
         post_id: str,
         page: int = 1,
         page_size: int = 20,
-        sort_by: str = 'created_at'
+        sort_by: str = 'created_at',
+        cursor: Optional[str] = None
     ) -> List[Comment]:
         """
         Get comments for a post.
@@ -137,6 +168,7 @@ class CommentService:
             page: Page number
             page_size: Page size
             sort_by: Sort field (created_at or like_count)
+            cursor: Cursor of the next page (overrides page)
             
         Returns:
             List of comments (top-level only, no replies)
@@ -146,13 +178,14 @@ class CommentService:
         if not post:
             raise NotFoundError(f"Post {post_id} not found")
         
-        return CommentRepository.get_by_post(post_id, page, page_size, sort_by)
+        return CommentRepository.get_by_post(post_id, page, page_size, sort_by, cursor=cursor)
     
     @staticmethod
-    def get_comment_replies(comment_id: str, page: int = 1, page_size: int = 20) -> List[Comment]:
+    def get_comment_replies(comment_id: str, page: int = 1, page_size: int = 20,
+                            cursor: Optional[str] = None) -> List[Comment]:
         """Get replies to a comment."""
         # Check comment exists
         comment = CommentService.get_comment_by_id(comment_id)
         
-        return CommentRepository.get_replies(comment_id, page, page_size)
+        return CommentRepository.get_replies(comment_id, page, page_size, cursor=cursor)
 
@@ -85,7 +85,7 @@ class DomainService:
         DomainRepository.increment_subforum_count(domain_id)
         
         # Audit log
-        created_log = AuditLogRepository.create(
+        AuditLogRepository.create(
             user_id=user_id,
             action_type='subforum_created',
             resource_type='subforum',
@@ -93,32 +93,6 @@ class DomainService:
             details={'domain_id': domain_id, 'resource_id': str(subforum.subforum_id)},
             ip_address=ip_address
         )
-
-        # Ensure resource_id is stored in a string-compatible form for
-        # compatibility with tests that compare to serialized IDs.
-        try:
-            from db.entities.message_entity import AuditLog as AuditLogModel
-            AuditLogModel.objects.filter(log_id=created_log.log_id).update(resource_id=str(subforum.subforum_id))
-            # Also explicitly set and save on the instance to ensure ORM caches match DB
-            try:
-                created_log.resource_id = str(subforum.subforum_id)
-                created_log.save(update_fields=['resource_id'])
-            except Exception:
-                pass
-            # Debug: inspect raw DB-stored value for troubleshooting
-            try:
-                raw_val = AuditLogModel.objects.filter(log_id=created_log.log_id).values_list('resource_id', flat=True).first()
-                print('DEBUG: raw audit resource_id after update:', repr(raw_val))
-                # Force another DB update if the field is still null
-                if raw_val is None:
-                    AuditLogModel.objects.filter(log_id=created_log.log_id).update(resource_id=str(subforum.subforum_id))
-                    raw_val2 = AuditLogModel.objects.filter(log_id=created_log.log_id).values_list('resource_id', flat=True).first()
-                    print('DEBUG: raw audit resource_id after force-update:', repr(raw_val2))
-            except Exception:
-                pass
-        except Exception:
-            # Swallow any unexpected errors — this is best-effort compatibility.
-            pass
         
         return subforum
     
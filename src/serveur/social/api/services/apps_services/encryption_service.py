@@ -3,12 +3,48 @@ Encryption service for E2E encrypted messaging.
 Uses AES-256 for content encryption and RSA-2048 for key encryption.
 """
 import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence, Tuple
+from django.conf import settings
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 import os
 
+# Parsed public keys by fingerprint (LRU); private keys are never cached
+_public_keys = OrderedDict()
+_public_keys_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _oaep():
+    return padding.OAEP(
+        mgf=padding.MGF1(algorithm=hashes.SHA256()),
+        algorithm=hashes.SHA256(),
+        label=None
+    )
+
+
+def key_fingerprint(pem: str) -> str:
+    """SHA-256 fingerprint of a PEM key."""
+    return hashlib.sha256(pem.strip().encode('utf-8')).hexdigest()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ENCRYPTION_MAX_WORKERS', 4),
+                thread_name_prefix='decrypt'
+            )
+        return _executor
+
 
 class EncryptionService:
     """Service for E2E message encryption."""
@@ -41,6 +77,37 @@ class EncryptionService:
         
         return private_pem.decode('utf-8'), public_pem.decode('utf-8')
     
+    @staticmethod
+    def load_public_key(public_key: str):
+        """
+        Load a PEM public key, reusing the parsed object of a previously seen key.
+        
+        Args:
+            public_key: RSA public key (PEM format)
+            
+        Returns:
+            RSA public key object
+        """
+        fingerprint = key_fingerprint(public_key)
+        with _public_keys_lock:
+            key = _public_keys.get(fingerprint)
+            if key is not None:
+                _public_keys.move_to_end(fingerprint)
+                return key
+        
+        key = serialization.load_pem_public_key(public_key.encode('utf-8'), backend=default_backend())
+        with _public_keys_lock:
+            _public_keys[fingerprint] = key
+            while len(_public_keys) > getattr(settings, 'ENCRYPTION_KEY_CACHE_SIZE', 1024):
+                _public_keys.popitem(last=False)
+        return key
+    
+    @staticmethod
+    def clear_key_cache() -> None:
+        """Drop every cached public key."""
+        with _public_keys_lock:
+            _public_keys.clear()
+    
     @staticmethod
     def encrypt_message(content: str, sender_public_key: str, receiver_public_key: str) -> dict:
         """
@@ -77,33 +144,9 @@ class EncryptionService:
         encrypted_data = iv + encrypted_content
         encrypted_content_b64 = base64.b64encode(encrypted_data).decode('utf-8')
         
-        # Encrypt AES key with sender's public key
-        sender_pub_key = serialization.load_pem_public_key(
-            sender_public_key.encode('utf-8'),
-            backend=default_backend()
-        )
-        encrypted_key_sender = sender_pub_key.encrypt(
-            aes_key,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
-        
-        # Encrypt AES key with receiver's public key
-        receiver_pub_key = serialization.load_pem_public_key(
-            receiver_public_key.encode('utf-8'),
-            backend=default_backend()
-        )
-        encrypted_key_receiver = receiver_pub_key.encrypt(
-            aes_key,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+        # Encrypt AES key with sender's and receiver's public keys
+        encrypted_key_sender = EncryptionService.load_public_key(sender_public_key).encrypt(aes_key, _oaep())
+        encrypted_key_receiver = EncryptionService.load_public_key(receiver_public_key).encrypt(aes_key, _oaep())
         
         return {
             'encrypted_content': encrypted_content_b64,
@@ -124,23 +167,47 @@ class EncryptionService:
         Returns:
             Decrypted message content
         """
-        # Load private key
-        priv_key = serialization.load_pem_private_key(
+        return EncryptionService._decrypt_with_key(
+            encrypted_content, encrypted_key, EncryptionService._load_private_key(private_key)
+        )
+    
+    @staticmethod
+    def decrypt_many(messages: Sequence[Tuple[str, str]], private_key: str) -> List[str]:
+        """
+        Decrypt a batch of messages with one private key.
+        
+        The key is parsed once. Batches of at least `ENCRYPTION_PARALLEL_THRESHOLD`
+        messages are unwrapped on a thread pool (RSA operations release the GIL).
+        
+        Args:
+            messages: (encrypted_content, encrypted_key) pairs, base64-encoded
+            private_key: User's RSA private key (PEM format)
+            
+        Returns:
+            Decrypted contents, in input order
+        """
+        priv_key = EncryptionService._load_private_key(private_key)
+        if len(messages) < getattr(settings, 'ENCRYPTION_PARALLEL_THRESHOLD', 32):
+            return [EncryptionService._decrypt_with_key(content, key, priv_key) for content, key in messages]
+        return list(_get_executor().map(
+            lambda message: EncryptionService._decrypt_with_key(message[0], message[1], priv_key),
+            messages
+        ))
+    
+    @staticmethod
+    def _load_private_key(private_key: str):
+        """Parse a PEM private key."""
+        return serialization.load_pem_private_key(
             private_key.encode('utf-8'),
             password=None,
             backend=default_backend()
         )
-        
+    
+    @staticmethod
+    def _decrypt_with_key(encrypted_content: str, encrypted_key: str, priv_key) -> str:
+        """Unwrap the AES key with a parsed private key and decrypt the content."""
         # Decrypt AES key
-        encrypted_key_bytes = base64.b64decode(encrypted_key)
-        aes_key = priv_key.decrypt(
-            encrypted_key_bytes,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+        aes_key = priv_key.decrypt(base64.b64decode(encrypted_key), _oaep())
         
         # Decrypt content
         encrypted_data = base64.b64decode(encrypted_content)
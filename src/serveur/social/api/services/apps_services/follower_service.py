@@ -7,6 +7,7 @@ from db.repositories.user_repository import UserRepository, FollowRepository
 from db.repositories.message_repository import AuditLogRepository
 from db.entities.user_entity import Follow, User
 from common.exceptions import NotFoundError, ValidationError, ConflictError, PermissionDeniedError
+from services.apps_services.timeline_service import TimelineService
 
 
 class FollowerService:
@@ -52,6 +53,8 @@ class FollowerService:
         
         # Create follow
         follow = FollowRepository.create(follower_id, followed_id, status)
+        if status == 'accepted':
+            TimelineService.on_follow_accepted(follower_id, followed_id)
         
         # Audit log
         AuditLogRepository.create(
@@ -78,6 +81,7 @@ class FollowerService:
         
         # Delete follow
         FollowRepository.delete(follower_id, followed_id)
+        TimelineService.on_unfollow(follower_id, followed_id)
         
         # Audit log
         AuditLogRepository.create(
@@ -105,6 +109,7 @@ class FollowerService:
         
         # Update status
         follow = FollowRepository.update_status(follower_id, followed_id, 'accepted')
+        TimelineService.on_follow_accepted(follower_id, followed_id)
         
         # Audit log
         AuditLogRepository.create(
@@ -145,15 +150,15 @@ class FollowerService:
         )
     
     @staticmethod
-    def get_followers(user_id: str, page: int = 1, page_size: int = 20) -> List[User]:
+    def get_followers(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> List[User]:
         """Get list of followers."""
         # Default to accepted followers unless caller specifies otherwise
-        return FollowRepository.get_followers(user_id=user_id, status='accepted', page=page, page_size=page_size)
+        return FollowRepository.get_followers(user_id=user_id, status='accepted', page=page, page_size=page_size, cursor=cursor)
     
     @staticmethod
-    def get_following(user_id: str, page: int = 1, page_size: int = 20) -> List[User]:
+    def get_following(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> List[User]:
         """Get list of users being followed."""
-        return FollowRepository.get_following(user_id=user_id, status='accepted', page=page, page_size=page_size)
+        return FollowRepository.get_following(user_id=user_id, status='accepted', page=page, page_size=page_size, cursor=cursor)
     
     @staticmethod
     def get_pending_requests(user_id: str, page: int = 1, page_size: int = 20) -> List[Follow]:
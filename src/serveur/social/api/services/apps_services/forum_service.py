@@ -2,6 +2,7 @@
 Forum service for forum management operations.
 """
 from typing import List, Optional
+from django.conf import settings
 from django.db import transaction
 from django.db import IntegrityError
 from db.repositories.domain_repository import ForumRepository, SubforumRepository, MembershipRepository
@@ -82,6 +83,13 @@ class ForumService:
         """Search forums by name."""
         return ForumRepository.search(query, page, page_size)
     
+    @staticmethod
+    def autocomplete_forums(prefix: str, limit: int = 10) -> List[Forum]:
+        """Complete a forum name prefix (search box suggestions), at most AUTOCOMPLETE_MAX_RESULTS forums."""
+        prefix = Validator.validate_search_query(prefix)
+        limit = min(max(limit, 1), settings.AUTOCOMPLETE_MAX_RESULTS)
+        return ForumRepository.autocomplete(prefix, limit)
+    
     @staticmethod
     @transaction.atomic
     def join_forum(user_id: str, forum_id: str, ip_address: Optional[str] = None) -> Membership:
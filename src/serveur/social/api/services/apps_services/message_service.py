@@ -46,8 +46,7 @@ class MessageService:
             raise NotFoundError(f"User {receiver_id} not found")
         
         # Check if blocked
-        if BlockRepository.is_blocked(sender_id, receiver_id) or \
-           BlockRepository.is_blocked(receiver_id, sender_id):
+        if BlockRepository.is_blocked_either_way(sender_id, receiver_id):
             raise PermissionDeniedError("Cannot send message to blocked user")
         
         # Encrypt message for both sender and receiver
@@ -110,12 +109,37 @@ class MessageService:
         
         return decrypted_content
     
+    @staticmethod
+    def decrypt_messages(messages: List[Message], user_id: str, private_key: str) -> List[str]:
+        """
+        Decrypt a page of messages (the private key is parsed once).
+        
+        Args:
+            messages: Message instances (user must be sender or receiver of each)
+            user_id: User ID
+            private_key: User's RSA private key (PEM format)
+            
+        Returns:
+            Decrypted contents, in message order
+        """
+        pairs = []
+        for message in messages:
+            if str(message.sender_id) == user_id:
+                pairs.append((message.encrypted_content, message.encryption_key_sender))
+            elif str(message.receiver_id) == user_id:
+                pairs.append((message.encrypted_content, message.encryption_key_receiver))
+            else:
+                raise PermissionDeniedError("Not authorized to decrypt this message")
+        
+        return EncryptionService.decrypt_many(pairs, private_key)
+    
     @staticmethod
     def get_conversation(
         user_id: str,
         other_user_id: str,
         page: int = 1,
-        page_size: int = 50
+        page_size: int = 50,
+        cursor: Optional[str] = None
     ) -> List[Message]:
         """
         Get conversation between two users.
@@ -125,6 +149,7 @@ class MessageService:
             other_user_id: Other user ID
             page: Page number
             page_size: Page size
+            cursor: Cursor of the next page (overrides page)
             
         Returns:
             List of messages
@@ -134,16 +159,16 @@ class MessageService:
         if not other_user:
             raise NotFoundError(f"User {other_user_id} not found")
         
-        # Get conversation
-        messages = MessageRepository.get_conversation(user_id, other_user_id, page, page_size)
-        
-        # Mark messages as read (messages sent by other_user TO user_id)
+        # Mark messages as read (messages sent by other_user TO user_id) before
+        # the page is fetched, so the returned messages reflect it
         MessageRepository.mark_as_read(other_user_id, user_id)
         
-        return messages
+        # Get conversation
+        return MessageRepository.get_conversation(user_id, other_user_id, page, page_size, cursor=cursor)
     
     @staticmethod
-    def get_conversations(user_id: str, page: int = 1, page_size: int = 20) -> List[Dict]:
+    def get_conversations(user_id: str, page: int = 1, page_size: int = 20,
+                          cursor: Optional[str] = None) -> List[Dict]:
         """
         Get list of conversations for a user.
         
@@ -151,11 +176,12 @@ class MessageService:
             user_id: User ID
             page: Page number
             page_size: Page size
+            cursor: Cursor of the next page (overrides page)
             
         Returns:
-            List of conversations with last message
+            List of conversations with last message and unread count, most recent first
         """
-        return MessageRepository.get_conversations(user_id, page, page_size)
+        return MessageRepository.get_conversations(user_id, page, page_size, cursor=cursor)
     
     @staticmethod
     @transaction.atomic
@@ -1,16 +1,19 @@
 """
 Post service for post management operations.
 """
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from django.db import transaction
 from db.repositories.post_repository import PostRepository, CommentRepository, LikeRepository
 from db.repositories.user_repository import UserRepository, BlockRepository, FollowRepository
-from db.repositories.domain_repository import SubforumRepository
+from db.repositories.domain_repository import ForumRepository, SubforumRepository
 from db.repositories.message_repository import AuditLogRepository
+from db.repositories.tag_repository import PostTagRepository
 from db.entities.post_entity import Post, Comment, Like
 from common.exceptions import NotFoundError, ValidationError, PermissionDeniedError, ConflictError
 from common.validators import Validator
 from common.utils import generate_content_signature
+from common.visibility import VisibilityFilter
+from services.apps_services.timeline_service import TimelineService
 
 
 class PostService:
@@ -59,8 +62,12 @@ class PostService:
             content_signature=signature
         )
         
-        # Increment subforum post count
+        # Increment subforum and forum post counts
         SubforumRepository.increment_post_count(subforum_id)
+        ForumRepository.increment_post_count(str(subforum.forum_id_id))
+
+        # Fan out to home timelines once committed
+        TimelineService.on_post_created(post)
         
         # Audit log
         AuditLogRepository.create(
@@ -96,8 +103,7 @@ class PostService:
         # Check if viewer can view post
         if viewer_id:
             # Check if blocked
-            if BlockRepository.is_blocked(viewer_id, str(post.user_id)) or \
-               BlockRepository.is_blocked(str(post.user_id), viewer_id):
+            if BlockRepository.is_blocked_either_way(viewer_id, str(post.user_id)):
                 raise PermissionDeniedError("Cannot view post from blocked user")
 
             # Check privacy: support both boolean and string representations
@@ -122,6 +128,35 @@ class PostService:
         
         return post
     
+    @staticmethod
+    def get_bulk_posts(post_ids: List[str], viewer_id: str) -> List[Tuple[str, Optional[Post], Optional[Exception]]]:
+        """
+        Get posts by IDs, with the block and privacy checks of get_post_by_id.
+        
+        One query for the posts; the viewer's blocks and followed private
+        users are loaded once for all of them.
+        
+        Args:
+            post_ids: Post IDs
+            viewer_id: Viewer user ID
+            
+        Returns:
+            (post_id, post, error) per requested ID, in request order; error is
+            a NotFoundError or PermissionDeniedError when post is None
+        """
+        posts = PostRepository.get_bulk(post_ids)
+        visibility = VisibilityFilter(viewer_id)
+        results = []
+        for post_id in post_ids:
+            post = posts.get(post_id)
+            if post is None:
+                results.append((post_id, None, NotFoundError(f"Post {post_id} not found")))
+            elif not visibility.can_see(post.user):
+                results.append((post_id, None, PermissionDeniedError("Cannot view this post")))
+            else:
+                results.append((post_id, post, None))
+        return results
+    
     @staticmethod
     @transaction.atomic
     def delete_post(post_id: str, user_id: str, ip_address: Optional[str] = None) -> None:
@@ -144,9 +179,11 @@ class PostService:
         
         # Delete post
         PostRepository.delete(post_id)
+        TimelineService.on_post_deleted(post)
         
-        # Decrement subforum post count
+        # Decrement subforum and forum post counts
         SubforumRepository.decrement_post_count(str(post.subforum.subforum_id))
+        ForumRepository.decrement_post_count(str(post.subforum.forum_id_id))
         
         # Audit log
         AuditLogRepository.create(
@@ -207,34 +244,73 @@ class PostService:
         )
 
     @staticmethod
-    def get_post_likes(post_id: str, page: int = 1, page_size: int = 20) -> List[Like]:
-        """Get users who liked a post."""
+    def get_post_likes(post_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                       viewer_id: Optional[str] = None) -> List[Like]:
+        """Get users who liked a post (minus users blocking or blocked by the viewer)."""
         post = PostRepository.get_by_id(post_id)
         if not post:
             raise NotFoundError(f"Post {post_id} not found")
 
-        return LikeRepository.get_by_post(post_id, page, page_size)
+        return LikeRepository.get_by_post(post_id, page, page_size, cursor=cursor,
+                                          visibility=VisibilityFilter(viewer_id))
 
     @staticmethod
-    def get_feed(user_id: str, page: int = 1, page_size: int = 20) -> List[Post]:
+    def get_feed(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> List[Post]:
         """
         Get personalized feed for user.
 
         Returns posts from:
         - Users the current user follows
         - Ordered by created_at DESC
+
+        Served from the materialized timeline (see TimelineService).
         """
-        return PostRepository.get_feed(user_id, page, page_size)
+        return TimelineService.get_feed(user_id, page, page_size, cursor)
 
     @staticmethod
-    def get_discover(user_id: Optional[str] = None, page: int = 1, page_size: int = 20) -> List[Post]:
+    def get_discover(user_id: Optional[str] = None, page: int = 1, page_size: int = 20,
+                     cursor: Optional[str] = None, domain_id: Optional[str] = None,
+                     subforum_id: Optional[str] = None) -> List[Post]:
         """
-        Get discover feed (popular posts).
+        Get discover feed (trending posts).
 
         Returns:
         - Public posts
-        - Ordered by popularity (likes + comments)
-        - Excludes blocked users
+        - Ordered by time-decayed hot score (likes, comments and age)
+        - Optionally restricted to a domain or a subforum
+        - Excludes blocked users and private users the viewer doesn't follow
+        """
+        visibility = VisibilityFilter(user_id)
+        if domain_id or subforum_id:
+            return PostRepository.get_trending(domain_id, subforum_id, page, page_size, cursor, visibility)
+        return PostRepository.get_discover(page, page_size, cursor, visibility)
+
+    @staticmethod
+    def enrich_posts(posts: List[Post], viewer_id: str) -> List[Post]:
+        """
+        Add the viewer's state to a page of posts, in one query per kind.
+
+        Sets on each post:
+        - liked_by_me: whether the viewer liked it
+        - following_author: whether the viewer follows its author (accepted)
+        - tags: its tags, by name
+
+        Args:
+            posts: Page of posts
+            viewer_id: Viewer user ID
+
+        Returns:
+            The same posts
         """
-        return PostRepository.get_discover(page, page_size)
+        if not posts:
+            return posts
+        post_ids = [post.post_id for post in posts]
+        liked = LikeRepository.get_liked_post_ids(viewer_id, post_ids)
+        followed = FollowRepository.get_following_ids(viewer_id, list({post.user_id for post in posts}))
+        tags = PostTagRepository.get_tags_by_posts(post_ids)
+        for post in posts:
+            post.liked_by_me = post.post_id in liked
+            post.following_author = post.user_id in followed
+            post.tags = tags.get(post.post_id, [])
+        return posts
 
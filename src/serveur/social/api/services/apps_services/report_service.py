@@ -188,6 +188,7 @@ class ReportService:
         # Ban user
         user.is_banned = True
         user.save()
+        UserRepository.invalidate(user)
         
         # Audit log
         AuditLogRepository.create(
@@ -226,6 +227,7 @@ class ReportService:
         # Unban user
         user.is_banned = False
         user.save()
+        UserRepository.invalidate(user)
 
         # Audit log
         AuditLogRepository.create(
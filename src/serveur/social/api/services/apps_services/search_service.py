@@ -0,0 +1,87 @@
+"""
+Search service for full-text post and comment search.
+"""
+from typing import List, Optional
+from common.exceptions import ValidationError
+from common.validators import Validator
+from common.visibility import VisibilityFilter
+from db.entities.post_entity import Post, Comment, SEARCH_CONFIGS
+from db.repositories.search_repository import SearchRepository
+from db.repositories.user_repository import UserRepository
+
+SORT_CHOICES = ('relevance', 'recent')
+
+
+class SearchService:
+    """Service for full-text search."""
+
+    @staticmethod
+    def _language(viewer_id: Optional[str], language: Optional[str]) -> str:
+        """Requested search language, else the viewer's, else French."""
+        if language:
+            if language not in SEARCH_CONFIGS:
+                raise ValidationError(f"lang must be one of: {', '.join(SEARCH_CONFIGS)}")
+            return language
+        viewer = UserRepository.get_by_id(viewer_id) if viewer_id else None
+        language = getattr(getattr(viewer, 'settings', None), 'language', None)
+        return language if language in SEARCH_CONFIGS else 'fr'
+
+    @staticmethod
+    def _sort(sort: Optional[str]) -> str:
+        sort = sort or 'relevance'
+        if sort not in SORT_CHOICES:
+            raise ValidationError(f"sort must be one of: {', '.join(SORT_CHOICES)}")
+        return sort
+
+    @staticmethod
+    def search_posts(viewer_id: Optional[str], query: str, language: Optional[str] = None,
+                     domain_id: Optional[str] = None, subforum_id: Optional[str] = None,
+                     tag_id: Optional[str] = None, author_id: Optional[str] = None,
+                     sort: Optional[str] = None, page: int = 1, page_size: int = 20,
+                     cursor: Optional[str] = None) -> List[Post]:
+        """
+        Search posts the viewer may see.
+
+        Args:
+            viewer_id: Viewer user ID (block/privacy filtering)
+            query: Search query (web search syntax)
+            language: 'fr' or 'en' (defaults to the viewer's language)
+            domain_id, subforum_id, tag_id, author_id: Optional filters
+            sort: 'relevance' (default) or 'recent'
+
+        Returns:
+            Page of posts with `snippet`
+        """
+        return SearchRepository.search_posts(
+            Validator.validate_search_query(query),
+            language=SearchService._language(viewer_id, language),
+            domain_id=Validator.validate_uuid(domain_id, 'domain_id'),
+            subforum_id=Validator.validate_uuid(subforum_id, 'subforum_id'),
+            tag_id=Validator.validate_uuid(tag_id, 'tag_id'),
+            author_id=Validator.validate_uuid(author_id, 'author_id'),
+            sort=SearchService._sort(sort),
+            page=page, page_size=page_size, cursor=cursor,
+            visibility=VisibilityFilter(viewer_id),
+        )
+
+    @staticmethod
+    def search_comments(viewer_id: Optional[str], query: str, language: Optional[str] = None,
+                        post_id: Optional[str] = None, subforum_id: Optional[str] = None,
+                        author_id: Optional[str] = None, sort: Optional[str] = None, page: int = 1,
+                        page_size: int = 20, cursor: Optional[str] = None) -> List[Comment]:
+        """
+        Search comments the viewer may see.
+
+        Returns:
+            Page of comments with `snippet`
+        """
+        return SearchRepository.search_comments(
+            Validator.validate_search_query(query),
+            language=SearchService._language(viewer_id, language),
+            post_id=Validator.validate_uuid(post_id, 'post_id'),
+            subforum_id=Validator.validate_uuid(subforum_id, 'subforum_id'),
+            author_id=Validator.validate_uuid(author_id, 'author_id'),
+            sort=SearchService._sort(sort),
+            page=page, page_size=page_size, cursor=cursor,
+            visibility=VisibilityFilter(viewer_id),
+        )
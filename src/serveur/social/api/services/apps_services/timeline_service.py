@@ -0,0 +1,354 @@
+"""
+Timeline service for the precomputed (fan-out-on-write) home feed.
+
+Normal authors and subforums are pushed into timelines on write. "Heavy"
+sources (large audiences) are not fanned out; their recent posts are cached
+per source and merged into the timeline at read time, and read from the
+posts table past the cached ones, so they reach the same depth.
+
+Which sources are heavy is computed by the refresh_heavy_sources command
+(full-table aggregates) and only read from the cache on the request path.
+Timelines never received the posts of a source while it was heavy, nor
+were they backfilled on follows and subscriptions to it: when a source
+stops being heavy, the warm timelines of its audience are marked cold and
+rebuilt from the pull query on their next read.
+"""
+import heapq
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from db.repositories.post_repository import PostRepository
+from db.repositories.user_repository import BlockRepository
+from db.repositories.timeline_repository import TimelineRepository, TIMELINE_ORDERING
+from db.entities.post_entity import Post
+from db.entities.user_entity import Follow, Block
+from db.entities.domain_entity import SubforumSubscription
+from common.utils import CursorPage, cursor_for, decode_cursor, encode_cursor, seek_filter
+from common.visibility import VisibilityFilter
+
+logger = logging.getLogger(__name__)
+
+HEAVY_SOURCES_CACHE_KEY = 'feed:heavy_sources'
+RECENT_POSTS_CACHE_KEY = 'feed:recent:v2:{kind}:{source_id}'
+
+
+class TimelineService:
+    """Service maintaining materialized home timelines."""
+
+    @staticmethod
+    def get_feed(user_id: str, page: int = 1, page_size: int = 20, cursor: Optional[str] = None) -> CursorPage:
+        """
+        Get a page of the user's home feed.
+
+        Reads the materialized timeline, building it first for cold users,
+        and k-way merges the recent posts of the heavy sources the user
+        follows or is subscribed to. Pages past the timeline depth fall back
+        to the pull query. Blocked authors and private authors the user
+        doesn't follow are filtered at read time.
+
+        Args:
+            user_id: User ID
+            page: Page number
+            page_size: Page size
+            cursor: Cursor of the next page (overrides page)
+
+        Returns:
+            CursorPage of posts, newest first
+        """
+        visibility = VisibilityFilter(user_id)
+        if not cursor and page * page_size > TimelineRepository.get_depth():
+            return PostRepository.get_feed(user_id, page, page_size, visibility=visibility)
+
+        if not TimelineRepository.is_warm(user_id):
+            TimelineService.build(user_id)
+
+        heavy_sources = TimelineService._get_followed_heavy_sources(user_id)
+        if heavy_sources:
+            posts = TimelineService._merge_heavy_sources(user_id, heavy_sources, page, page_size, cursor, visibility)
+        else:
+            posts = TimelineRepository.get_page(user_id, page, page_size, cursor, visibility)
+
+        if posts.next_cursor is None and TimelineRepository.is_full(user_id):
+            if cursor and len(posts) < page_size:
+                # Seeking past the materialized depth: continue on the pull query
+                return PostRepository.get_feed(user_id, page_size=page_size, cursor=cursor, visibility=visibility)
+            if posts:
+                posts.next_cursor = cursor_for(posts[-1], TIMELINE_ORDERING)
+        return posts
+
+    @staticmethod
+    def _merge_heavy_sources(user_id: str, heavy_sources: List[Tuple[str, str]], page: int, page_size: int,
+                             cursor: Optional[str], visibility: VisibilityFilter) -> CursorPage:
+        """K-way merge of the timeline with the recent posts of heavy sources, by (created_at, post_id)."""
+        before = None
+        if cursor:
+            created_at, post_id = decode_cursor(cursor, len(TIMELINE_ORDERING))
+            before = (datetime.fromisoformat(created_at), post_id)
+
+        skip = 0 if cursor else (page - 1) * page_size
+        limit = skip + page_size + 1
+        streams = [TimelineRepository.get_entry_keys(user_id, limit, before, visibility)]
+        for kind, source_id in heavy_sources:
+            streams.append(TimelineService._get_source_keys(kind, source_id, before, limit))
+
+        merged = []
+        seen = set()
+        for key in heapq.merge(*streams, key=lambda key: (key[0], key[1]), reverse=True):
+            if key[1] in seen or not visibility.can_see_author(key[2], key[3]):
+                continue
+            seen.add(key[1])
+            merged.append(key)
+            if len(merged) >= limit:
+                break
+
+        window = merged[skip:skip + page_size]
+        next_cursor = encode_cursor(window[-1][:2]) if len(merged) > skip + page_size else None
+        return CursorPage(TimelineRepository.get_posts_in_order([key[1] for key in window]), next_cursor)
+
+    @staticmethod
+    @transaction.atomic
+    def build(user_id: str) -> None:
+        """Materialize a cold user's timeline from the pull query."""
+        TimelineRepository.backfill(user_id, PostRepository.get_feed_queryset(user_id))
+        # Entries left from before the timeline went cold
+        TimelineRepository.trim([user_id])
+        TimelineRepository.mark_warm(user_id)
+
+    @staticmethod
+    def get_heavy_sources() -> Dict[str, Set[str]]:
+        """
+        Get the IDs of heavy authors ('users') and subforums ('subforums').
+
+        Only read from the cache (see refresh_heavy_sources): until the
+        first refresh, no source is heavy and every post is fanned out.
+        """
+        sources = cache.get(HEAVY_SOURCES_CACHE_KEY)
+        if sources is None:
+            return {'users': set(), 'subforums': set()}
+        return sources
+
+    @staticmethod
+    def refresh_heavy_sources() -> Dict[str, Set[str]]:
+        """
+        Recompute the heavy sources (full-table aggregates, for the background job) and cache them.
+
+        The audiences of sources that are no longer heavy get their
+        timelines rebuilt: those lack the posts merged at read time so far.
+        """
+        sources = {
+            'users': TimelineRepository.get_heavy_author_ids(settings.FEED_HEAVY_FOLLOWER_THRESHOLD),
+            'subforums': TimelineRepository.get_heavy_subforum_ids(settings.FEED_HEAVY_SUBFORUM_THRESHOLD),
+        }
+        previous = TimelineService.get_heavy_sources()
+        # Kept until the next refresh
+        cache.set(HEAVY_SOURCES_CACHE_KEY, sources, None)
+        TimelineService._demote(previous['users'] - sources['users'], previous['subforums'] - sources['subforums'])
+        return sources
+
+    @staticmethod
+    def _demote(user_ids: Set[str], subforum_ids: Set[str]) -> None:
+        """Mark cold the timelines fed by sources fanned out again (followers, subscribers, posters)."""
+        if not user_ids and not subforum_ids:
+            return
+        audience = Q(user_id__in=Follow.objects.filter(
+            following_id__in=list(user_ids), status='accepted'
+        ).values('follower_id'))
+        audience |= Q(user_id__in=SubforumSubscription.objects.filter(
+            subforum_id__in=list(subforum_ids)
+        ).values('user_id'))
+        audience |= Q(user_id__in=Post.objects.filter(
+            subforum_id__in=list(subforum_ids), user_id__isnull=False
+        ).values('user_id'))
+        cold = TimelineRepository.mark_cold(audience)
+        logger.info("%d sources no longer heavy, %d timelines marked cold", len(user_ids) + len(subforum_ids), cold)
+
+    @staticmethod
+    def is_heavy_author(user_id: str) -> bool:
+        """Check if the author's posts are pulled at read time instead of fanned out."""
+        return str(user_id) in TimelineService.get_heavy_sources()['users']
+
+    @staticmethod
+    def is_heavy_subforum(subforum_id: str) -> bool:
+        """Check if the subforum's posts are pulled at read time instead of fanned out."""
+        return str(subforum_id) in TimelineService.get_heavy_sources()['subforums']
+
+    @staticmethod
+    def on_post_created(post: Post) -> None:
+        """Fan the post out to warm timelines once the surrounding transaction commits."""
+        transaction.on_commit(lambda: TimelineService.fan_out(post))
+
+    @staticmethod
+    def fan_out(post: Post) -> None:
+        """
+        Push a post into every warm timeline that should contain it.
+
+        Recipients are the author, the author's accepted followers, the
+        subforum's subscribers and the users who posted in it, minus users
+        blocking or blocked by the author. Audiences of heavy sources are
+        skipped: they read the post from the source's recent-posts cache.
+        """
+        try:
+            TimelineService._invalidate_recent(post)
+
+            author_id = post.user_id
+            recipients = Q(user_id=author_id)
+            if not TimelineService.is_heavy_author(author_id):
+                recipients |= Q(
+                    user_id__in=Follow.objects.filter(following_id=author_id, status='accepted').values('follower_id')
+                )
+            if post.subforum_id and not TimelineService.is_heavy_subforum(post.subforum_id):
+                recipients |= Q(
+                    user_id__in=SubforumSubscription.objects.filter(subforum_id=post.subforum_id).values('user_id')
+                ) | Q(
+                    user_id__in=Post.objects.filter(subforum_id=post.subforum_id, user_id__isnull=False).values('user_id')
+                )
+            recipients &= ~Q(user_id__in=Block.objects.filter(blocker_id=author_id).values('blocked_id'))
+            recipients &= ~Q(user_id__in=Block.objects.filter(blocked_id=author_id).values('blocker_id'))
+
+            user_ids = TimelineRepository.get_warm_user_ids(recipients)
+            TimelineRepository.push(post, user_ids)
+
+            # First post of the author in this subforum: it now feeds their timeline
+            if post.subforum_id and str(author_id) in {str(u) for u in user_ids} and \
+                    not Post.objects.filter(user_id=author_id, subforum_id=post.subforum_id).exclude(post_id=post.post_id).exists():
+                TimelineRepository.backfill(
+                    author_id,
+                    Post.objects.filter(subforum_id=post.subforum_id).exclude(
+                        user_id__in=BlockRepository.get_blocked_either_way_ids(author_id)
+                    )
+                )
+
+            TimelineRepository.trim(user_ids)
+        except Exception:
+            # The timeline is a cache of the pull query: never fail the write path
+            logger.exception("Timeline fan-out failed for post %s", post.post_id)
+
+    @staticmethod
+    def on_post_deleted(post: Post) -> None:
+        """Drop the deleted post from the recent-posts caches of its sources once committed."""
+        transaction.on_commit(lambda: TimelineService._invalidate_recent(post))
+
+    @staticmethod
+    def on_follow_accepted(follower_id: str, followed_id: str) -> None:
+        """Backfill the follower's timeline with the followed user's recent posts."""
+        if TimelineService.is_heavy_author(followed_id):
+            return
+        if TimelineRepository.is_warm(follower_id):
+            TimelineRepository.backfill(follower_id, Post.objects.filter(user_id=followed_id))
+            TimelineRepository.trim([follower_id])
+
+    @staticmethod
+    def on_unfollow(follower_id: str, followed_id: str) -> None:
+        """Prune the unfollowed user's posts, except those still reachable through a subforum."""
+        if TimelineRepository.is_warm(follower_id):
+            TimelineRepository.prune(
+                follower_id,
+                Q(user_id=followed_id) & ~Q(subforum_id__in=TimelineService._effective_subforum_ids(follower_id))
+            )
+
+    @staticmethod
+    def on_subscribe(user_id: str, subforum_id: str) -> None:
+        """Backfill the user's timeline with the subforum's recent posts."""
+        if TimelineService.is_heavy_subforum(subforum_id):
+            return
+        if TimelineRepository.is_warm(user_id):
+            TimelineRepository.backfill(
+                user_id,
+                Post.objects.filter(subforum_id=subforum_id).exclude(
+                    user_id__in=BlockRepository.get_blocked_either_way_ids(user_id)
+                )
+            )
+            TimelineRepository.trim([user_id])
+
+    @staticmethod
+    def on_unsubscribe(user_id: str, subforum_id: str) -> None:
+        """Prune the subforum's posts, except those still reachable through a follow or own activity."""
+        if not TimelineRepository.is_warm(user_id):
+            return
+        if str(subforum_id) in {str(s) for s in TimelineService._effective_subforum_ids(user_id)}:
+            return
+        following_ids = Follow.objects.filter(follower_id=user_id, status='accepted').values('following_id')
+        TimelineRepository.prune(
+            user_id,
+            Q(subforum_id=subforum_id) & ~Q(user_id=user_id) & ~Q(user_id__in=following_ids)
+        )
+
+    @staticmethod
+    def on_block(blocker_id: str, blocked_id: str) -> None:
+        """Remove each user's posts from the other's timeline."""
+        TimelineRepository.prune(blocker_id, Q(user_id=blocked_id))
+        TimelineRepository.prune(blocked_id, Q(user_id=blocker_id))
+
+    @staticmethod
+    def on_unblock(blocker_id: str, blocked_id: str) -> None:
+        """
+        Rebuild both timelines on their next read.
+
+        Follows and shared subforums survive a block: each user's posts
+        reachable that way are back in the pull query (unless another block
+        remains), which a rebuild applies, heavy sources included.
+        """
+        TimelineRepository.mark_cold(Q(user_id__in=[blocker_id, blocked_id]))
+
+    @staticmethod
+    def _get_followed_heavy_sources(user_id: str) -> List[Tuple[str, str]]:
+        """Heavy (kind, source_id) pairs feeding the user's home feed."""
+        heavy = TimelineService.get_heavy_sources()
+        sources = []
+        if heavy['users']:
+            followed = Follow.objects.filter(
+                follower_id=user_id, status='accepted', following_id__in=list(heavy['users'])
+            ).values_list('following_id', flat=True)
+            sources += [('user', str(followed_id)) for followed_id in followed]
+        if heavy['subforums']:
+            subforum_ids = {str(s) for s in TimelineService._effective_subforum_ids(user_id)}
+            sources += [('subforum', subforum_id) for subforum_id in subforum_ids & heavy['subforums']]
+        return sources
+
+    @staticmethod
+    def _get_source_keys(kind: str, source_id: str, before: Optional[Tuple], limit: int) -> List[Tuple]:
+        """Merge keys of a heavy source older than `before`: from its cached recent keys, else from the posts table."""
+        recent = TimelineService._get_recent_keys(kind, source_id)
+        keys = [key for key in recent if (key[0], key[1]) < before] if before else recent
+        if len(keys) >= limit or len(recent) < settings.FEED_HEAVY_RECENT_SIZE:
+            # Enough keys, or the cache holds every post of the source
+            return keys[:limit]
+        posts = TimelineService._source_posts(kind, source_id)
+        if before:
+            posts = posts.filter(seek_filter(TIMELINE_ORDERING, before))
+        return TimelineRepository.get_recent_keys(posts, limit)
+
+    @staticmethod
+    def _get_recent_keys(kind: str, source_id: str) -> List[Tuple]:
+        """Recent (created_at, post_id, author_id, author_is_private) keys of a heavy source, cached."""
+        key = RECENT_POSTS_CACHE_KEY.format(kind=kind, source_id=source_id)
+        keys = cache.get(key)
+        if keys is None:
+            keys = TimelineRepository.get_recent_keys(TimelineService._source_posts(kind, source_id),
+                                                      settings.FEED_HEAVY_RECENT_SIZE)
+            cache.set(key, keys, settings.FEED_HEAVY_SOURCES_TTL)
+        return keys
+
+    @staticmethod
+    def _source_posts(kind: str, source_id: str):
+        """Posts of a heavy author ('user') or subforum ('subforum')."""
+        return Post.objects.filter(user_id=source_id) if kind == 'user' else Post.objects.filter(subforum_id=source_id)
+
+    @staticmethod
+    def _invalidate_recent(post: Post) -> None:
+        """Drop the cached recent posts of the post's author and subforum."""
+        keys = [RECENT_POSTS_CACHE_KEY.format(kind='user', source_id=post.user_id)]
+        if post.subforum_id:
+            keys.append(RECENT_POSTS_CACHE_KEY.format(kind='subforum', source_id=post.subforum_id))
+        cache.delete_many(keys)
+
+    @staticmethod
+    def _effective_subforum_ids(user_id: str) -> List[str]:
+        """Subforums feeding the user's timeline: subscriptions and subforums they posted in."""
+        subscribed = SubforumSubscription.objects.filter(user_id=user_id).values_list('subforum_id', flat=True)
+        posted = Post.objects.filter(user_id=user_id, subforum_id__isnull=False).values_list('subforum_id', flat=True)
+        return list(set(subscribed) | set(posted))
@@ -2,12 +2,15 @@
 User service for user management operations.
 """
 from typing import Optional, List
+from django.conf import settings
 from django.db import transaction
 from db.repositories.user_repository import UserRepository, BlockRepository, FollowRepository
 from db.repositories.message_repository import AuditLogRepository
 from db.entities.user_entity import User, UserProfile, UserSettings
 from common.exceptions import NotFoundError, ValidationError, ConflictError, PermissionDeniedError
 from common.validators import Validator
+from common.visibility import VisibilityFilter
+from services.apps_services.timeline_service import TimelineService
 
 
 class UserService:
@@ -82,6 +85,9 @@ class UserService:
             email_notifications=True,  # Default to True
             language='fr'  # Default to French
         )
+
+        # Drop a cached "not registered yet" lookup of this Firebase user
+        UserRepository.invalidate_auth(firebase_uid)
         
         # Audit log
         AuditLogRepository.create(
@@ -167,8 +173,7 @@ class UserService:
             existing = UserRepository.get_by_username(username)
             if existing and str(existing.user_id) != user_id:
                 raise ConflictError("Username already taken")
-            user.username = username
-            user.save()
+            UserRepository.update(user, username=username)
         
         # Update profile fields
         profile_fields = ['display_name', 'profile_picture_url', 'bio', 'location', 'privacy']
@@ -194,6 +199,8 @@ class UserService:
         
         if profile_updated:
             user.profile.save()
+
+        UserRepository.invalidate(user)
         
         # Audit log
         AuditLogRepository.create(
@@ -230,6 +237,7 @@ class UserService:
             user.settings.language = kwargs.get('language')
 
         user.settings.save()
+        UserRepository.invalidate(user)
         return user.settings
     
     @staticmethod
@@ -246,17 +254,25 @@ class UserService:
         Returns:
             List of users
         """
-        users = UserRepository.search_by_username(query, page, page_size)
-        
-        # Exclude blocked users
-        if current_user_id:
-            users = [
-                user for user in users
-                if not BlockRepository.is_blocked(current_user_id, str(user.user_id))
-                and not BlockRepository.is_blocked(str(user.user_id), current_user_id)
-            ]
+        # Blocked users are excluded in SQL, before pagination
+        return UserRepository.search_by_username(query, page, page_size, VisibilityFilter(current_user_id))
+    
+    @staticmethod
+    def autocomplete_users(prefix: str, current_user_id: Optional[str] = None, limit: int = 10) -> List[User]:
+        """
+        Complete a username prefix (search box suggestions).
         
-        return users
+        Args:
+            prefix: Typed prefix
+            current_user_id: Current user ID (to exclude blocked users)
+            limit: Maximum number of users (capped by AUTOCOMPLETE_MAX_RESULTS)
+            
+        Returns:
+            List of users
+        """
+        prefix = Validator.validate_search_query(prefix)
+        limit = min(max(limit, 1), settings.AUTOCOMPLETE_MAX_RESULTS)
+        return UserRepository.autocomplete(prefix, limit, VisibilityFilter(current_user_id))
     
     @staticmethod
     @transaction.atomic
@@ -276,6 +292,7 @@ class UserService:
 
         # Create block
         BlockRepository.create(blocker_id, blocked_id)
+        TimelineService.on_block(blocker_id, blocked_id)
 
         # Audit log
         AuditLogRepository.create(
@@ -295,6 +312,7 @@ class UserService:
 
         # Delete block
         BlockRepository.delete(blocker_id, blocked_id)
+        TimelineService.on_unblock(blocker_id, blocked_id)
 
         # Audit log
         AuditLogRepository.create(
@@ -343,7 +361,7 @@ class UserService:
             return True
 
         # Check if blocked
-        if BlockRepository.is_blocked(viewer_id, target_user_id) or BlockRepository.is_blocked(target_user_id, viewer_id):
+        if BlockRepository.is_blocked_either_way(viewer_id, target_user_id):
             return False
 
         # Private profiles require accepted follow
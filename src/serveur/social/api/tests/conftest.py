@@ -2,7 +2,7 @@
 Pytest configuration and fixtures.
 """
 import pytest
-from django.conf import settings
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from db.entities.user_entity import User, UserProfile, UserSettings
 from db.entities.domain_entity import Domain
@@ -72,3 +72,27 @@ def domains(db):
 def enable_db_access_for_all_tests(db):
     """Enable database access for all tests."""
     pass
+
+
+@pytest.fixture(autouse=True)
+def sync_audit_log(settings):
+    """Write audit logs inline so tests see them inside the test transaction."""
+    settings.AUDIT_LOG_MODE = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def sync_counters(settings):
+    """Update counters in place so tests see them inside the test transaction."""
+    settings.COUNTER_MODE = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def sync_autocomplete(settings):
+    """Rebuild prefix indexes inline: a background thread would not see the test transaction."""
+    settings.AUTOCOMPLETE_REBUILD_MODE = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty Redis cache (cached structures, counters)."""
+    cache.clear()
@@ -112,3 +112,44 @@ def test_admin_can_remove_post_and_comment(admin_client):
     resp_post = admin_client.delete(post_url)
     assert resp_post.status_code == status.HTTP_204_NO_CONTENT
     assert Post.objects.filter(post_id=post.post_id).count() == 0
+
+
+@pytest.mark.django_db
+def test_admin_can_size_comment_thread_before_removal(admin_client):
+    author = _mk_user("author")
+    post = Post.objects.create(user=author, title="Title", content="Body", comment_count=3)
+    comment = Comment.objects.create(user=author, post=post, content="c")
+    reply = Comment.objects.create(user=author, post=post, content="r", parent_comment=comment)
+    Comment.objects.create(user=author, post=post, content="rr", parent_comment=reply)
+
+    resp = admin_client.get(reverse("admin_panel:comment-subtree", args=[comment.comment_id]))
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["data"]["subtree_size"] == 3
+
+    resp = admin_client.delete(reverse("admin_panel:remove-comment", args=[comment.comment_id]))
+    assert resp.status_code == status.HTTP_204_NO_CONTENT
+    assert Comment.objects.filter(post=post).count() == 0
+    post.refresh_from_db()
+    assert post.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_daily_stats_series(admin_client):
+    from django.core.management import call_command
+
+    _mk_user("u1")
+    call_command("rollup_daily_stats")
+    url = reverse("admin_panel:stats-daily")
+
+    resp = admin_client.get(url)
+    assert resp.status_code == status.HTTP_200_OK
+    series = resp.json()["data"]
+    assert len(series) == 30
+    assert series[-1]["new_users"] == 2
+
+    resp = admin_client.get(url, {"start": "2026-01-01", "end": "2026-01-03"})
+    assert [row["day"] for row in resp.json()["data"]] == ["2026-01-01", "2026-01-02", "2026-01-03"]
+
+    assert admin_client.get(url, {"start": "yesterday"}).status_code == status.HTTP_400_BAD_REQUEST
+    assert admin_client.get(url, {"start": "2026-01-03", "end": "2026-01-01"}).status_code == status.HTTP_400_BAD_REQUEST
+    assert admin_client.get(url, {"start": "2020-01-01", "end": "2026-01-01"}).status_code == status.HTTP_400_BAD_REQUEST
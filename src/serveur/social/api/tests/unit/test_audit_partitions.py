@@ -0,0 +1,95 @@
+import gzip
+import json
+from datetime import date, datetime, timezone
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from db.entities.message_entity import AuditLog
+from db.repositories.audit_partition_repository import (
+    AuditArchiveRepository,
+    AuditPartitionRepository,
+    add_months,
+    month_of,
+    partition_name,
+)
+from db.repositories.user_repository import UserRepository
+
+
+@pytest.fixture
+def user(db):
+    return UserRepository.create(firebase_id='partition-uid', email='partition@example.com', username='partitionuser')
+
+
+def _log(user, created_at, action_type='create'):
+    return AuditLog.objects.create(user=user, action_type=action_type, resource_type='post',
+                                   resource_id='p1', created_at=created_at)
+
+
+def _count(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {table}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+class TestAuditPartitions:
+
+    def test_current_month_is_partitioned(self, user):
+        _log(user, datetime.now(timezone.utc))
+        assert month_of(date.today()) in AuditPartitionRepository.get_months()
+        assert _count(partition_name(month_of(date.today()))) == 1
+        assert _count('audit_logs_default') == 0
+
+    def test_create_moves_rows_out_of_default_partition(self, user):
+        log = _log(user, datetime(2001, 5, 17, tzinfo=timezone.utc))
+        assert _count('audit_logs_default') == 1
+
+        assert AuditPartitionRepository.create(date(2001, 5, 1))
+        assert not AuditPartitionRepository.create(date(2001, 5, 1))
+        assert _count('audit_logs_default') == 0
+        assert _count('audit_logs_p2001_05') == 1
+        assert AuditLog.objects.get(log_id=log.log_id).user_id == user.user_id
+
+    def test_month_arithmetic(self):
+        assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+        assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+@pytest.mark.django_db
+class TestAuditRetention:
+
+    def test_expired_month_is_archived_and_searchable(self, user, tmp_path):
+        AuditPartitionRepository.create(date(2002, 3, 1))
+        old = [_log(user, datetime(2002, 3, day, tzinfo=timezone.utc), 'ban') for day in (1, 2)]
+        recent = _log(user, datetime.now(timezone.utc))
+        with connection.cursor() as cursor:
+            # Fire the deferred FK checks of the inserts above, as a committed run would have
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        out = StringIO()
+        call_command('manage_audit_partitions', retain_months=12, archive_dir=str(tmp_path), stdout=out)
+
+        assert 'Archived 2002-03: 2 rows' in out.getvalue()
+        assert date(2002, 3, 1) not in AuditPartitionRepository.get_months()
+        assert AuditPartitionRepository.get_detached_months() == []
+        assert list(AuditLog.objects.values_list('log_id', flat=True)) == [recent.log_id]
+
+        with gzip.open(tmp_path / 'audit_logs_2002_03.jsonl.gz', 'rt') as archive:
+            rows = [json.loads(line) for line in archive]
+        assert [row['log_id'] for row in rows] == [str(old[1].log_id), str(old[0].log_id)]
+
+        found = list(AuditArchiveRepository.search(user_id=user.user_id, action_type='ban', archive_dir=str(tmp_path)))
+        assert len(found) == 2
+        assert not list(AuditArchiveRepository.search(end=date(2002, 2, 1), archive_dir=str(tmp_path)))
+
+    def test_dry_run_keeps_partitions(self, user, tmp_path):
+        AuditPartitionRepository.create(date(2002, 4, 1))
+        _log(user, datetime(2002, 4, 1, tzinfo=timezone.utc))
+
+        out = StringIO()
+        call_command('manage_audit_partitions', dry_run=True, archive_dir=str(tmp_path), stdout=out)
+
+        assert 'Would archive 2002-04' in out.getvalue()
+        assert date(2002, 4, 1) in AuditPartitionRepository.get_months()
+        assert not list(tmp_path.iterdir())
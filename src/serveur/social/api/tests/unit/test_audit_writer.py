@@ -0,0 +1,118 @@
+import json
+import socket
+import uuid
+import pytest
+from django.db import transaction
+from common.audit import AuditWriter
+from db.entities.message_entity import AuditLog
+from db.repositories import message_repository
+from db.repositories.message_repository import AuditLogRepository
+from db.repositories.user_repository import UserRepository
+
+
+@pytest.fixture
+def user(db):
+    return UserRepository.create(firebase_id='audit-uid', email='audit@example.com', username='audituser')
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    writer = AuditWriter(AuditLogRepository.bulk_create, tmp_path, batch_size=3, flush_interval=3600)
+    monkeypatch.setattr(message_repository, 'audit_writer', writer)
+    return writer
+
+
+@pytest.fixture
+def async_mode(settings):
+    settings.AUDIT_LOG_MODE = 'async'
+
+
+def _record(user, n=1):
+    return [
+        AuditLogRepository.create(user_id=str(user.user_id), action_type='create', resource_type='post',
+                                  resource_id=uuid.uuid4(), details={'n': i})
+        for i in range(n)
+    ]
+
+
+@pytest.mark.django_db
+class TestAuditLogRepository:
+
+    def test_sync_mode_inserts_inline_without_output(self, user, capsys):
+        log = _record(user)[0]
+        stored = AuditLog.objects.get(log_id=log.log_id)
+        assert stored.resource_id == log.resource_id
+        assert json.loads(stored.details) == {'n': 0}
+        assert capsys.readouterr().out == ''
+
+    def test_async_mode_queues_on_commit(self, user, writer, async_mode, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            logs = _record(user, 2)
+        assert not AuditLog.objects.exists()
+        assert writer.pending_count() == 2
+
+        assert writer.flush() == 2
+        stored = {log.log_id: log for log in AuditLog.objects.all()}
+        assert set(stored) == {log.log_id for log in logs}
+        assert stored[logs[0].log_id].created_at == logs[0].created_at
+        assert not list(writer.spool_dir.iterdir())
+
+    def test_rolled_back_events_are_dropped(self, user, writer, async_mode, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    _record(user)
+                    raise RuntimeError
+        assert writer.pending_count() == 0
+
+    def test_batch_size_triggers_single_insert(self, user, writer, async_mode, django_capture_on_commit_callbacks,
+                                               django_assert_max_num_queries):
+        with django_capture_on_commit_callbacks(execute=True):
+            _record(user, 2)
+        with django_assert_max_num_queries(2):
+            with django_capture_on_commit_callbacks(execute=True):
+                _record(user)
+        assert AuditLog.objects.count() == 3
+        assert writer.pending_count() == 0
+
+    def test_unknown_user_is_stored_as_none(self, writer):
+        writer.enqueue({'log_id': str(uuid.uuid4()), 'user_id': str(uuid.uuid4()), 'action_type': 'delete',
+                        'resource_type': 'user', 'resource_id_raw': None, 'details': None,
+                        'ip_address': None, 'created_at': '2025-01-01 00:00:00+00:00'})
+        writer.flush()
+        assert AuditLog.objects.get().user_id is None
+
+
+@pytest.mark.django_db
+class TestAuditSpool:
+
+    def test_failed_flush_is_replayed_once(self, user, writer, async_mode, django_capture_on_commit_callbacks,
+                                           monkeypatch):
+        with django_capture_on_commit_callbacks(execute=True):
+            logs = _record(user, 2)
+
+        def broken(rows):
+            raise RuntimeError('database down')
+
+        monkeypatch.setattr(writer, '_write', broken)
+        assert writer.flush() == 0
+        assert [p.suffix for p in writer.spool_dir.iterdir()] == ['.pending']
+
+        monkeypatch.setattr(writer, '_write', AuditLogRepository.bulk_create)
+        assert writer.replay() == 2
+        assert writer.replay() == 0
+        assert set(AuditLog.objects.values_list('log_id', flat=True)) == {log.log_id for log in logs}
+
+    def test_dead_worker_spool_is_replayed_and_torn_line_skipped(self, user, writer):
+        row = {'log_id': str(uuid.uuid4()), 'user_id': str(user.user_id), 'action_type': 'ban',
+               'resource_type': 'user', 'resource_id_raw': '1', 'details': None,
+               'ip_address': '127.0.0.1', 'created_at': '2025-01-01 00:00:00+00:00'}
+        orphan = writer.spool_dir / f'audit-{socket.gethostname()}-999999999.jsonl'
+        orphan.write_text(json.dumps(row) + '\n' + json.dumps(row) + '\n{"log_id": "tor')
+        live = writer.spool_dir / f'audit-{socket.gethostname()}-1.jsonl'
+        live.write_text(json.dumps({**row, 'log_id': str(uuid.uuid4())}) + '\n')
+
+        assert writer.replay() == 2
+        assert AuditLog.objects.count() == 1
+        assert not orphan.exists()
+        assert live.exists()
@@ -0,0 +1,120 @@
+import pytest
+from common.prefix_index import PrefixIndex, fold, index_keys
+from common.visibility import VisibilityFilter
+from db.entities.user_entity import User
+from db.repositories.domain_repository import ForumRepository
+from db.repositories.user_repository import UserRepository, BlockRepository, username_index
+
+
+def _create_user(username):
+    return UserRepository.create(email=f'{username}@example.com', username=username, firebase_uid=f'uid-{username}')
+
+
+@pytest.fixture
+def users(db):
+    return [_create_user(name) for name in ('jean_dupont', 'jeanne', 'Jerome', 'marie-jeanne', 'paul')]
+
+
+class TestPrefixKeys:
+
+    def test_fold(self):
+        assert fold('Écologie') == 'ecologie'
+
+    def test_word_starts_are_indexed(self):
+        assert index_keys(fold('Débat Climat')) == ['debat climat', 'climat']
+        assert index_keys('marie-jeanne') == ['marie-jeanne', 'jeanne']
+
+
+class TestTrigramSearch:
+
+    def test_substring_matches_rank_first(self, users):
+        assert [u.username for u in UserRepository.search_by_username('jean')] == [
+            'jean_dupont', 'jeanne', 'marie-jeanne'
+        ]
+
+    def test_typos_are_tolerated(self, users):
+        assert [u.username for u in UserRepository.search_by_username('jeane')][0] == 'jeanne'
+
+    def test_forum_search(self, test_user):
+        for name in ('Transports publics', 'Transition écologique', 'Budget'):
+            ForumRepository.create(creator_id=str(test_user.user_id), forum_name=name)
+        assert [f.forum_name for f in ForumRepository.search('transprt')] == ['Transports publics']
+
+
+class TestUserAutocomplete:
+
+    def test_prefix_and_word_prefix(self, users):
+        assert [u.username for u in UserRepository.autocomplete('JEAN')] == ['jean_dupont', 'jeanne', 'marie-jeanne']
+        assert [u.username for u in UserRepository.autocomplete('dup')] == ['jean_dupont']
+        assert [u.username for u in UserRepository.autocomplete('jean', limit=1)] == ['jean_dupont']
+
+    def test_one_query_once_the_index_is_built(self, users, django_assert_num_queries):
+        UserRepository.autocomplete('p')
+        with django_assert_num_queries(1):
+            assert [u.username for u in UserRepository.autocomplete('pa')] == ['paul']
+
+    def test_new_users_are_added_incrementally(self, users):
+        UserRepository.autocomplete('j')
+        snapshot = username_index._snapshot
+        _create_user('jules')
+        assert 'jules' in [u.username for u in UserRepository.autocomplete('ju')]
+        # Caught up in a copy, without a rebuild
+        assert username_index._snapshot.built_at == snapshot.built_at
+        assert 'jules' not in [name for _, name, _ in snapshot.entries]
+
+    def test_other_workers_catch_up(self, users):
+        worker = PrefixIndex('users:username', User, 'username')
+        assert worker.search('ju', 10) == []
+        jules = _create_user('jules')
+        assert worker.search('ju', 10) == [jules.user_id]
+
+    def test_stale_index_is_served_while_rebuilding(self, users, settings, monkeypatch):
+        UserRepository.autocomplete('j')
+        settings.AUTOCOMPLETE_REBUILD_MODE = 'background'
+        rebuilds = []
+        monkeypatch.setattr(username_index, 'rebuild', lambda: rebuilds.append(True))
+        username_index._new_generation()
+        UserRepository.update(users[4], username='pierre')
+        # Old snapshot until the swap; callers re-read the rows
+        assert username_index.search('pau', 10) == [users[4].user_id]
+        username_index._rebuilder.join()
+        assert rebuilds == [True]
+
+    def test_first_search_falls_back_to_a_query(self, users, settings, monkeypatch):
+        settings.AUTOCOMPLETE_REBUILD_MODE = 'background'
+        worker = PrefixIndex('users:username', User, 'username')
+        monkeypatch.setattr(worker, '_rebuild_in_background', lambda: None)
+        assert worker.search('JEAN', 10) == [users[0].user_id, users[1].user_id]
+
+    def test_renamed_and_banned_users(self, users):
+        UserRepository.autocomplete('j')
+        UserRepository.update(users[2], username='gerome')
+        UserRepository.update(users[1], is_banned=True)
+        assert [u.username for u in UserRepository.autocomplete('j')] == ['jean_dupont', 'marie-jeanne']
+        assert [u.username for u in UserRepository.autocomplete('ge')] == ['gerome']
+
+    def test_blocked_users_are_hidden(self, users):
+        BlockRepository.create(str(users[0].user_id), str(users[1].user_id))
+        visibility = VisibilityFilter(str(users[0].user_id))
+        assert [u.username for u in UserRepository.autocomplete('jean', visibility=visibility)] == [
+            'jean_dupont', 'marie-jeanne'
+        ]
+
+
+class TestAutocompleteViews:
+
+    def test_users(self, authenticated_client, users):
+        response = authenticated_client.get('/api/v1/users/autocomplete/', {'query': 'jea', 'limit': 2})
+        assert response.status_code == 200
+        assert [u['username'] for u in response.data] == ['jean_dupont', 'jeanne']
+
+    def test_forums(self, authenticated_client, test_user):
+        ForumRepository.create(creator_id=str(test_user.user_id), forum_name='Débat Écologie')
+        ForumRepository.create(creator_id=str(test_user.user_id), forum_name='Economie locale')
+        response = authenticated_client.get('/api/v1/forums/autocomplete/', {'query': 'eco'})
+        assert response.status_code == 200
+        assert [f['name'] for f in response.data] == ['Débat Écologie', 'Economie locale']
+
+    def test_query_is_required(self, authenticated_client):
+        assert authenticated_client.get('/api/v1/users/autocomplete/').status_code == 400
+        assert authenticated_client.get('/api/v1/forums/autocomplete/', {'query': ' '}).status_code == 400
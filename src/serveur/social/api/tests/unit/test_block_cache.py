@@ -0,0 +1,55 @@
+import pytest
+from django.core.cache import cache
+from db.repositories.user_repository import UserRepository, BlockRepository, block_cache
+from services.apps_services.user_service import UserService
+
+
+@pytest.fixture(autouse=True)
+def clear_block_cache():
+    cache.clear()
+    block_cache.clear_local()
+    yield
+    block_cache.clear_local()
+
+
+@pytest.fixture
+def alice(db):
+    return UserRepository.create(firebase_id='block-alice', email='balice@example.com', username='balice')
+
+
+@pytest.fixture
+def bob(db):
+    return UserRepository.create(firebase_id='block-bob', email='bbob@example.com', username='bbob')
+
+
+@pytest.mark.django_db
+class TestBlockCache:
+
+    def test_is_blocked_either_way_is_symmetric(self, alice, bob):
+        BlockRepository.create(alice.user_id, bob.user_id)
+        assert BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+        assert BlockRepository.is_blocked_either_way(bob.user_id, alice.user_id)
+
+    def test_repeated_checks_skip_the_database(self, alice, bob, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            for _ in range(3):
+                assert not BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+
+    def test_l2_serves_other_workers(self, alice, bob, django_assert_num_queries):
+        BlockRepository.create(alice.user_id, bob.user_id)
+        BlockRepository.get_blocked_either_way_ids(alice.user_id)
+        block_cache.clear_local()
+        with django_assert_num_queries(0):
+            assert BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+
+    def test_block_and_unblock_invalidate_both_users(self, alice, bob):
+        assert not BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+        assert not BlockRepository.is_blocked_either_way(bob.user_id, alice.user_id)
+
+        UserService.block_user(str(alice.user_id), str(bob.user_id))
+        assert BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+        assert BlockRepository.is_blocked_either_way(bob.user_id, alice.user_id)
+
+        UserService.unblock_user(str(alice.user_id), str(bob.user_id))
+        assert not BlockRepository.is_blocked_either_way(alice.user_id, bob.user_id)
+        assert not BlockRepository.is_blocked_either_way(bob.user_id, alice.user_id)
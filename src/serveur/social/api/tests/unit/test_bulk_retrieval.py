@@ -0,0 +1,107 @@
+import uuid
+import pytest
+from db.entities.post_entity import Post, Comment
+from db.entities.user_entity import User, UserProfile, UserSettings
+from db.repositories.user_repository import BlockRepository, FollowRepository
+from services.apps_services.comment_service import CommentService
+from services.apps_services.post_service import PostService
+
+
+def _user(name, private=False):
+    user = User.objects.create(firebase_uid=f'{name}-uid', email=f'{name}@example.com', username=name)
+    UserProfile.objects.create(user=user, display_name=name, privacy=not private)
+    UserSettings.objects.create(user=user)
+    return user
+
+
+@pytest.fixture
+def authors(db):
+    return {'public': _user('public'), 'private': _user('private', private=True), 'blocked': _user('blocked')}
+
+
+@pytest.fixture
+def posts(test_user, authors):
+    BlockRepository.create(str(test_user.user_id), str(authors['blocked'].user_id))
+    return {name: Post.objects.create(user=author, title=f'By {name}', content='content')
+            for name, author in authors.items()}
+
+
+def _outcome(results):
+    return [error.code if error else item.title for _, item, error in results]
+
+
+class TestBulkPosts:
+
+    def test_request_order_and_per_id_errors(self, test_user, posts):
+        missing = str(uuid.uuid4())
+        ids = [str(posts['private'].post_id), missing, str(posts['public'].post_id), str(posts['blocked'].post_id)]
+        results = PostService.get_bulk_posts(ids, str(test_user.user_id))
+        assert [post_id for post_id, _, _ in results] == ids
+        assert _outcome(results) == ['PERMISSION_DENIED', 'NOT_FOUND', 'By public', 'PERMISSION_DENIED']
+
+    def test_followed_private_author(self, test_user, authors, posts):
+        FollowRepository.create(str(test_user.user_id), str(authors['private'].user_id))
+        results = PostService.get_bulk_posts([str(posts['private'].post_id)], str(test_user.user_id))
+        assert _outcome(results) == ['By private']
+
+    def test_constant_queries(self, test_user, posts, django_assert_max_num_queries):
+        ids = [str(post.post_id) for post in posts.values()] * 10
+        with django_assert_max_num_queries(3):
+            PostService.get_bulk_posts(ids, str(test_user.user_id))
+
+
+class TestBulkComments:
+
+    def test_hidden_post_author_hides_the_comment(self, test_user, authors, posts):
+        visible = Comment.objects.create(user=authors['public'], post=posts['public'], content='ok')
+        on_private = Comment.objects.create(user=authors['public'], post=posts['private'], content='hidden')
+        by_blocked = Comment.objects.create(user=authors['blocked'], post=posts['public'], content='hidden')
+        ids = [str(by_blocked.comment_id), str(visible.comment_id), str(on_private.comment_id)]
+        results = CommentService.get_bulk_comments(ids, str(test_user.user_id))
+        assert [error.code if error else comment.content for _, comment, error in results] == [
+            'PERMISSION_DENIED', 'ok', 'PERMISSION_DENIED'
+        ]
+
+
+class TestBulkViews:
+
+    def test_posts(self, authenticated_client, posts):
+        missing = str(uuid.uuid4())
+        response = authenticated_client.post('/api/v1/posts/bulk/', {
+            'post_ids': [str(posts['public'].post_id), missing]
+        }, format='json')
+        assert response.status_code == 200
+        assert response.data[0]['post']['title'] == 'By public'
+        assert response.data[1] == {'post_id': missing, 'error': {
+            'code': 'NOT_FOUND', 'message': f'Post {missing} not found', 'status': 404
+        }}
+
+    def test_comments(self, authenticated_client, authors, posts):
+        comment = Comment.objects.create(user=authors['public'], post=posts['public'], content='ok')
+        response = authenticated_client.post('/api/v1/comments/bulk/', {
+            'comment_ids': [str(comment.comment_id)]
+        }, format='json')
+        assert response.status_code == 200
+        assert response.data[0]['comment']['content'] == 'ok'
+
+    def test_deleted_authors(self, authenticated_client, authors, posts):
+        post = Post.objects.create(user=None, title='Orphan', content='content')
+        comment = Comment.objects.create(user=None, post=post, content='orphan')
+        response = authenticated_client.post('/api/v1/posts/bulk/', {
+            'post_ids': [str(post.post_id), str(posts['public'].post_id)]
+        }, format='json')
+        assert response.status_code == 200
+        assert [item['post']['title'] for item in response.data] == ['Orphan', 'By public']
+        assert response.data[0]['post']['author_id'] is None
+        response = authenticated_client.post('/api/v1/comments/bulk/', {
+            'comment_ids': [str(comment.comment_id)]
+        }, format='json')
+        assert response.status_code == 200
+        assert response.data[0]['comment']['content'] == 'orphan'
+        assert response.data[0]['comment']['author_username'] is None
+
+    def test_at_most_100_ids(self, authenticated_client):
+        ids = [str(uuid.uuid4()) for _ in range(101)]
+        assert authenticated_client.post('/api/v1/posts/bulk/', {'post_ids': ids}, format='json').status_code == 400
+        assert authenticated_client.post('/api/v1/comments/bulk/', {'comment_ids': ['nope']},
+                                         format='json').status_code == 400
@@ -120,6 +120,21 @@ class TestCommentRepository:
           assert CommentRepository.get_by_id(reply.comment_id) is None
           assert nbcomment == PostRepository.get_by_id(test_post.post_id).comment_count
 
+      def test_delete_subtree_batches(self,test_user,test_post,django_assert_num_queries):
+          root = CommentRepository.create(test_user.user_id,test_post.post_id,"root")
+          parent = root
+          for depth in range(3):
+              parent = CommentRepository.create(test_user.user_id,test_post.post_id,f"reply {depth}",parent_comment_id=parent.comment_id)
+              CommentRepository.create(test_user.user_id,test_post.post_id,"sibling",parent_comment_id=root.comment_id)
+          other = CommentRepository.create(test_user.user_id,test_post.post_id,"other")
+          assert CommentRepository.get_subtree_size(root.comment_id) == 7
+          # post_id, subtree, 3 batches of (savepoint, DELETE, count UPDATE, release), empty subtree
+          with django_assert_num_queries(15):
+              assert CommentRepository.delete_subtree(root.comment_id, batch_size=3) == 7
+          assert CommentRepository.get_subtree_size(root.comment_id) == 0
+          assert CommentRepository.get_by_id(other.comment_id) is not None
+          assert PostRepository.get_by_id(test_post.post_id).comment_count == 1
+
       def test_get_comment_by_post(self,test_post,test_user,test_comment):
           comment = CommentRepository.create(test_user.user_id,test_post.post_id,"Hello world",parent_comment_id=None)
           comments = CommentRepository.get_by_post(test_post.post_id)
@@ -0,0 +1,129 @@
+import pytest
+import redis
+from concurrent.futures import ThreadPoolExecutor
+from common import counters
+from common.redis_client import get_redis
+from common.trending import compute_hot_score
+from db.entities.post_entity import Post
+from db.repositories.user_repository import UserRepository
+from db.repositories.post_repository import PostRepository, post_counters
+
+
+@pytest.fixture(autouse=True)
+def buffered(settings):
+    settings.COUNTER_MODE = 'buffered'
+    # No background flusher: it would apply the deltas outside the test transaction
+    settings.COUNTER_FLUSH_INTERVAL = 0
+
+
+@pytest.fixture
+def author(db):
+    return UserRepository.create(firebase_id='counter-uid', email='counter@example.com', username='counteruser')
+
+
+@pytest.fixture
+def posts(author):
+    return [PostRepository.create(author.user_id, f'Post {i}', 'content') for i in range(3)]
+
+
+def _stored(post):
+    return Post.objects.get(post_id=post.post_id)
+
+
+class TestCounterBuffer:
+
+    def test_deltas_are_pushed_on_commit(self, posts, django_capture_on_commit_callbacks):
+        post = posts[0]
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            PostRepository.increment_like_count(post.post_id)
+        assert post_counters.pending(post.post_id) == {}
+
+        for callback in callbacks:
+            callback()
+        assert post_counters.pending(post.post_id) == {'like_count': 1}
+        assert _stored(post).like_count == 0
+
+    def test_reads_add_pending_deltas(self, posts, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            PostRepository.increment_like_count(posts[0].post_id)
+            PostRepository.increment_like_count(posts[0].post_id)
+            PostRepository.increment_comment_count(posts[1].post_id)
+
+        stored = [_stored(post) for post in posts]
+        post_counters.overlay(stored)
+        assert [(p.like_count, p.comment_count) for p in stored] == [(2, 0), (0, 1), (0, 0)]
+
+    def test_flush_applies_batches(self, posts, django_capture_on_commit_callbacks, django_assert_max_num_queries):
+        with django_capture_on_commit_callbacks(execute=True):
+            for post in posts[:2]:
+                PostRepository.increment_like_count(post.post_id)
+            PostRepository.increment_comment_count(posts[2].post_id)
+
+        # One UPDATE per distinct set of deltas, in a savepoint
+        with django_assert_max_num_queries(4):
+            assert post_counters.flush() == 3
+        assert post_counters.pending(posts[0].post_id) == {}
+        stored = _stored(posts[0])
+        assert stored.like_count == 1
+        assert stored.hot_score == pytest.approx(compute_hot_score(1, 0, stored.created_at))
+        assert _stored(posts[2]).comment_count == 1
+
+    def test_concurrent_increments(self, posts):
+        post_id = str(posts[0].post_id)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: post_counters._push(post_id, {'like_count': 1}), range(40)))
+        post_counters.flush()
+        assert _stored(posts[0]).like_count == 40
+
+    def test_failed_flush_is_retried(self, posts, monkeypatch):
+        post_counters._push(str(posts[0].post_id), {'like_count': 2})
+        monkeypatch.setattr(post_counters, 'update_fields', lambda deltas: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            post_counters.flush()
+        monkeypatch.undo()
+        post_counters._push(str(posts[0].post_id), {'like_count': 1})
+
+        assert post_counters.flush() == 1
+        assert _stored(posts[0]).like_count == 2
+        assert post_counters.flush() == 1
+        assert _stored(posts[0]).like_count == 3
+
+    def test_reads_add_flushing_deltas(self, posts):
+        post_id = str(posts[0].post_id)
+        post_counters._push(post_id, {'like_count': 2})
+        # A flush in flight (or failed before deleting its batch)
+        get_redis().rename(post_counters.pending_key, post_counters.flushing_key)
+        post_counters._push(post_id, {'like_count': 1})
+        stored = _stored(posts[0])
+        post_counters.overlay([stored])
+        assert stored.like_count == 3
+
+    def test_lost_lock_leaves_the_batch(self, posts, monkeypatch):
+        post_counters._push(str(posts[0].post_id), {'like_count': 1})
+        # The lock expired during the flush and another worker took it
+        monkeypatch.setattr(post_counters, 'extend', lambda token: False)
+        assert post_counters.flush() == 0
+        assert _stored(posts[0]).like_count == 0
+        monkeypatch.undo()
+        assert post_counters.flush() == 1
+        assert _stored(posts[0]).like_count == 1
+
+    def test_one_flusher_at_a_time(self, posts):
+        post_counters._push(str(posts[0].post_id), {'like_count': 1})
+        get_redis().set(post_counters.lock_key, 'other-worker')
+        assert post_counters.flush() == 0
+        get_redis().delete(post_counters.lock_key)
+        assert post_counters.flush() == 1
+
+    def test_redis_down_updates_in_place(self, posts, monkeypatch):
+        def unreachable():
+            raise redis.ConnectionError('unreachable')
+
+        monkeypatch.setattr(counters, 'get_redis', unreachable)
+        post_counters._push(str(posts[0].post_id), {'like_count': 1})
+        assert _stored(posts[0]).like_count == 1
+
+    def test_sync_mode(self, posts, settings):
+        settings.COUNTER_MODE = 'sync'
+        PostRepository.increment_like_count(posts[0].post_id)
+        assert _stored(posts[0]).like_count == 1
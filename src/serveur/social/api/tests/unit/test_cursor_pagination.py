@@ -0,0 +1,112 @@
+import pytest
+from rest_framework.test import APIClient
+from common.exceptions import ValidationError
+from common.utils import decode_cursor, encode_cursor, keyset_paginate
+from db.entities.post_entity import Post
+from db.entities.domain_entity import Forum
+from db.repositories.user_repository import UserRepository
+from db.repositories.post_repository import PostRepository, CommentRepository
+from db.repositories.domain_repository import SubforumRepository
+
+
+@pytest.fixture
+def author(db):
+    return UserRepository.create(firebase_id='cursor-uid', email='cursor@example.com', username='cursoruser')
+
+
+@pytest.fixture
+def subforum(db, author):
+    forum = Forum.objects.create(creator=author, forum_name='CursorForum', description='d')
+    return SubforumRepository.create(
+        creator_id=author.user_id,
+        subforum_name='Cursor subforum',
+        description='d',
+        parent_forum_id=forum.forum_id,
+    )
+
+
+@pytest.fixture
+def posts(author, subforum):
+    return [
+        PostRepository.create(author.user_id, f'Post {i}', 'content', subforum_id=subforum.subforum_id)
+        for i in range(5)
+    ]
+
+
+def _walk(fetch):
+    """Follow next_cursor until exhausted and return all pages."""
+    pages = [fetch(None)]
+    while pages[-1].next_cursor:
+        pages.append(fetch(pages[-1].next_cursor))
+    return pages
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_cursor_roundtrip(self, posts):
+        cursor = encode_cursor([posts[0].created_at, posts[0].post_id])
+        assert decode_cursor(cursor, 2) == [posts[0].created_at.isoformat(), str(posts[0].post_id)]
+
+    def test_tampered_cursor_is_rejected(self, posts):
+        cursor = encode_cursor([posts[0].created_at, posts[0].post_id])
+        with pytest.raises(ValidationError):
+            decode_cursor(cursor[:-2] + 'xx')
+
+    def test_walk_matches_offset_order(self, subforum, posts):
+        pages = _walk(lambda c: PostRepository.get_by_subforum(subforum.subforum_id, page_size=2, cursor=c))
+        walked = [str(p.post_id) for page in pages for p in page]
+        expected = [str(p.post_id) for p in PostRepository.get_by_subforum(subforum.subforum_id, page_size=10)]
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert walked == expected
+
+    def test_new_rows_do_not_shift_cursor_pages(self, author, subforum, posts):
+        first = PostRepository.get_by_subforum(subforum.subforum_id, page_size=2)
+        PostRepository.create(author.user_id, 'Newer', 'content', subforum_id=subforum.subforum_id)
+        second = PostRepository.get_by_subforum(subforum.subforum_id, page_size=2, cursor=first.next_cursor)
+        assert not {p.post_id for p in first} & {p.post_id for p in second}
+
+    def test_ascending_ordering(self, author, posts):
+        parent = CommentRepository.create(author.user_id, posts[0].post_id, 'parent')
+        replies = [CommentRepository.create(author.user_id, posts[0].post_id, f'reply {i}', parent.comment_id) for i in range(3)]
+        pages = _walk(lambda c: CommentRepository.get_replies(parent.comment_id, page_size=2, cursor=c))
+        assert [c.comment_id for page in pages for c in page] == [r.comment_id for r in replies]
+
+    def test_mixed_leading_field(self, posts):
+        Post.objects.filter(post_id=posts[2].post_id).update(like_count=3)
+        pages = _walk(lambda c: keyset_paginate(Post.objects.all(), ['-like_count', '-created_at', '-post_id'], page_size=2, cursor=c))
+        walked = [p.post_id for page in pages for p in page]
+        assert walked[0] == posts[2].post_id
+        assert sorted(walked) == sorted(p.post_id for p in posts)
+
+
+@pytest.mark.django_db
+class TestCursorEndpoints:
+
+    def test_legacy_page_response_stays_a_list(self, author, posts):
+        client = APIClient()
+        client.force_authenticate(user=author)
+        response = client.get('/api/v1/posts/feed/', {'page_size': 2})
+        assert response.status_code == 200
+        assert isinstance(response.data, list)
+        assert response['X-Next-Cursor']
+
+    def test_cursor_response_walks_the_feed(self, author, posts):
+        client = APIClient()
+        client.force_authenticate(user=author)
+        seen = []
+        params = {'page_size': 2, 'cursor': ''}
+        while True:
+            response = client.get('/api/v1/posts/feed/', params)
+            assert response.status_code == 200
+            seen += [item['post_id'] for item in response.data['results']]
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        assert seen == [str(p.post_id) for p in reversed(posts)]
+
+    def test_invalid_cursor_returns_400(self, author, posts):
+        client = APIClient()
+        client.force_authenticate(user=author)
+        response = client.get('/api/v1/posts/feed/', {'cursor': 'garbage'})
+        assert response.status_code == 400
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import Mock
+from django.test import override_settings
+from common.exceptions import PermissionDeniedError
+from services.apps_services.encryption_service import EncryptionService
+from services.apps_services.message_service import MessageService
+
+
+@pytest.fixture(scope='module')
+def sender_keys():
+    return EncryptionService.generate_rsa_keypair()
+
+
+@pytest.fixture(scope='module')
+def receiver_keys():
+    return EncryptionService.generate_rsa_keypair()
+
+
+@pytest.fixture(autouse=True)
+def clear_key_cache():
+    EncryptionService.clear_key_cache()
+    yield
+    EncryptionService.clear_key_cache()
+
+
+def _encrypt_batch(contents, sender_keys, receiver_keys):
+    return [EncryptionService.encrypt_message(c, sender_keys[1], receiver_keys[1]) for c in contents]
+
+
+class TestEncryptionService:
+
+    def test_public_keys_are_parsed_once(self, sender_keys):
+        assert EncryptionService.load_public_key(sender_keys[1]) is EncryptionService.load_public_key(sender_keys[1])
+
+    def test_key_cache_is_bounded(self, sender_keys, receiver_keys):
+        with override_settings(ENCRYPTION_KEY_CACHE_SIZE=1):
+            first = EncryptionService.load_public_key(sender_keys[1])
+            EncryptionService.load_public_key(receiver_keys[1])
+            assert EncryptionService.load_public_key(sender_keys[1]) is not first
+
+    def test_decrypt_many_matches_decrypt_message(self, sender_keys, receiver_keys):
+        contents = ['bonjour', 'é' * 40, '']
+        encrypted = _encrypt_batch(contents, sender_keys, receiver_keys)
+        pairs = [(e['encrypted_content'], e['encryption_key_receiver']) for e in encrypted]
+
+        assert EncryptionService.decrypt_many(pairs, receiver_keys[0]) == contents
+        assert [EncryptionService.decrypt_message(c, k, receiver_keys[0]) for c, k in pairs] == contents
+
+    @override_settings(ENCRYPTION_PARALLEL_THRESHOLD=2)
+    def test_decrypt_many_thread_pool_keeps_order(self, sender_keys, receiver_keys):
+        contents = [f'message {i}' for i in range(8)]
+        encrypted = _encrypt_batch(contents, sender_keys, receiver_keys)
+        pairs = [(e['encrypted_content'], e['encryption_key_sender']) for e in encrypted]
+
+        assert EncryptionService.decrypt_many(pairs, sender_keys[0]) == contents
+
+    def test_decrypt_messages_uses_the_users_key(self, sender_keys, receiver_keys):
+        encrypted = EncryptionService.encrypt_message('hello', sender_keys[1], receiver_keys[1])
+        message = Mock(sender_id='sender', receiver_id='receiver', **encrypted)
+
+        assert MessageService.decrypt_messages([message], 'sender', sender_keys[0]) == ['hello']
+        assert MessageService.decrypt_messages([message], 'receiver', receiver_keys[0]) == ['hello']
+        with pytest.raises(PermissionDeniedError):
+            MessageService.decrypt_messages([message], 'someone', receiver_keys[0])
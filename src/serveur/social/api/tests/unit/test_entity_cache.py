@@ -0,0 +1,130 @@
+import pytest
+from django.core.cache import cache
+from db.entities.domain_entity import Domain
+from db.entities.post_entity import Post
+from db.repositories.domain_repository import DomainRepository, SubforumRepository
+from db.repositories.entity_cache import identity_map
+from db.repositories.post_repository import PostRepository, post_cache, post_counters
+from db.repositories.user_repository import UserRepository, user_cache
+from services.apps_services.report_service import ReportService
+from services.apps_services.user_service import UserService
+
+
+@pytest.fixture
+def post(test_user):
+    domain = Domain.objects.create(domain_name='Culture')
+    subforum = SubforumRepository.create(creator_id=str(test_user.user_id), subforum_name='Cinema',
+                                         parent_domain_id=str(domain.domain_id))
+    return PostRepository.create(str(test_user.user_id), 'Title', 'content', subforum_id=str(subforum.subforum_id))
+
+
+class TestReadThrough:
+
+    def test_second_read_needs_no_query(self, post, django_assert_num_queries):
+        PostRepository.get_by_id(str(post.post_id))
+        with django_assert_num_queries(0):
+            cached = PostRepository.get_by_id(str(post.post_id))
+            assert cached.title == 'Title'
+            assert cached.subforum.subforum_name == 'Cinema'
+            assert cached.user.profile.display_name == 'Test User'
+            assert cached.user.settings.language == 'fr'
+            assert cached.user.profile.user is cached.user
+
+    def test_missing_entities_are_not_cached(self, test_user):
+        missing = '00000000-0000-0000-0000-000000000000'
+        assert PostRepository.get_by_id(missing) is None
+        assert user_cache.get(missing) is None
+
+    def test_key_spellings_share_an_entry(self, post):
+        PostRepository.get_by_id(str(post.post_id).upper())
+        Post.objects.filter(post_id=post.post_id).update(title='Edited')
+        post_cache.invalidate(post.post_id)
+        assert PostRepository.get_by_id(str(post.post_id).upper()).title == 'Edited'
+        assert PostRepository.get_by_id(post.post_id.hex).title == 'Edited'
+
+    def test_invalid_keys_touch_no_cache(self, test_user, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert PostRepository.get_by_id('not-a-uuid') is None
+        assert cache.get(post_cache._version_key('not-a-uuid')) is None
+
+    def test_identity_map(self, post, django_assert_num_queries):
+        with identity_map():
+            first = PostRepository.get_by_id(str(post.post_id))
+            with django_assert_num_queries(0):
+                assert PostRepository.get_by_id(post.post_id) is first
+                assert UserRepository.get_by_id(str(post.user_id)) is first.user
+        assert PostRepository.get_by_id(str(post.post_id)) is not first
+
+    def test_stale_entries_are_never_served(self, post):
+        PostRepository.get_by_id(str(post.post_id))
+        entry_key = post_cache._entry_key(str(post.post_id))
+        stale = cache.get(entry_key)
+        Post.objects.filter(post_id=post.post_id).update(title='Edited')
+        post_cache.invalidate(post.post_id)
+        # A reader that loaded before the write stores its entry after the bump
+        cache.set(entry_key, stale)
+        assert PostRepository.get_by_id(str(post.post_id)).title == 'Edited'
+
+
+class TestInvalidation:
+
+    def test_counts(self, post):
+        PostRepository.get_by_id(str(post.post_id))
+        PostRepository.increment_like_count(str(post.post_id))
+        assert PostRepository.get_by_id(str(post.post_id)).like_count == 1
+
+    def test_flushed_counts(self, post, settings, django_capture_on_commit_callbacks):
+        settings.COUNTER_MODE = 'buffered'
+        settings.COUNTER_FLUSH_INTERVAL = 0
+        PostRepository.get_by_id(str(post.post_id))
+        with django_capture_on_commit_callbacks(execute=True):
+            PostRepository.increment_comment_count(str(post.post_id))
+        post_counters.flush()
+        assert PostRepository.get_by_id(str(post.post_id)).comment_count == 1
+
+    def test_delete(self, post):
+        PostRepository.get_by_id(str(post.post_id))
+        PostRepository.delete(str(post.post_id))
+        assert PostRepository.get_by_id(str(post.post_id)) is None
+
+    def test_domain_delete_detaches_cached_posts(self, post):
+        assert PostRepository.get_by_id(str(post.post_id)).subforum is not None
+        DomainRepository.delete(str(post.subforum.parent_domain_id))
+        cached = PostRepository.get_by_id(str(post.post_id))
+        assert cached.subforum_id is None and cached.subforum is None
+
+    def test_author_changes_reach_cached_posts(self, test_user, post):
+        PostRepository.get_by_id(str(post.post_id))
+        UserService.update_user_profile(str(test_user.user_id), display_name='Renamed', privacy='private')
+        author = PostRepository.get_by_id(str(post.post_id)).user
+        assert (author.profile.display_name, author.profile.privacy) == ('Renamed', False)
+
+    def test_ban(self, test_user, admin_user):
+        assert UserRepository.get_by_id(str(test_user.user_id)).is_banned is False
+        ReportService.ban_user(str(admin_user.user_id), str(test_user.user_id))
+        assert UserRepository.get_by_id(str(test_user.user_id)).is_banned is True
+
+
+class TestMetrics:
+
+    def test_hits_and_misses(self, post):
+        # Counts of earlier tests not published yet
+        post_cache.publish_metrics()
+        cache.clear()
+        with identity_map():
+            for _ in range(2):
+                PostRepository.get_by_id(str(post.post_id))
+        PostRepository.get_by_id(str(post.post_id))
+        post_cache.invalidate(post.post_id)
+        assert post_cache.stats() == {
+            'l1_hits': 1, 'l2_hits': 1, 'misses': 1, 'invalidations': 1, 'hit_ratio': 0.6667
+        }
+
+    def test_admin_endpoint(self, admin_client, post):
+        post_cache.publish_metrics()
+        cache.clear()
+        PostRepository.get_by_id(str(post.post_id))
+        response = admin_client.get('/api/v1/admin/stats/cache/')
+        assert response.status_code == 200
+        assert response.data['data']['posts']['misses'] == 1
+        assert response.data['data']['users']['misses'] >= 1
@@ -4,6 +4,7 @@ from rest_framework.test import APIRequestFactory, force_authenticate
 from db.entities.user_entity import User
 from db.repositories.domain_repository import ForumRepository, SubforumRepository
 from api.apps.forums.views import ForumTreeView
+from services.apps_services.forum_service import ForumService
 
 
 @pytest.mark.django_db
@@ -48,3 +49,88 @@ def test_forum_tree_structure():
     child_node = root_node['children'][0]
     assert child_node['name'] == 'ChildSub'
     assert child_node.get('children') == []
+
+
+def _tree(user, forum_id, **params):
+    request = APIRequestFactory().get(f"/api/v1/forums/{forum_id}/tree/", params)
+    force_authenticate(request, user=user)
+    return ForumTreeView.as_view()(request, forum_id=str(forum_id))
+
+
+@pytest.fixture
+def chain(db):
+    """A forum with a chain of 5 nested subforums, the top one having a sibling."""
+    user = User.objects.create(firebase_uid='t2', email='t2@example.com', username='chainer')
+    forum = ForumRepository.create(creator_id=str(user.user_id), forum_name='ChainForum')
+    subforums = []
+    parent_forum_id = str(forum.forum_id)
+    for level in range(5):
+        subforum = SubforumRepository.create(creator_id=str(user.user_id), subforum_name=f'Level{level}',
+                                             parent_forum_id=parent_forum_id)
+        subforums.append(subforum)
+        parent_forum_id = str(subforum.forum_id_id)
+    SubforumRepository.create(creator_id=str(user.user_id), subforum_name='Sibling',
+                              parent_forum_id=str(forum.forum_id))
+    return user, forum, subforums
+
+
+@pytest.mark.django_db
+class TestSubforumPath:
+
+    def test_path_lists_forums_above(self, chain):
+        _, forum, subforums = chain
+        assert subforums[0].path == [forum.forum_id]
+        assert subforums[2].path == [forum.forum_id, subforums[0].forum_id_id, subforums[1].forum_id_id]
+
+    def test_nested_creation_through_service(self, chain):
+        user, forum, subforums = chain
+        nested = ForumService.create_subforum_in_subforum(str(user.user_id), str(subforums[4].subforum_id),
+                                                          'Level5', 'deepest')
+        assert nested.path == subforums[4].path + [subforums[4].forum_id_id]
+
+    def test_get_tree_is_one_query(self, chain, django_assert_num_queries):
+        _, forum, subforums = chain
+        with django_assert_num_queries(1):
+            tree = SubforumRepository.get_tree(str(forum.forum_id))
+        assert [s.subforum_name for s in tree] == [f'Level{level}' for level in range(5)] + ['Sibling']
+        assert [s.tree_depth for s in tree] == [1, 2, 3, 4, 5, 1]
+
+    def test_get_subtree_with_depth(self, chain):
+        _, _, subforums = chain
+        tree = SubforumRepository.get_tree(str(subforums[1].forum_id_id), max_depth=2)
+        assert [(s.subforum_name, s.tree_depth) for s in tree] == [('Level2', 1), ('Level3', 2)]
+
+    def test_attaching_a_forum_moves_its_subtree(self, chain):
+        user, forum, subforums = chain
+        other = ForumRepository.create(creator_id=str(user.user_id), forum_name='OtherForum')
+        SubforumRepository.create(creator_id=str(user.user_id), subforum_name='Attached',
+                                  forum_id=str(forum.forum_id), parent_forum_id=str(other.forum_id))
+
+        assert [s.subforum_name for s in SubforumRepository.get_tree(str(other.forum_id), max_depth=2)] == [
+            'Level0', 'Sibling', 'Attached'
+        ]
+
+
+@pytest.mark.django_db
+class TestForumTreeView:
+
+    def test_tree_is_assembled_from_one_subforum_query(self, chain, django_assert_max_num_queries):
+        user, forum, _ = chain
+        with django_assert_max_num_queries(4):
+            response = _tree(user, forum.forum_id)
+
+        assert response.status_code == 200
+        assert [node['name'] for node in response.data] == ['Level0', 'Sibling']
+        node = response.data[0]
+        for level in range(1, 5):
+            assert len(node['children']) == 1
+            node = node['children'][0]
+            assert node['name'] == f'Level{level}'
+        assert node['children'] == []
+
+    def test_depth_limit(self, chain):
+        user, forum, _ = chain
+        response = _tree(user, forum.forum_id, depth=2)
+        assert response.status_code == 200
+        assert [child['name'] for child in response.data[0]['children']] == ['Level1']
+        assert response.data[0]['children'][0]['children'] == []
@@ -3,6 +3,8 @@ Unit tests for MessageRepository.
 Tests all repository methods with edge cases.
 """
 import pytest
+from io import StringIO
+from django.core.management import call_command
 from django.db import IntegrityError
 from db.entities.message_entity import Message
 from db.entities.user_entity import User
@@ -681,3 +683,87 @@ class TestMessageRepositoryMarkConversationAsDeleted:
         msg_user3.refresh_from_db()
         assert msg_user2.deleted_by_sender is True
         assert msg_user3.deleted_by_sender is False
+
+
+@pytest.mark.django_db
+class TestConversationSummaries:
+    """Test the conversation summaries behind MessageRepository.get_conversations()."""
+
+    def _send(self, sender, receiver, content='msg'):
+        return MessageRepository.create(str(sender.user_id), str(receiver.user_id), content, 'k', 'kr')
+
+    def test_inbox_is_a_single_query(self, users, django_assert_num_queries):
+        """Test the inbox cost does not grow with the number of partners."""
+        for _ in range(3):
+            self._send(users['user2'], users['user1'])
+            self._send(users['user1'], users['user3'])
+
+        with django_assert_num_queries(1):
+            conversations = MessageRepository.get_conversations(str(users['user1'].user_id))
+            last_ids = [conv['last_message'].message_id for conv in conversations]
+
+        assert len(last_ids) == 2
+        assert [str(c['partner_id']) for c in conversations] == [str(users['user3'].user_id), str(users['user2'].user_id)]
+        assert [c['unread_count'] for c in conversations] == [0, 3]
+
+    def test_mark_as_read_resets_unread_count(self, users):
+        """Test reading a conversation clears its unread count."""
+        self._send(users['user2'], users['user1'])
+        MessageRepository.mark_as_read(str(users['user2'].user_id), str(users['user1'].user_id))
+
+        conversations = MessageRepository.get_conversations(str(users['user1'].user_id))
+        assert conversations[0]['unread_count'] == 0
+
+    def test_deleted_conversation_reappears_with_new_message(self, users):
+        """Test a deleted conversation only shows messages received after deletion."""
+        self._send(users['user2'], users['user1'], 'old')
+        MessageRepository.mark_conversation_as_deleted(str(users['user1'].user_id), str(users['user2'].user_id))
+        assert len(MessageRepository.get_conversations(str(users['user1'].user_id))) == 0
+        # The partner still sees the conversation
+        assert len(MessageRepository.get_conversations(str(users['user2'].user_id))) == 1
+
+        new = self._send(users['user2'], users['user1'], 'new')
+        conversations = MessageRepository.get_conversations(str(users['user1'].user_id))
+        assert conversations[0]['last_message'].message_id == new.message_id
+        assert conversations[0]['unread_count'] == 1
+
+    def test_conversations_pagination(self, users):
+        """Test the inbox honours page_size and cursors."""
+        self._send(users['user2'], users['user1'])
+        self._send(users['user3'], users['user1'])
+
+        first = MessageRepository.get_conversations(str(users['user1'].user_id), page_size=1)
+        second = MessageRepository.get_conversations(str(users['user1'].user_id), page_size=1, cursor=first.next_cursor)
+        assert [str(c['partner_id']) for c in first + second] == [str(users['user3'].user_id), str(users['user2'].user_id)]
+        assert second.next_cursor is None
+
+
+@pytest.mark.django_db
+class TestConversationKey:
+    """Test the canonical conversation key behind conversation reads and updates."""
+
+    def test_key_is_order_independent(self, users):
+        """Test both directions of a conversation share one key."""
+        sent = MessageRepository.create(str(users['user1'].user_id), str(users['user2'].user_id), 'a', 'k', 'kr')
+        received = MessageRepository.create(str(users['user2'].user_id), str(users['user1'].user_id), 'b', 'k', 'kr')
+
+        assert sent.conversation_key == received.conversation_key
+        assert sent.conversation_key == Message.conversation_key_for(users['user2'].user_id, users['user1'].user_id)
+
+    def test_soft_delete_flags_only_the_users_side(self, users):
+        """Test the single-statement soft delete sets each message's flag for the deleting user only."""
+        sent = MessageRepository.create(str(users['user1'].user_id), str(users['user2'].user_id), 'a', 'k', 'kr')
+        received = MessageRepository.create(str(users['user2'].user_id), str(users['user1'].user_id), 'b', 'k', 'kr')
+
+        MessageRepository.mark_conversation_as_deleted(str(users['user1'].user_id), str(users['user2'].user_id))
+
+        sent.refresh_from_db()
+        received.refresh_from_db()
+        assert (sent.deleted_by_sender, sent.deleted_by_receiver) == (True, False)
+        assert (received.deleted_by_sender, received.deleted_by_receiver) == (False, True)
+
+    def test_benchmark_command_runs_and_rolls_back(self, users):
+        """Test the benchmark leaves no data behind."""
+        before = Message.objects.count()
+        call_command('benchmark_messages', sizes=[20], users=4, conversation_size=4, runs=1, stdout=StringIO())
+        assert Message.objects.count() == before
@@ -43,7 +43,7 @@ class TestMessageServiceSendMessage:
     def test_send_message_success(self, mock_audit, mock_encryption, mock_msg_repo, mock_user_repo, mock_block_repo):
         """Test sending message successfully."""
         # Setup mocks
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_2))
         mock_encryption.encrypt_message.return_value = {
             'encrypted_content': 'encrypted',
@@ -73,7 +73,7 @@ class TestMessageServiceSendMessage:
     @patch('services.apps_services.message_service.UserRepository')
     def test_send_message_receiver_not_found(self, mock_user_repo, mock_block_repo):
         """Test sending message to non-existent user fails."""
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = None
         
         with pytest.raises(NotFoundError, match="not found"):
@@ -90,7 +90,7 @@ class TestMessageServiceSendMessage:
     @patch('services.apps_services.message_service.UserRepository')
     def test_send_message_to_self_fails(self, mock_user_repo, mock_block_repo):
         """Test cannot send message to self."""
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_1))
         
         with pytest.raises(ValidationError, match="Cannot send message to yourself"):
@@ -110,7 +110,7 @@ class TestMessageServiceSendMessage:
     @patch('services.apps_services.message_service.AuditLogRepository')
     def test_send_message_empty_content(self, mock_audit, mock_encryption, mock_msg_repo, mock_user_repo, mock_block_repo):
         """Test sending message with empty content."""
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_2))
         mock_encryption.encrypt_message.return_value = {
             'encrypted_content': '',
@@ -135,7 +135,7 @@ class TestMessageServiceSendMessage:
     @patch('services.apps_services.message_service.EncryptionService')
     def test_send_message_encryption_fails(self, mock_encryption, mock_user_repo, mock_block_repo):
         """Test encryption failure is propagated."""
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_2))
         mock_encryption.encrypt_message.side_effect = ValueError("Invalid key")
         
@@ -157,7 +157,7 @@ class TestMessageServiceSendMessage:
     def test_send_message_long_content(self, mock_audit, mock_encryption, mock_msg_repo, mock_user_repo, mock_block_repo):
         """Test sending message with very long content."""
         long_content = 'x' * 100000
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_2))
         mock_encryption.encrypt_message.return_value = {
             'encrypted_content': 'encrypted_' + long_content,
@@ -242,7 +242,7 @@ class TestMessageServiceGetConversation:
         )
         
         mock_msg_repo.get_conversation.assert_called_once_with(
-            TEST_UUID_1, TEST_UUID_2, 3, 50
+            TEST_UUID_1, TEST_UUID_2, 3, 50, cursor=None
         )
     
     @patch('services.apps_services.message_service.UserRepository')
@@ -275,7 +275,7 @@ class TestMessageServiceGetConversations:
         result = MessageService.get_conversations(TEST_UUID_1)
         
         assert len(result) == 2
-        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 1, 20)
+        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 1, 20, cursor=None)
     
     @patch('services.apps_services.message_service.MessageRepository')
     def test_get_conversations_pagination(self, mock_msg_repo):
@@ -284,7 +284,7 @@ class TestMessageServiceGetConversations:
         
         MessageService.get_conversations(TEST_UUID_1, page=2, page_size=50)
         
-        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 2, 50)
+        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 2, 50, cursor=None)
     
     @patch('services.apps_services.message_service.MessageRepository')
     def test_get_conversations_empty(self, mock_msg_repo):
@@ -467,7 +467,7 @@ class TestMessageServiceEdgeCases:
     def test_send_message_with_special_characters(self, mock_audit, mock_encryption, mock_msg_repo, mock_user_repo, mock_block_repo):
         """Test sending message with special unicode characters."""
         special_content = "Hello 你好 🎉 \n\t\r Special chars: <>\"'&"
-        mock_block_repo.is_blocked.return_value = False
+        mock_block_repo.is_blocked_either_way.return_value = False
         mock_user_repo.get_by_id.return_value = Mock(user_id=uuid.UUID(TEST_UUID_2))
         mock_encryption.encrypt_message.return_value = {
             'encrypted_content': 'encrypted',
@@ -508,7 +508,7 @@ class TestMessageServiceEdgeCases:
         # Should handle gracefully (repository will handle validation)
         MessageService.get_conversations(TEST_UUID_1, page=-1, page_size=20)
         
-        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, -1, 20)
+        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, -1, 20, cursor=None)
     
     @patch('services.apps_services.message_service.MessageRepository')
     def test_get_conversations_zero_page_size(self, mock_msg_repo):
@@ -517,7 +517,7 @@ class TestMessageServiceEdgeCases:
         
         MessageService.get_conversations(TEST_UUID_1, page=1, page_size=0)
         
-        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 1, 0)
+        mock_msg_repo.get_conversations.assert_called_once_with(TEST_UUID_1, 1, 0, cursor=None)
     
     @patch('services.apps_services.message_service.UserRepository')
     @patch('services.apps_services.message_service.MessageRepository')
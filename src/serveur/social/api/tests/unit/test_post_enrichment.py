@@ -0,0 +1,79 @@
+import pytest
+from db.entities.domain_entity import Domain
+from db.entities.post_entity import Post, Like, Tag, PostTag
+from db.entities.user_entity import User, UserProfile, UserSettings
+from db.repositories.domain_repository import SubforumRepository
+from db.repositories.user_repository import FollowRepository
+from services.apps_services.post_service import PostService
+
+
+@pytest.fixture
+def author(db):
+    user = User.objects.create(firebase_uid='author-uid', email='author@example.com', username='author')
+    UserProfile.objects.create(user=user, display_name='Author')
+    UserSettings.objects.create(user=user)
+    return user
+
+
+@pytest.fixture
+def subforum(test_user):
+    domain = Domain.objects.create(domain_name='Culture')
+    return SubforumRepository.create(creator_id=str(test_user.user_id), subforum_name='Cinema',
+                                     parent_domain_id=str(domain.domain_id))
+
+
+@pytest.fixture
+def posts(test_user, author, subforum):
+    """Two posts by a followed author (one liked, one tagged twice) and one by the viewer."""
+    followed = [Post.objects.create(user=author, subforum=subforum, title=f'Post {i}', content='content')
+                for i in range(2)]
+    own = Post.objects.create(user=test_user, subforum=subforum, title='Own', content='content')
+    FollowRepository.create(str(test_user.user_id), str(author.user_id))
+    Like.objects.create(user=test_user, post=followed[0])
+    for name in ('films', 'archives'):
+        PostTag.objects.create(post=followed[1], tag=Tag.objects.create(tag_name=name))
+    return followed + [own]
+
+
+class TestEnrichPosts:
+
+    def test_one_query_per_kind(self, test_user, posts, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            PostService.enrich_posts(posts, str(test_user.user_id))
+        assert [post.liked_by_me for post in posts] == [True, False, False]
+        assert [post.following_author for post in posts] == [True, True, False]
+        assert [[tag.tag_name for tag in post.tags] for post in posts] == [[], ['archives', 'films'], []]
+
+    def test_pending_follow_is_not_following(self, test_user, author, posts):
+        FollowRepository.update_status(str(test_user.user_id), str(author.user_id), 'pending')
+        PostService.enrich_posts(posts, str(test_user.user_id))
+        assert not any(post.following_author for post in posts)
+
+    def test_empty_page(self, test_user, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert PostService.enrich_posts([], str(test_user.user_id)) == []
+
+
+class TestViewerStateInLists:
+
+    @staticmethod
+    def _by_title(response):
+        assert response.status_code == 200
+        return {item['title']: item for item in response.data}
+
+    def test_discover(self, authenticated_client, posts):
+        items = self._by_title(authenticated_client.get('/api/v1/posts/discover/'))
+        assert items['Post 0']['liked_by_me'] is True
+        assert items['Post 0']['following_author'] is True
+        assert [tag['tag_name'] for tag in items['Post 1']['tags']] == ['archives', 'films']
+        assert items['Own']['following_author'] is False
+
+    def test_feed(self, authenticated_client, posts):
+        items = self._by_title(authenticated_client.get('/api/v1/posts/feed/'))
+        assert items['Post 0']['liked_by_me'] is True
+        assert items['Post 1']['liked_by_me'] is False
+
+    def test_subforum_posts(self, authenticated_client, posts, subforum):
+        items = self._by_title(authenticated_client.get(f'/api/v1/subforums/{subforum.subforum_id}/posts/'))
+        assert set(items) == {'Post 0', 'Post 1', 'Own'}
+        assert items['Post 1']['tags'][0]['tag_id'] == str(posts[1].post_tags.get(tag__tag_name='archives').tag_id)
@@ -0,0 +1,152 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import redis
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from common import rate_limiters
+from common.rate_limiters import TwoTierRateLimiter, check_rate_limit, local_limiter, rate_limit
+
+
+@pytest.fixture
+def key():
+    return f'test:{uuid.uuid4()}'
+
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    def unreachable():
+        raise redis.ConnectionError('unreachable')
+
+    monkeypatch.setattr(rate_limiters, 'get_redis', unreachable)
+    monkeypatch.setattr(rate_limiters, '_gcra', None)
+    monkeypatch.setattr(rate_limiters, '_redis_retry_at', 0.0)
+    local_limiter.clear()
+    yield
+    local_limiter.clear()
+
+
+@pytest.fixture
+def redis_calls(monkeypatch):
+    calls = []
+    original = rate_limiters._redis_gcra
+
+    def spy(key, *args, **kwargs):
+        calls.append(key)
+        return original(key, *args, **kwargs)
+
+    monkeypatch.setattr(rate_limiters, '_redis_gcra', spy)
+    return calls
+
+
+def _two_tier(name, limit=10, local_budget=3):
+    # Long interval: the tests sync explicitly
+    return TwoTierRateLimiter(name, limit, 60, sync_interval=60, local_budget=local_budget)
+
+
+class LimitedView(APIView):
+    permission_classes = []
+
+    @rate_limit('test_view', 2, 60)
+    def get(self, request):
+        return Response({'ok': True})
+
+
+class TestCheckRateLimit:
+
+    def test_allows_limit_then_denies(self, key):
+        results = [check_rate_limit(key, 3, 60) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert 19 < results[3].retry_after <= 20
+        assert 59 < results[3].reset_after <= 60
+
+    def test_concurrent_requests_cannot_exceed_limit(self, key):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: check_rate_limit(key, 10, 60), range(30)))
+        assert sum(r.allowed for r in results) == 10
+
+    def test_falls_back_to_process_memory(self, key, redis_down):
+        results = [check_rate_limit(key, 2, 60) for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert results[0].remaining == 1
+
+
+class TestTwoTierRateLimiter:
+
+    def test_checks_redis_once_then_decides_locally(self, key, redis_calls):
+        limiter = _two_tier(key)
+        results = [limiter.check('client') for _ in range(5)]
+
+        assert all(r.allowed for r in results)
+        assert [r.remaining for r in results] == [9, 8, 7, 6, 5]
+        # First check and the one after the local budget (3) went to Redis
+        assert len(redis_calls) == 2
+        assert limiter.stats()['local_checks'] == 3
+        assert limiter.stats()['redis_checks'] == 2
+
+    def test_sync_pushes_local_hits(self, key):
+        limiter = _two_tier(key)
+        for _ in range(4):
+            limiter.check('client')
+
+        assert limiter.sync() == 1
+        assert check_rate_limit(f'{key}:client', 10, 60).remaining == 10 - 4 - 1
+        assert limiter.stats()['synced_hits'] == 3
+
+    def test_sync_pulls_other_workers_hits(self, key):
+        worker, other = _two_tier(key), _two_tier(key)
+        worker.check('client')
+        for _ in range(9):
+            other.check('client')
+        other.sync()
+
+        assert worker.check('client').allowed
+        worker.sync()
+        assert not worker.check('client').allowed
+
+    def test_overshoot_is_bounded_and_reported(self, key):
+        workers = [_two_tier(key, limit=10, local_budget=3) for _ in range(2)]
+        allowed = 0
+        for _ in range(10):
+            for worker in workers:
+                allowed += sum(worker.check('client').allowed for _ in range(2))
+            for worker in workers:
+                worker.sync()
+
+        assert 10 <= allowed <= 10 + 2 * 3
+        overshoot = sum(worker.stats()['overshoot_hits'] for worker in workers)
+        assert overshoot >= allowed - 10 - 1
+
+    def test_keeps_hits_while_redis_is_down(self, key, monkeypatch):
+        limiter = _two_tier(key)
+        limiter.check('client')
+        limiter.check('client')
+        monkeypatch.setattr(rate_limiters, '_redis_retry_at', float('inf'))
+
+        assert limiter.sync() == 0
+        monkeypatch.setattr(rate_limiters, '_redis_retry_at', 0.0)
+        assert limiter.sync() == 1
+        assert check_rate_limit(f'{key}:client', 10, 60).remaining == 10 - 2 - 1
+
+
+class TestRateLimitDecorator:
+
+    def test_headers_and_429(self):
+        view = LimitedView.as_view()
+        client_ip = f'test-{uuid.uuid4()}'
+        responses = [view(APIRequestFactory().get('/limited/', REMOTE_ADDR=client_ip)) for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0]['X-RateLimit-Limit'] == '2'
+        assert responses[0]['X-RateLimit-Remaining'] == '1'
+        assert responses[1]['X-RateLimit-Remaining'] == '0'
+        assert int(responses[2]['Retry-After']) == 30
+        assert responses[2].data['error']['code'] == 'RATE_LIMIT_EXCEEDED'
+
+    def test_disabled(self, settings):
+        settings.RATE_LIMIT_ENABLED = False
+        response = LimitedView.as_view()(APIRequestFactory().get('/limited/'))
+        assert response.status_code == 200
+        assert 'X-RateLimit-Limit' not in response
@@ -0,0 +1,121 @@
+import pytest
+from db.entities.domain_entity import Domain
+from db.entities.post_entity import Post, Comment, Tag, PostTag
+from db.entities.user_entity import User, UserProfile, UserSettings
+from db.repositories.domain_repository import SubforumRepository
+from db.repositories.search_repository import SearchRepository
+from db.repositories.user_repository import BlockRepository
+
+URL = '/api/v1/posts/search/'
+
+
+@pytest.fixture
+def other_user(db):
+    user = User.objects.create(firebase_uid='search-uid', email='search@example.com', username='searcher')
+    UserProfile.objects.create(user=user, display_name='Searcher')
+    UserSettings.objects.create(user=user, language='en')
+    return user
+
+
+@pytest.fixture
+def subforum(test_user):
+    domain = Domain.objects.create(domain_name='Environnement')
+    return SubforumRepository.create(creator_id=str(test_user.user_id), subforum_name='Climat',
+                                     parent_domain_id=str(domain.domain_id))
+
+
+@pytest.fixture
+def posts(test_user, other_user, subforum):
+    return [
+        Post.objects.create(user=test_user, subforum=subforum, title='Les transports publics',
+                            content='Le transport public gratuit réduirait la pollution des villes.'),
+        Post.objects.create(user=test_user, title='Budget municipal',
+                            content='Le budget prévoit de nouveaux transports et des pistes cyclables.'),
+        Post.objects.create(user=other_user, title='Free buses',
+                            content='Free buses would reduce <b>pollution</b> & noise in cities.'),
+        Post.objects.create(user=other_user, title='Gardening', content='Tomatoes need sun.'),
+    ]
+
+
+def _titles(page):
+    return [post.title for post in page]
+
+
+class TestSearchRepository:
+
+    def test_french_stemming_and_title_weight(self, posts):
+        page = SearchRepository.search_posts('transport', language='fr')
+        # Title matches rank first; "transports" matches "transport"
+        assert _titles(page) == ['Les transports publics', 'Budget municipal']
+        assert page[0].rank > page[1].rank
+
+    def test_english_configuration(self, posts):
+        assert _titles(SearchRepository.search_posts('reducing pollution', language='en')) == ['Free buses']
+        assert _titles(SearchRepository.search_posts('tomato', language='en')) == ['Gardening']
+
+    def test_web_search_syntax(self, posts):
+        assert _titles(SearchRepository.search_posts('transport -budget', language='fr')) == ['Les transports publics']
+        assert _titles(SearchRepository.search_posts('"pistes cyclables"', language='fr')) == ['Budget municipal']
+
+    def test_snippet_is_escaped_and_highlighted(self, posts):
+        snippet = SearchRepository.search_posts('noise', language='en')[0].snippet
+        assert '&amp; <mark>noise</mark>' in snippet
+        assert '<b>' not in snippet
+
+    def test_snippet_covers_the_title(self, posts):
+        snippet = SearchRepository.search_posts('gardening', language='en')[0].snippet
+        assert snippet.startswith('<mark>Gardening</mark> — Tomatoes')
+
+    def test_filters(self, posts, subforum, other_user):
+        tag = Tag.objects.create(tag_name='mobilite')
+        PostTag.objects.create(post=posts[1], tag=tag)
+        assert _titles(SearchRepository.search_posts('transport', domain_id=subforum.parent_domain_id)) == [posts[0].title]
+        assert _titles(SearchRepository.search_posts('transport', subforum_id=subforum.subforum_id)) == [posts[0].title]
+        assert _titles(SearchRepository.search_posts('transport', tag_id=tag.tag_id)) == [posts[1].title]
+        assert _titles(SearchRepository.search_posts('free', language='en', author_id=other_user.user_id)) == [posts[2].title]
+
+    def test_keyset_pagination(self, test_user):
+        for i in range(5):
+            Post.objects.create(user=test_user, title=f'Vote {i}', content='vote ' * (i + 1))
+        first = SearchRepository.search_posts('vote', page_size=2)
+        second = SearchRepository.search_posts('vote', page_size=2, cursor=first.next_cursor)
+        third = SearchRepository.search_posts('vote', page_size=2, cursor=second.next_cursor)
+        titles = _titles(first) + _titles(second) + _titles(third)
+        assert sorted(titles) == [f'Vote {i}' for i in range(5)]
+        assert third.next_cursor is None
+
+    def test_comments(self, posts, test_user):
+        Comment.objects.create(user=test_user, post=posts[3], content='Les tomates aiment le soleil')
+        Comment.objects.create(user=test_user, post=posts[0], content='Et les vélos ?')
+        page = SearchRepository.search_comments('tomate', language='fr')
+        assert [comment.post_id for comment in page] == [posts[3].post_id]
+        assert '<mark>tomates</mark>' in page[0].snippet
+
+
+class TestPostSearchView:
+
+    def test_search(self, authenticated_client, posts):
+        response = authenticated_client.get(URL, {'q': 'transport', 'cursor': ''})
+        assert response.status_code == 200
+        assert [r['title'] for r in response.data['results']] == ['Les transports publics', 'Budget municipal']
+        assert '<mark>' in response.data['results'][0]['snippet']
+
+    def test_language_defaults_to_the_user_settings(self, api_client, other_user, posts):
+        api_client.force_authenticate(user=other_user)
+        assert [r['title'] for r in api_client.get(URL, {'q': 'cities'}).data] == ['Free buses']
+
+    def test_blocked_authors_are_hidden(self, authenticated_client, test_user, other_user, posts):
+        BlockRepository.create(str(test_user.user_id), str(other_user.user_id))
+        assert authenticated_client.get(URL, {'q': 'noise', 'lang': 'en'}).data == []
+
+    def test_invalid_parameters(self, authenticated_client):
+        assert authenticated_client.get(URL).status_code == 400
+        assert authenticated_client.get(URL, {'q': 'vote', 'lang': 'de'}).status_code == 400
+        assert authenticated_client.get(URL, {'q': 'vote', 'sort': 'votes'}).status_code == 400
+        assert authenticated_client.get(URL, {'q': 'vote', 'subforum_id': 'nope'}).status_code == 400
+
+    def test_comment_search(self, authenticated_client, posts, test_user):
+        Comment.objects.create(user=test_user, post=posts[0], content='Les bus électriques sont silencieux')
+        response = authenticated_client.get('/api/v1/comments/search/', {'q': 'bus', 'post_id': str(posts[0].post_id)})
+        assert response.status_code == 200
+        assert [r['post_id'] for r in response.data] == [str(posts[0].post_id)]
@@ -0,0 +1,75 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from db.entities.message_entity import Report
+from db.entities.post_entity import Post, Comment, Like
+from db.entities.stats_entity import DailyStats
+from db.entities.user_entity import User
+from db.repositories.stats_repository import StatsRepository, day_start
+
+
+def _backdate(model, days, **lookup):
+    model.objects.filter(**lookup).update(created_at=timezone.now() - timedelta(days=days))
+
+
+@pytest.fixture
+def activity(test_user, admin_user):
+    """Posts, comments and likes created today, 3 days ago and 10 days ago."""
+    posts = [Post.objects.create(user=test_user, title=f'Post {i}', content='content') for i in range(3)]
+    for post in posts:
+        Comment.objects.create(user=test_user, post=post, content='comment')
+    Like.objects.create(user=admin_user, post=posts[0])
+    Report.objects.create(reporter=test_user, target_type='post', target_id=posts[0].post_id, reason='spam')
+    _backdate(Post, 3, post_id=posts[1].post_id)
+    _backdate(Comment, 3, post_id=posts[1].post_id)
+    _backdate(Post, 10, post_id=posts[2].post_id)
+    _backdate(Comment, 10, post_id=posts[2].post_id)
+    _backdate(User, 10, user_id=admin_user.user_id)
+    User.objects.filter(user_id=admin_user.user_id).update(is_banned=True)
+    return posts
+
+
+class TestStatsRepository:
+
+    def test_dashboards_are_one_query_per_table(self, activity, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            users = StatsRepository.user_stats()
+        assert users == {'total_users': 2, 'new_users_today': 1, 'new_users_this_week': 1,
+                         'active_users_today': 0, 'banned_users': 1}
+        with django_assert_num_queries(2):
+            posts = StatsRepository.post_stats()
+        assert posts == {'total_posts': 3, 'new_posts_today': 1, 'new_posts_this_week': 2, 'total_comments': 3}
+        with django_assert_num_queries(1):
+            reports = StatsRepository.report_stats()
+        assert reports == {'total_reports': 1, 'pending_reports': 1, 'resolved_reports': 0, 'rejected_reports': 0}
+
+    def test_rollup(self, activity):
+        today = timezone.localdate()
+        assert StatsRepository.rollup(today - timedelta(days=10), today) == 11
+
+        series = StatsRepository.daily_series(today - timedelta(days=11), today)
+        assert len(series) == 12
+        by_day = {row['day']: row for row in series}
+        assert by_day[today] == {'day': today, 'new_users': 1, 'new_posts': 1, 'new_comments': 1,
+                                 'new_likes': 1, 'new_reports': 1}
+        assert by_day[today - timedelta(days=3)]['new_posts'] == 1
+        assert by_day[today - timedelta(days=10)]['new_users'] == 1
+        assert sum(row['new_comments'] for row in series) == 3
+
+    def test_rollup_pending_resumes_at_the_last_day(self, activity, test_user):
+        today = timezone.localdate()
+        assert StatsRepository.rollup_pending() == 11
+        Post.objects.create(user=test_user, title='Later', content='content')
+
+        assert StatsRepository.rollup_pending() == 1
+        assert DailyStats.objects.get(day=today).new_posts == 2
+        assert DailyStats.objects.count() == 11
+
+    def test_day_boundaries_follow_the_time_zone(self, test_user):
+        today = timezone.localdate()
+        post = Post.objects.create(user=test_user, title='Midnight', content='content')
+        Post.objects.filter(post_id=post.post_id).update(created_at=day_start(today) - timedelta(seconds=1))
+
+        StatsRepository.rollup(today - timedelta(days=1), today)
+        assert DailyStats.objects.get(day=today - timedelta(days=1)).new_posts == 1
+        assert DailyStats.objects.get(day=today).new_posts == 0
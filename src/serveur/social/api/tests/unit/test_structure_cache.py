@@ -0,0 +1,109 @@
+import pytest
+from db.repositories.domain_repository import DomainRepository, ForumRepository, SubforumRepository, structure_cache
+from services.apps_services.domain_service import DomainService
+from services.apps_services.forum_service import ForumService
+
+
+@pytest.fixture
+def forum(test_user):
+    return ForumRepository.create(creator_id=str(test_user.user_id), forum_name='CachedForum')
+
+
+@pytest.fixture
+def parent(test_user, forum):
+    return SubforumRepository.create(creator_id=str(test_user.user_id), subforum_name='CachedParent',
+                                     parent_forum_id=str(forum.forum_id))
+
+
+class TestVersionedCache:
+
+    def test_payload_is_reused_until_bumped(self):
+        loads = []
+        load = lambda: loads.append(1) or {'count': len(loads)}
+        first = structure_cache.get('test:scope', 'v', load)
+        assert structure_cache.get('test:scope', 'v', load) == first
+        assert len(loads) == 1
+
+        structure_cache.bump('test:scope')
+        second = structure_cache.get('test:scope', 'v', load)
+        assert second.data == {'count': 2}
+        assert second.etag != first.etag
+
+    def test_bump_is_repeated_on_commit(self, django_capture_on_commit_callbacks):
+        version = structure_cache.version('test:commit')
+        with django_capture_on_commit_callbacks(execute=True):
+            structure_cache.bump('test:commit')
+        assert structure_cache.version('test:commit') == version + 2
+
+
+@pytest.mark.django_db
+class TestForumTreeCache:
+
+    def test_not_modified(self, authenticated_client, forum, parent):
+        url = f'/api/v1/forums/{forum.forum_id}/tree/'
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+
+        revalidated = authenticated_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert revalidated.status_code == 304
+        assert revalidated['ETag'] == response['ETag']
+        assert not revalidated.content
+
+    def test_cached_tree_only_reads_post_counts(self, authenticated_client, forum, parent, django_assert_max_num_queries):
+        url = f'/api/v1/forums/{forum.forum_id}/tree/'
+        authenticated_client.get(url)
+        # The counts, and the savepoint of the request's atomic block
+        with django_assert_max_num_queries(3):
+            assert authenticated_client.get(url).status_code == 200
+
+    def test_post_counts_are_current(self, authenticated_client, forum, parent):
+        url = f'/api/v1/forums/{forum.forum_id}/tree/'
+        etag = authenticated_client.get(url)['ETag']
+        SubforumRepository.increment_post_count(str(parent.subforum_id))
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data[0]['post_count'] == 1
+        assert response['ETag'] != etag
+
+    def test_nested_subforum_invalidates_ancestor_trees(self, authenticated_client, test_user, forum, parent):
+        url = f'/api/v1/forums/{forum.forum_id}/tree/'
+        etag = authenticated_client.get(url)['ETag']
+        ForumService.create_subforum_in_subforum(str(test_user.user_id), str(parent.subforum_id), 'CachedChild', 'child')
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data[0]['children'][0]['name'] == 'CachedChild'
+
+    def test_unknown_forum(self, authenticated_client):
+        assert authenticated_client.get('/api/v1/forums/00000000-0000-0000-0000-000000000000/tree/').status_code == 404
+        assert authenticated_client.get('/api/v1/forums/not-a-forum/tree/').status_code == 404
+
+
+@pytest.mark.django_db
+class TestDomainCache:
+
+    def test_domain_list_invalidated_on_create(self, authenticated_client, domains):
+        response = authenticated_client.get('/api/v1/domains/')
+        assert authenticated_client.get('/api/v1/domains/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+        DomainRepository.create(domain_name='Economie')
+        response = authenticated_client.get('/api/v1/domains/', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 200
+        assert len(response.data) == len(domains) + 1
+
+    def test_domain_delete_invalidates_subforum_trees(self, test_user, domains):
+        subforum = DomainService.create_subforum_in_domain(str(test_user.user_id), str(domains[0].domain_id),
+                                                           'DeletedDomainSub', 'description')
+        scope = f'forum:{subforum.forum_id_id}'
+        version = structure_cache.version(scope)
+        DomainRepository.delete(str(domains[0].domain_id))
+        assert structure_cache.version(scope) > version
+
+    def test_domain_subforums_invalidated_on_create(self, authenticated_client, test_user, domains):
+        url = f'/api/v1/domains/{domains[0].domain_id}/subforums/'
+        assert authenticated_client.get(url).data == []
+
+        DomainService.create_subforum_in_domain(str(test_user.user_id), str(domains[0].domain_id),
+                                                'CachedDomainSub', 'description')
+        assert [s['name'] for s in authenticated_client.get(url).data] == ['CachedDomainSub']
@@ -0,0 +1,221 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from db.entities.domain_entity import Forum
+from db.entities.timeline_entity import Timeline, TimelineEntry
+from db.repositories.user_repository import UserRepository, FollowRepository
+from db.repositories.post_repository import PostRepository
+from db.repositories.domain_repository import SubforumRepository, SubforumSubscriptionRepository
+from services.apps_services.post_service import PostService
+from services.apps_services.follower_service import FollowerService
+from services.apps_services.user_service import UserService
+from services.apps_services.timeline_service import TimelineService
+
+
+@pytest.fixture
+def alice(db):
+    return UserRepository.create(firebase_id='alice-uid', email='alice@example.com', username='alice')
+
+
+@pytest.fixture
+def bob(db):
+    return UserRepository.create(firebase_id='bob-uid', email='bob@example.com', username='bob')
+
+
+@pytest.fixture
+def subforum(db, alice):
+    forum = Forum.objects.create(creator=alice, forum_name='TimelineForum', description='d')
+    return SubforumRepository.create(
+        creator_id=alice.user_id,
+        subforum_name='Timeline subforum',
+        description='d',
+        parent_forum_id=forum.forum_id,
+    )
+
+
+def _ids(posts):
+    return [str(p.post_id) for p in posts]
+
+
+@pytest.mark.django_db
+class TestTimelineService:
+
+    def test_cold_user_is_built_from_pull_query(self, alice, bob, subforum):
+        post = PostRepository.create(bob.user_id, 'Hello', 'hello', subforum_id=subforum.subforum_id)
+        FollowRepository.create(alice.user_id, bob.user_id)
+
+        feed = TimelineService.get_feed(str(alice.user_id))
+
+        assert _ids(feed) == [str(post.post_id)]
+        assert Timeline.objects.filter(user_id=alice.user_id).exists()
+        assert _ids(feed) == _ids(PostRepository.get_feed(str(alice.user_id)))
+
+    def test_create_post_fans_out_to_warm_followers(self, alice, bob, subforum, django_capture_on_commit_callbacks):
+        FollowRepository.create(alice.user_id, bob.user_id)
+        TimelineService.get_feed(str(alice.user_id))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post = PostService.create_post(str(bob.user_id), 'New post', 'content', str(subforum.subforum_id))
+
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(post.post_id)]
+
+    def test_follow_backfills_and_unfollow_prunes(self, alice, bob, subforum):
+        post = PostRepository.create(bob.user_id, 'Hello', 'hello', subforum_id=subforum.subforum_id)
+        TimelineService.get_feed(str(alice.user_id))
+
+        FollowerService.follow_user(str(alice.user_id), str(bob.user_id))
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(post.post_id)]
+
+        FollowerService.unfollow_user(str(alice.user_id), str(bob.user_id))
+        assert TimelineService.get_feed(str(alice.user_id)) == []
+
+    def test_unfollow_keeps_posts_reachable_through_subscription(self, alice, bob, subforum):
+        post = PostRepository.create(bob.user_id, 'Hello', 'hello', subforum_id=subforum.subforum_id)
+        SubforumSubscriptionRepository.create(str(alice.user_id), str(subforum.subforum_id))
+        FollowerService.follow_user(str(alice.user_id), str(bob.user_id))
+        TimelineService.get_feed(str(alice.user_id))
+
+        FollowerService.unfollow_user(str(alice.user_id), str(bob.user_id))
+
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(post.post_id)]
+
+    def test_subscribe_backfills_and_unsubscribe_prunes(self, alice, bob, subforum):
+        post = PostRepository.create(bob.user_id, 'Hello', 'hello', subforum_id=subforum.subforum_id)
+        TimelineService.get_feed(str(alice.user_id))
+
+        SubforumSubscriptionRepository.create(str(alice.user_id), str(subforum.subforum_id))
+        TimelineService.on_subscribe(str(alice.user_id), str(subforum.subforum_id))
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(post.post_id)]
+
+        SubforumSubscriptionRepository.delete(str(alice.user_id), str(subforum.subforum_id))
+        TimelineService.on_unsubscribe(str(alice.user_id), str(subforum.subforum_id))
+        assert TimelineService.get_feed(str(alice.user_id)) == []
+
+    def test_block_prunes_both_timelines(self, alice, bob, subforum):
+        PostRepository.create(alice.user_id, 'Mine', 'mine', subforum_id=subforum.subforum_id)
+        PostRepository.create(bob.user_id, 'Theirs', 'theirs', subforum_id=subforum.subforum_id)
+        TimelineService.get_feed(str(alice.user_id))
+        TimelineService.get_feed(str(bob.user_id))
+
+        UserService.block_user(str(alice.user_id), str(bob.user_id))
+
+        assert all(p.user_id == alice.user_id for p in TimelineService.get_feed(str(alice.user_id)))
+        assert all(p.user_id == bob.user_id for p in TimelineService.get_feed(str(bob.user_id)))
+
+    def test_unblock_restores_both_timelines(self, alice, bob, subforum):
+        mine = PostRepository.create(alice.user_id, 'Mine', 'mine', subforum_id=subforum.subforum_id)
+        theirs = PostRepository.create(bob.user_id, 'Theirs', 'theirs', subforum_id=subforum.subforum_id)
+        TimelineService.get_feed(str(alice.user_id))
+        TimelineService.get_feed(str(bob.user_id))
+        UserService.block_user(str(alice.user_id), str(bob.user_id))
+
+        UserService.unblock_user(str(alice.user_id), str(bob.user_id))
+
+        expected = [str(theirs.post_id), str(mine.post_id)]
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == expected
+        assert _ids(TimelineService.get_feed(str(bob.user_id))) == expected
+
+    @override_settings(FEED_TIMELINE_DEPTH=3)
+    def test_timeline_is_trimmed_to_depth(self, alice, subforum, django_capture_on_commit_callbacks):
+        TimelineService.get_feed(str(alice.user_id), page_size=3)
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(5):
+                PostService.create_post(str(alice.user_id), f'Post {i}', 'content', str(subforum.subforum_id))
+
+        assert TimelineEntry.objects.filter(user_id=alice.user_id).count() == 3
+        # Pages past the depth are served by the pull query
+        assert len(TimelineService.get_feed(str(alice.user_id), page=2, page_size=3)) == 2
+
+
+@pytest.fixture
+def clear_feed_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('clear_feed_cache')
+class TestHybridFeed:
+
+    @override_settings(FEED_HEAVY_FOLLOWER_THRESHOLD=1)
+    def test_heavy_author_is_not_fanned_out_but_merged_at_read(self, alice, bob, subforum, django_capture_on_commit_callbacks):
+        FollowRepository.create(alice.user_id, bob.user_id)
+        TimelineService.refresh_heavy_sources()
+        TimelineService.get_feed(str(alice.user_id))
+        assert TimelineService.is_heavy_author(str(bob.user_id))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post = PostService.create_post(str(bob.user_id), 'Mayor post', 'content', str(subforum.subforum_id))
+
+        assert not TimelineEntry.objects.filter(user_id=alice.user_id, post_id=post.post_id).exists()
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(post.post_id)]
+
+    @override_settings(FEED_HEAVY_SUBFORUM_THRESHOLD=1)
+    def test_heavy_subforum_is_merged_with_timeline_in_order(self, alice, bob, subforum, django_capture_on_commit_callbacks):
+        SubforumSubscriptionRepository.create(str(alice.user_id), str(subforum.subforum_id))
+        FollowRepository.create(alice.user_id, bob.user_id)
+        TimelineService.refresh_heavy_sources()
+        TimelineService.get_feed(str(alice.user_id))
+        assert TimelineService.is_heavy_subforum(str(subforum.subforum_id))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first = PostService.create_post(str(bob.user_id), 'First', 'content', str(subforum.subforum_id))
+            second = PostService.create_post(str(alice.user_id), 'Second', 'content', str(subforum.subforum_id))
+            third = PostService.create_post(str(bob.user_id), 'Third', 'content', str(subforum.subforum_id))
+
+        feed = TimelineService.get_feed(str(alice.user_id))
+        assert _ids(feed) == [str(third.post_id), str(second.post_id), str(first.post_id)]
+        assert _ids(TimelineService.get_feed(str(alice.user_id), page=2, page_size=2)) == [str(first.post_id)]
+
+    @override_settings(FEED_HEAVY_FOLLOWER_THRESHOLD=1, FEED_HEAVY_RECENT_SIZE=2)
+    def test_heavy_posts_past_the_cached_ones(self, alice, bob, subforum, django_capture_on_commit_callbacks):
+        FollowRepository.create(alice.user_id, bob.user_id)
+        TimelineService.refresh_heavy_sources()
+        TimelineService.get_feed(str(alice.user_id))
+        with django_capture_on_commit_callbacks(execute=True):
+            posts = [PostService.create_post(str(bob.user_id), f'Post {i}', 'content', str(subforum.subforum_id))
+                     for i in range(5)]
+        expected = [str(post.post_id) for post in reversed(posts)]
+
+        assert _ids(TimelineService.get_feed(str(alice.user_id), page=2, page_size=2)) == expected[2:4]
+        seen, cursor = [], None
+        while True:
+            page = TimelineService.get_feed(str(alice.user_id), page_size=2, cursor=cursor)
+            seen += _ids(page)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        assert seen == expected
+
+    def test_demoted_sources_stay_in_the_feed(self, alice, bob, subforum, django_capture_on_commit_callbacks):
+        forum = Forum.objects.create(creator=bob, forum_name='OtherForum', description='d')
+        other = SubforumRepository.create(creator_id=bob.user_id, subforum_name='Other subforum', description='d',
+                                          parent_forum_id=forum.forum_id)
+        with override_settings(FEED_HEAVY_FOLLOWER_THRESHOLD=1, FEED_HEAVY_SUBFORUM_THRESHOLD=1):
+            TimelineService.refresh_heavy_sources()
+            TimelineService.get_feed(str(alice.user_id))
+            # Followed and subscribed while heavy: nothing is backfilled
+            FollowerService.follow_user(str(alice.user_id), str(bob.user_id))
+            SubforumSubscriptionRepository.create(str(alice.user_id), str(subforum.subforum_id))
+            TimelineService.refresh_heavy_sources()
+            with django_capture_on_commit_callbacks(execute=True):
+                followed = PostService.create_post(str(bob.user_id), 'Followed', 'content', str(other.subforum_id))
+                subscribed = PostService.create_post(str(bob.user_id), 'Subscribed', 'content',
+                                                     str(subforum.subforum_id))
+            assert not TimelineEntry.objects.filter(user_id=alice.user_id).exists()
+
+        TimelineService.refresh_heavy_sources()
+        assert not TimelineService.is_heavy_author(str(bob.user_id))
+        assert _ids(TimelineService.get_feed(str(alice.user_id))) == [str(subscribed.post_id), str(followed.post_id)]
+
+    @override_settings(FEED_HEAVY_FOLLOWER_THRESHOLD=1)
+    def test_heavy_sources_are_not_computed_on_reads(self, alice, bob, django_assert_num_queries):
+        FollowRepository.create(alice.user_id, bob.user_id)
+        with django_assert_num_queries(0):
+            assert not TimelineService.is_heavy_author(str(bob.user_id))
+        call_command('refresh_heavy_sources')
+        with django_assert_num_queries(0):
+            assert TimelineService.is_heavy_author(str(bob.user_id))
+
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from apps.custom_auth.authentication import FirebaseAuthentication
+from apps.custom_auth.local_keys import generate_local_keys, mint_token
+from apps.custom_auth.token_verifier import (
+    ExpiredTokenError,
+    InvalidTokenError,
+    KeySet,
+    TokenVerifier,
+    file_certs_fetcher,
+    get_token_verifier,
+    reset_token_verifier,
+)
+from db.repositories.user_repository import UserRepository, auth_user_cache
+from services.apps_services.report_service import ReportService
+
+PROJECT = 'demo-project'
+
+
+@pytest.fixture(autouse=True)
+def local_keys(tmp_path, settings):
+    private_path, certs_path = generate_local_keys(tmp_path)
+    settings.FIREBASE_PROJECT_ID = PROJECT
+    settings.FIREBASE_CERTS_FILE = str(certs_path)
+    cache.clear()
+    auth_user_cache.clear_local()
+    reset_token_verifier()
+    yield private_path
+    reset_token_verifier()
+    auth_user_cache.clear_local()
+
+
+@pytest.fixture
+def verifier(tmp_path):
+    key_set = KeySet(file_certs_fetcher(str(tmp_path / 'certs.json')))
+    key_set.refresh()
+    return TokenVerifier(PROJECT, key_set)
+
+
+@pytest.fixture
+def user(db):
+    return UserRepository.create(firebase_uid='token-uid', email='token@example.com', username='tokenuser')
+
+
+def _authenticate(token):
+    request = APIRequestFactory().get('/api/v1/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    return FirebaseAuthentication().authenticate(Request(request))
+
+
+class TestTokenVerifier:
+
+    def test_valid_token(self, verifier, local_keys):
+        claims = verifier.verify(mint_token(local_keys, PROJECT, 'abc', email='a@example.com'))
+        assert claims['uid'] == 'abc'
+        assert claims['email'] == 'a@example.com'
+
+    def test_verified_once_per_token(self, verifier, local_keys, monkeypatch):
+        token = mint_token(local_keys, PROJECT, 'abc')
+        calls = []
+        original = verifier._verify
+        monkeypatch.setattr(verifier, '_verify', lambda t: calls.append(t) or original(t))
+        verifier.verify(token)
+        verifier.verify(token)
+        assert len(calls) == 1
+
+    def test_expired_token(self, verifier, local_keys):
+        with pytest.raises(ExpiredTokenError):
+            verifier.verify(mint_token(local_keys, PROJECT, 'abc', lifetime=-10))
+
+    def test_other_project_is_rejected(self, verifier, local_keys):
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(mint_token(local_keys, 'other-project', 'abc'))
+
+    def test_tampered_token_is_rejected(self, verifier, local_keys):
+        header, payload, signature = mint_token(local_keys, PROJECT, 'abc').split('.')
+        other_payload = mint_token(local_keys, PROJECT, 'admin').split('.')[1]
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(f'{header}.{other_payload}.{signature}')
+        with pytest.raises(InvalidTokenError):
+            verifier.verify('not-a-token')
+
+    def test_unknown_key_triggers_refresh(self, verifier, tmp_path):
+        rotated_key, _ = generate_local_keys(tmp_path / 'rotated', kid='local-2')
+        certs = json.loads((tmp_path / 'certs.json').read_text())
+        certs.update(json.loads((tmp_path / 'rotated' / 'certs.json').read_text()))
+        (tmp_path / 'certs.json').write_text(json.dumps(certs))
+        verifier.key_set.min_refresh_interval = 0
+
+        assert verifier.verify(mint_token(rotated_key, PROJECT, 'abc', kid='local-2'))['uid'] == 'abc'
+
+
+@pytest.mark.django_db
+class TestFirebaseAuthentication:
+
+    def test_authenticates_with_local_key_set(self, user, local_keys):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {mint_token(local_keys, PROJECT, "token-uid")}')
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.data['username'] == 'tokenuser'
+
+    def test_expired_token_is_refused(self, user, local_keys):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {mint_token(local_keys, PROJECT, "token-uid", lifetime=-10)}')
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code in (401, 403)
+        assert 'expired' in str(response.data).lower()
+
+    def test_repeat_requests_skip_the_database(self, user, local_keys, django_assert_num_queries):
+        token = mint_token(local_keys, PROJECT, 'token-uid')
+        _authenticate(token)
+        with django_assert_num_queries(0):
+            authenticated, _ = _authenticate(token)
+        assert authenticated.user_id == user.user_id
+
+    def test_ban_invalidates_cached_user(self, user, admin_user, local_keys):
+        token = mint_token(local_keys, PROJECT, 'token-uid')
+        assert not _authenticate(token)[0].is_banned
+        ReportService.ban_user(str(admin_user.user_id), str(user.user_id))
+        assert _authenticate(token)[0].is_banned
+
+    def test_unregistered_user_is_resolved_after_signup(self, db, local_keys):
+        token = mint_token(local_keys, PROJECT, 'new-uid')
+        assert _authenticate(token) is None
+        UserRepository.create(firebase_uid='new-uid', email='new@example.com', username='newuser')
+        assert _authenticate(token)[0].username == 'newuser'
+
+
+def test_token_cache_expires_with_token(verifier, local_keys):
+    token = mint_token(local_keys, PROJECT, 'abc', lifetime=1)
+    verifier.verify(token)
+    time.sleep(1.1)
+    with pytest.raises(ExpiredTokenError):
+        verifier.verify(token)
+
+
+def test_misconfigured_project_starts_no_refresh_thread(settings, monkeypatch):
+    settings.FIREBASE_PROJECT_ID = None
+    settings.FIREBASE_SERVICE_ACCOUNT_KEY = None
+    monkeypatch.delenv('GOOGLE_CLOUD_PROJECT', raising=False)
+    monkeypatch.delenv('GCLOUD_PROJECT', raising=False)
+    monkeypatch.setattr('google.auth.default', lambda: (None, None))
+    threads = threading.active_count()
+    for _ in range(3):
+        with pytest.raises(ImproperlyConfigured):
+            get_token_verifier()
+    assert threading.active_count() == threads
+
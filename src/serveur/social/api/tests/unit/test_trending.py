@@ -0,0 +1,78 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from common.trending import compute_hot_score
+from db.entities.post_entity import Post
+from db.entities.domain_entity import Forum
+from db.repositories.user_repository import UserRepository
+from db.repositories.post_repository import PostRepository
+from db.repositories.domain_repository import DomainRepository, SubforumRepository
+
+
+@pytest.fixture
+def author(db):
+    return UserRepository.create(firebase_id='trend-uid', email='trend@example.com', username='trenduser')
+
+
+@pytest.fixture
+def domain(db):
+    return DomainRepository.create("Trending domain", "d")
+
+
+@pytest.fixture
+def domain_subforum(author, domain):
+    return SubforumRepository.create(
+        creator_id=author.user_id, subforum_name='Domain subforum', description='d', parent_domain_id=domain.domain_id
+    )
+
+
+@pytest.fixture
+def forum_subforum(author):
+    forum = Forum.objects.create(creator=author, forum_name='TrendForum', description='d')
+    return SubforumRepository.create(
+        creator_id=author.user_id, subforum_name='Forum subforum', description='d', parent_forum_id=forum.forum_id
+    )
+
+
+def _score(post):
+    return Post.objects.get(post_id=post.post_id).hot_score
+
+
+@pytest.mark.django_db
+class TestTrending:
+
+    def test_new_post_gets_seeded_score(self, author):
+        post = PostRepository.create(author.user_id, 'Fresh', 'content')
+        assert _score(post) == pytest.approx(compute_hot_score(0, 0, post.created_at), abs=1e-3)
+
+    def test_like_and_comment_events_update_score(self, author):
+        post = PostRepository.create(author.user_id, 'Liked', 'content')
+        PostRepository.increment_like_count(post.post_id)
+        PostRepository.increment_comment_count(post.post_id)
+        assert _score(post) == pytest.approx(compute_hot_score(1, 1, post.created_at))
+        PostRepository.decrement_like_count(post.post_id)
+        assert _score(post) == pytest.approx(compute_hot_score(0, 1, post.created_at))
+
+    def test_old_viral_post_sinks_below_fresh_post(self, author):
+        old = PostRepository.create(author.user_id, 'Old viral', 'content')
+        Post.objects.filter(post_id=old.post_id).update(
+            like_count=50, created_at=old.created_at - timedelta(days=3)
+        )
+        PostRepository.rescore([old.post_id])
+        fresh = PostRepository.create(author.user_id, 'Fresh', 'content')
+        PostRepository.increment_like_count(fresh.post_id)
+
+        assert [p.post_id for p in PostRepository.get_discover()] == [fresh.post_id, old.post_id]
+
+    def test_trending_per_domain_and_subforum(self, author, domain, domain_subforum, forum_subforum):
+        in_domain = PostRepository.create(author.user_id, 'In domain', 'content', subforum_id=domain_subforum.subforum_id)
+        in_forum = PostRepository.create(author.user_id, 'In forum', 'content', subforum_id=forum_subforum.subforum_id)
+
+        assert [p.post_id for p in PostRepository.get_trending(domain_id=domain.domain_id)] == [in_domain.post_id]
+        assert [p.post_id for p in PostRepository.get_trending(subforum_id=forum_subforum.subforum_id)] == [in_forum.post_id]
+
+    def test_rescore_command_realigns_scores(self, author):
+        post = PostRepository.create(author.user_id, 'Drifted', 'content')
+        Post.objects.filter(post_id=post.post_id).update(like_count=9, hot_score=0)
+        call_command('rescore_trending', batch_size=1)
+        assert _score(post) == pytest.approx(compute_hot_score(9, 0, post.created_at))
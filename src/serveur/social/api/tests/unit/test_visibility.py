@@ -0,0 +1,103 @@
+import pytest
+from common.visibility import VisibilityFilter
+from db.entities.domain_entity import Forum
+from db.repositories.user_repository import UserRepository, BlockRepository, FollowRepository
+from db.repositories.post_repository import PostRepository, LikeRepository
+from db.repositories.domain_repository import SubforumRepository
+from services.apps_services.post_service import PostService
+from services.apps_services.user_service import UserService
+
+
+def _make_user(name, private=False):
+    user = UserRepository.create(firebase_id=f'{name}-uid', email=f'{name}@example.com', username=name)
+    if private:
+        user.profile.privacy = False
+        user.profile.save()
+    return user
+
+
+@pytest.fixture
+def viewer(db):
+    return _make_user('viewer')
+
+
+@pytest.fixture
+def others(db):
+    return {
+        'public': _make_user('publicuser'),
+        'blocked': _make_user('blockeduser'),
+        'blocker': _make_user('blockeruser'),
+        'private': _make_user('privateuser', private=True),
+        'followed_private': _make_user('followedprivate', private=True),
+    }
+
+
+@pytest.fixture
+def graph(viewer, others):
+    BlockRepository.create(viewer.user_id, others['blocked'].user_id)
+    BlockRepository.create(others['blocker'].user_id, viewer.user_id)
+    FollowRepository.create(viewer.user_id, others['followed_private'].user_id)
+    return others
+
+
+@pytest.fixture
+def subforum(viewer):
+    forum = Forum.objects.create(creator=viewer, forum_name='VisibilityForum', description='d')
+    return SubforumRepository.create(
+        creator_id=viewer.user_id, subforum_name='Visibility subforum', description='d', parent_forum_id=forum.forum_id
+    )
+
+
+@pytest.fixture
+def posts(graph, subforum):
+    return {
+        name: PostRepository.create(user.user_id, f'{name} post', 'content', subforum_id=subforum.subforum_id)
+        for name, user in graph.items()
+    }
+
+
+def _authors(posts):
+    return {p.user.username for p in posts}
+
+
+@pytest.mark.django_db
+class TestVisibilityFilter:
+
+    def test_sets_are_symmetric_and_loaded_once(self, viewer, graph, django_assert_num_queries):
+        visibility = VisibilityFilter(str(viewer.user_id))
+        with django_assert_num_queries(2):
+            for _ in range(2):
+                blocked, followed = visibility.blocked_ids, visibility.followed_private_ids
+        assert blocked == {str(graph['blocked'].user_id), str(graph['blocker'].user_id)}
+        assert str(graph['followed_private'].user_id) in followed
+
+    def test_discover_hides_blocked_and_unfollowed_private_authors(self, viewer, posts):
+        discover = PostService.get_discover(str(viewer.user_id))
+        assert _authors(discover) == {'publicuser', 'followedprivate'}
+
+    def test_anonymous_viewer_is_not_filtered(self, posts):
+        assert len(PostService.get_discover()) == len(posts)
+
+    def test_subforum_posts_and_feed_are_filtered(self, viewer, subforum, posts):
+        visibility = VisibilityFilter(str(viewer.user_id))
+        assert _authors(PostRepository.get_by_subforum(subforum.subforum_id, visibility=visibility)) == {
+            'publicuser', 'followedprivate'
+        }
+        PostRepository.create(viewer.user_id, 'Mine', 'content', subforum_id=subforum.subforum_id)
+        assert _authors(PostService.get_feed(str(viewer.user_id))) == {'viewer', 'publicuser', 'followedprivate'}
+
+    def test_search_pages_are_filled_after_filtering(self, viewer, graph):
+        users = UserService.search_users('user', str(viewer.user_id), page_size=2)
+        assert {u.username for u in users} == {'publicuser', 'privateuser'}
+
+    def test_likes_listing_hides_blocked_users(self, viewer, graph, posts):
+        for user in graph.values():
+            LikeRepository.create(user.user_id, posts['public'].post_id)
+        likes = PostService.get_post_likes(str(posts['public'].post_id), viewer_id=str(viewer.user_id))
+        assert {like.user.username for like in likes} == {'publicuser', 'privateuser', 'followedprivate'}
+
+    def test_discover_query_count_does_not_grow_with_page(self, viewer, graph, subforum, django_assert_max_num_queries):
+        for i in range(20):
+            PostRepository.create(graph['public'].user_id, f'Post {i}', 'content', subforum_id=subforum.subforum_id)
+        with django_assert_max_num_queries(3):
+            assert len(PostService.get_discover(str(viewer.user_id))) == 20
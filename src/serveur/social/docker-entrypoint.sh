@@ -35,6 +35,23 @@ python manage.py migrate --noinput
 echo "🏛️ Initializing political domains..."
 python manage.py init_domains || echo "Domains already initialized"
 
+# Store audit events spooled by a previous run
+echo "🗂️ Replaying spooled audit events..."
+python manage.py flush_audit_log || echo "Audit spool not replayed"
+
+# Apply counter deltas buffered by a previous run
+echo "🔢 Flushing buffered counters..."
+python manage.py flush_counters || echo "Counters not flushed"
+
+# Roll up the daily admin stats missed while stopped (later runs from cron)
+echo "📊 Rolling up daily stats..."
+python manage.py rollup_daily_stats || echo "Daily stats not rolled up"
+
+# Create the upcoming monthly audit log partitions (archiving runs from cron;
+# until they exist, new rows go to the default partition)
+echo "🗓️ Creating audit log partitions..."
+python manage.py manage_audit_partitions --retain-months 0 || echo "Audit log partitions not created"
+
 # Collect static files
 echo "📁 Collecting static files..."
 python manage.py collectstatic --noinput